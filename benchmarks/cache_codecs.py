@@ -0,0 +1,102 @@
+"""Benchmark of the cache compression codecs: CPU time against bytes saved.
+
+Values are synthetic film pages and film/person/genre documents shaped like
+the ones the API caches. Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/cache_codecs.py
+"""
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Callable
+
+import orjson
+import zstandard
+
+from db.cache.codec import LZ4, NONE, ZSTD, Compressor, decompress
+
+WORDS = (
+    'star wars empire return jedi force galaxy rebel alliance captain ship planet war story hero dark '
+    'light sith order clone new hope last first rise fall legend young old king queen space trek'
+).split()
+GENRES = [{'id': str(uuid.uuid4()), 'name': name} for name in ('Action', 'Adventure', 'Fantasy', 'Sci-Fi', 'Drama')]
+PERSONS = [{'id': str(uuid.uuid4()), 'name': f'{random.choice(WORDS).title()} {random.choice(WORDS).title()}'}
+           for _ in range(500)]
+REPEATS = 200
+
+
+def make_film() -> dict:
+    """Film document as it is stored in the movies index."""
+    actors = random.sample(PERSONS, 6)
+    writers = random.sample(PERSONS, 2)
+    return {
+        'id': str(uuid.uuid4()),
+        'title': ' '.join(random.choices(WORDS, k=4)).title(),
+        'imdb_rating': round(random.uniform(1, 10), 1),
+        'description': ' '.join(random.choices(WORDS, k=60)),
+        'creation_date': None,
+        'genre': random.sample(GENRES, 2),
+        'actors': actors,
+        'writers': writers,
+        'director': [random.choice(PERSONS)['name']],
+        'actors_names': ', '.join(actor['name'] for actor in actors),
+        'writers_names': ', '.join(writer['name'] for writer in writers),
+    }
+
+
+def make_values() -> dict[str, list[bytes]]:
+    """Serialized values by their kind."""
+    return {
+        'film page (50)': [orjson.dumps([make_film() for _ in range(50)]) for _ in range(20)],
+        'film': [orjson.dumps(make_film()) for _ in range(200)],
+        'person': [orjson.dumps(person) for person in PERSONS[:200]],
+        'genre': [orjson.dumps(genre) for genre in GENRES],
+    }
+
+
+def measure(compressor: Compressor, values: list[bytes]) -> tuple[float, float, float]:
+    """Return the average compressed share of the size and the compress/decompress time in microseconds."""
+    compressed = [compressor.compress(value) for value in values]
+    assert [decompress(value) for value in compressed] == values
+    ratio = sum(map(len, compressed)) / sum(map(len, values))
+    compress_us = timed(lambda: [compressor.compress(value) for value in values], values)
+    decompress_us = timed(lambda: [decompress(value) for value in compressed], values)
+    return ratio, compress_us, decompress_us
+
+
+def timed(run: Callable, values: list[bytes]) -> float:
+    """Time of one value in microseconds, the best of several rounds."""
+    rounds = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(REPEATS // 10):
+            run()
+        rounds.append((time.perf_counter() - started) / (REPEATS // 10) / len(values))
+    return min(rounds) * 1_000_000
+
+
+def main() -> None:
+    """Print the table of codecs by the kinds of values."""
+    random.seed(0)
+    training = [orjson.dumps(make_film()) for _ in range(2000)] + [orjson.dumps(person) for person in PERSONS]
+    dictionary = zstandard.train_dictionary(112640, training)
+    compressors = {
+        'none': Compressor(codec=NONE),
+        'lz4': Compressor(codec=LZ4, threshold=0),
+        'zstd-3': Compressor(codec=ZSTD, threshold=0, level=3),
+        'zstd-3+dict': Compressor(codec=ZSTD, threshold=0, level=3, dictionary=dictionary),
+    }
+    sys.stdout.write(f'{"value":<16}{"codec":<14}{"avg bytes":>10}{"size %":>9}{"comp us":>10}{"decomp us":>11}\n')
+    for kind, values in make_values().items():
+        size = statistics.mean(map(len, values))
+        for name, compressor in compressors.items():
+            ratio, compress_us, decompress_us = measure(compressor, values)
+            sys.stdout.write(
+                f'{kind:<16}{name:<14}{size:>10.0f}{ratio * 100:>8.1f}%{compress_us:>10.1f}{decompress_us:>11.1f}\n',
+            )
+
+
+if __name__ == '__main__':
+    main()
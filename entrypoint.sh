@@ -1,5 +1,16 @@
 #!/bin/sh
 set -e
 
+if [ -n "$SNAPSHOT_DIR" ]; then
+  echo "Building index snapshots in $SNAPSHOT_DIR..."
+  python build_snapshots.py || echo "Snapshots are not built, entities are loaded from Elasticsearch."
+  # Пересборка снимков: воркеры отображают новый файл, а снимок старше SNAPSHOT_MAX_AGE не читают.
+  (
+    while sleep "${SNAPSHOT_REBUILD_INTERVAL:-600}"; do
+      python build_snapshots.py || echo "Snapshots are not rebuilt, the previous ones are kept."
+    done
+  ) &
+fi
+
 echo "Starting FastAPI server with workers count $GUNICORN_WORKERS..."
 gunicorn --workers="$GUNICORN_WORKERS" --bind="0.0.0.0:8000" --worker-class=uvicorn.workers.UvicornWorker main:app
@@ -0,0 +1,35 @@
+"""Метрики воркера для мониторинга."""
+from fastapi import APIRouter, Depends
+
+from core.metrics import metrics
+from db.cache.resilience import get_circuit_breaker
+from services.film import FilmService, get_film_service
+from services.genre import GenresService, get_genres_service
+from services.person import PersonsService, get_persons_service
+
+router = APIRouter()
+
+
+@router.get('', include_in_schema=False)
+async def service_metrics(
+        film_service: FilmService = Depends(get_film_service),
+        genre_service: GenresService = Depends(get_genres_service),
+        person_service: PersonsService = Depends(get_persons_service),
+) -> dict:
+    """
+    Возвращает метрики воркера, ответившего на запрос.
+
+    Доли попаданий в кэш по уровням, заполненность пачек `_msearch`,
+    счётчики работы в обход недоступного Redis, состояние автомата
+    защиты Redis и все счётчики воркера.
+    """
+    services = {'films': film_service, 'genres': genre_service, 'persons': person_service}
+    counters = metrics.snapshot()
+    breaker = get_circuit_breaker()
+    return {
+        'cache_hit_ratios': {name: service.cache.hit_ratios() for name, service in services.items()},
+        'search_batch_fill_ratios': {name: service.db.search_fill_ratio() for name, service in services.items()},
+        'cache_degraded': {name: value for name, value in counters.items() if '.degraded.' in name},
+        'cache_breaker_open': breaker is not None and breaker.is_open,
+        'counters': counters,
+    }
@@ -1,15 +1,26 @@
 """API фильмов."""
-from typing import Optional
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 
-from api.v1.paging_params import PagingParams
+from api.v1.paging_params import PagingParams, get_cursor_page, set_next_cursor
+from api.v1.responses import get_source_fields, json_bytes_response
+from core.config import settings
 from errors import FilmNotFoundException, MissedQueryParameterException
-from models.film import FilmAPIResponse, map_film_response
+from models.film import (
+    FilmAPIResponse,
+    FilmFacetsAPIResponse,
+    FilmSuggestAPIResponse,
+    map_film_response,
+    map_film_suggest_response,
+)
 from services.film import FilmService, get_film_service
 
 router = APIRouter()
 
+FILM_SOURCE = get_source_fields(FilmAPIResponse)
+FILM_SUGGEST_SOURCE = get_source_fields(FilmSuggestAPIResponse)
+
 
 @router.get(
     '/',
@@ -20,18 +31,29 @@ router = APIRouter()
     tags=['Список всех элементов'],
 )
 async def films_list(
+        response: Response,
         film_service: FilmService = Depends(get_film_service),
         paging_params: PagingParams = Depends(),
         sort: Optional[str] = '-imdb_rating',
         filter_genre: str = Query(None, alias='filter[genre]'),
-) -> list[FilmAPIResponse]:
+) -> Union[list[FilmAPIResponse], Response]:
     """Возвращает список фильмов для отправки по API, соответствующий критериям фильтрации."""
-    films = await film_service.get_list(
-        sort=sort,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-        genre_id=filter_genre,
-    )
+    params = {
+        'sort': sort,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'genre_id': filter_genre,
+        'source': FILM_SOURCE,
+    }
+    if paging_params.cursor is not None:
+        items, next_cursor = await get_cursor_page(
+            film_service.get_list_page, cursor=paging_params.cursor, **params,
+        )
+        set_next_cursor(response, next_cursor)
+        return [map_film_response(item) for item in items]
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await film_service.get_list_response(map_film_response, **params))
+    films = await film_service.get_list(**params)
     return [map_film_response(film) for film in films]
 
 
@@ -44,21 +66,70 @@ async def films_list(
     tags=['Полнотекстовый поиск'],
 )
 async def films_search(
+        response: Response,
         film_service: FilmService = Depends(get_film_service),
         query: str = None,
         paging_params: PagingParams = Depends(),
-) -> list[FilmAPIResponse]:
+) -> Union[list[FilmAPIResponse], Response]:
     """Возвращает список фильмов для отправки по API, соответствующий критериям поиска."""
     if not query:
         raise MissedQueryParameterException(parameter='query')
-    search_result = await film_service.get_search_result(
-        query=query,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-    )
+    params = {
+        'query': query,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'source': FILM_SOURCE,
+    }
+    if paging_params.cursor is not None:
+        items, next_cursor = await get_cursor_page(
+            film_service.get_search_result_page, cursor=paging_params.cursor, **params,
+        )
+        set_next_cursor(response, next_cursor)
+        return [map_film_response(item) for item in items]
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await film_service.get_search_result_response(map_film_response, **params))
+    search_result = await film_service.get_search_result(**params)
     return [map_film_response(f) for f in search_result]
 
 
+@router.get(
+    '/facets',
+    response_model=FilmFacetsAPIResponse,
+    summary='Фасеты кинопроизведений.',
+    description='Число кинопроизведений по жанрам, целым значениям рейтинга и годам создания.',
+    response_description='Фасеты по списку или по результатам поиска.',
+    tags=['Список всех элементов'],
+)
+async def films_facets(
+        film_service: FilmService = Depends(get_film_service),
+        filter_genre: str = Query(None, alias='filter[genre]'),
+        query: str = Query(None, description='Посчитать фасеты по результатам поиска.'),
+) -> FilmFacetsAPIResponse:
+    """Возвращает фасеты по фильмам жанра (без жанра -- по всем фильмам) или по результатам поиска."""
+    film_facets = await film_service.get_facets(genre_id=filter_genre, query=query)
+    return FilmFacetsAPIResponse(**film_facets)
+
+
+@router.get(
+    '/suggest',
+    response_model=list[FilmSuggestAPIResponse],
+    summary='Подсказки по названиям кинопроизведений.',
+    description='Автодополнение: фильмы, в названии которых есть слово, начинающееся с запроса.',
+    response_description='Список подсказок по убыванию рейтинга.',
+    tags=['Полнотекстовый поиск'],
+)
+async def films_suggest(
+        film_service: FilmService = Depends(get_film_service),
+        query: str = None,
+        size: int = Query(settings.SUGGEST_MAX_SIZE, ge=1, le=settings.SUGGEST_MAX_SIZE),
+) -> list[FilmSuggestAPIResponse]:
+    """Возвращает подсказки с фильмами для строки, которую набирает пользователь."""
+    if not query:
+        raise MissedQueryParameterException(parameter='query')
+    films = await film_service.suggest(query, size, source=FILM_SUGGEST_SOURCE)
+    return [map_film_suggest_response(film) for film in films]
+
+
 @router.get(
     '/{film_id}',
     response_model=FilmAPIResponse,
@@ -70,7 +141,7 @@ async def films_search(
 async def film_details(
         film_id: str,
         film_service: FilmService = Depends(get_film_service),
-) -> FilmAPIResponse:
+) -> Union[FilmAPIResponse, Response]:
     """Детализация кинопроизведения.
 
     Args:
@@ -80,7 +151,13 @@ async def film_details(
     Returns:
         FilmAPIResponse:
     """
-    film = await film_service.get_by_id(film_id)
+    if settings.RESPONSE_CACHE_ENABLED:
+        content = await film_service.get_by_id_response(map_film_response, film_id, source=FILM_SOURCE)
+        if not content:
+            raise FilmNotFoundException()
+        return json_bytes_response(content)
+
+    film = await film_service.get_by_id(film_id, source=FILM_SOURCE)
     if not film:
         raise FilmNotFoundException()
 
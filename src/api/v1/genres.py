@@ -1,15 +1,19 @@
 """API жанров."""
-from typing import Optional
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
-from api.v1.paging_params import PagingParams
+from api.v1.paging_params import PagingParams, get_cursor_page, set_next_cursor
+from api.v1.responses import get_source_fields, json_bytes_response
+from core.config import settings
 from errors import GenreNotFoundException, MissedQueryParameterException
-from models.genre import GenreAPIResponse
+from models.genre import GenreAPIResponse, map_genre_response
 from services.genre import GenresService, get_genres_service
 
 router = APIRouter()
 
+GENRE_SOURCE = get_source_fields(GenreAPIResponse)
+
 
 @router.get(
     '/',
@@ -20,17 +24,28 @@ router = APIRouter()
     tags=['Список всех элементов'],
 )
 async def genres_list(
+        response: Response,
         genre_service: GenresService = Depends(get_genres_service),
         sort: Optional[str] = '-id',
         paging_params: PagingParams = Depends(),
-) -> list[GenreAPIResponse]:
+) -> Union[list[GenreAPIResponse], Response]:
     """Возвращает список жанров для отправки по API, соответствующий критериям фильтрации."""
-    genres = await genre_service.get_list(
-        sort=sort,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-    )
-    return [GenreAPIResponse(**item.dict()) for item in genres]
+    params = {
+        'sort': sort,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'source': GENRE_SOURCE,
+    }
+    if paging_params.cursor is not None:
+        items, next_cursor = await get_cursor_page(
+            genre_service.get_list_page, cursor=paging_params.cursor, **params,
+        )
+        set_next_cursor(response, next_cursor)
+        return [map_genre_response(item) for item in items]
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await genre_service.get_list_response(map_genre_response, **params))
+    genres = await genre_service.get_list(**params)
+    return [map_genre_response(item) for item in genres]
 
 
 @router.get(
@@ -42,21 +57,32 @@ async def genres_list(
     tags=['Полнотекстовый поиск'],
 )
 async def genres_search(
+        response: Response,
         genre_service: GenresService = Depends(get_genres_service),
         query: str = None,
         paging_params: PagingParams = Depends(),
-) -> list[GenreAPIResponse]:
+) -> Union[list[GenreAPIResponse], Response]:
     """Возвращает список жанров для отправки по API, соответствующий критериям поиска."""
     if not query:
         raise MissedQueryParameterException(parameter='query')
 
-    search_result = await genre_service.get_search_result(
-        query=query,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-    )
+    params = {
+        'query': query,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'source': GENRE_SOURCE,
+    }
+    if paging_params.cursor is not None:
+        items, next_cursor = await get_cursor_page(
+            genre_service.get_search_result_page, cursor=paging_params.cursor, **params,
+        )
+        set_next_cursor(response, next_cursor)
+        return [map_genre_response(item) for item in items]
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await genre_service.get_search_result_response(map_genre_response, **params))
+    search_result = await genre_service.get_search_result(**params)
 
-    return [GenreAPIResponse(**item.dict()) for item in search_result]
+    return [map_genre_response(item) for item in search_result]
 
 
 @router.get(
@@ -70,7 +96,7 @@ async def genres_search(
 async def genre_details(
         genre_id: str,
         genre_service: GenresService = Depends(get_genres_service),
-) -> GenreAPIResponse:
+) -> Union[GenreAPIResponse, Response]:
     """Детализация жанра.
 
     Args:
@@ -80,9 +106,15 @@ async def genre_details(
     Returns:
         GenreAPIResponse:
     """
-    genre = await genre_service.get_by_id(genre_id)
+    if settings.RESPONSE_CACHE_ENABLED:
+        content = await genre_service.get_by_id_response(map_genre_response, genre_id, source=GENRE_SOURCE)
+        if not content:
+            raise GenreNotFoundException()
+        return json_bytes_response(content)
+
+    genre = await genre_service.get_by_id(genre_id, source=GENRE_SOURCE)
 
     if not genre:
         raise GenreNotFoundException()
 
-    return GenreAPIResponse(**genre.dict())
+    return map_genre_response(genre)
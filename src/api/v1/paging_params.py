@@ -1,12 +1,47 @@
 """Common paging params for API queries."""
 from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
 
-from fastapi import Query
+from fastapi import Query, Response
+
+from db.data_providers.cursor import InvalidCursorError, decode_cursor
+from errors import InvalidCursorException
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
 
 
 @dataclass
 class PagingParams:
-    """Common paging params for API queries."""
+    """
+    Common paging params for API queries.
+
+    `page[cursor]` switches to the cursor pagination: an empty value
+    requests the first page, the cursor of the next page is returned
+    in the `X-Next-Cursor` header.
+    """
 
     page_number: int = Query(default=1, alias='page[number]')
     page_size: int = Query(default=50, alias='page[size]')
+    cursor: Optional[str] = Query(default=None, alias='page[cursor]')
+
+    def __post_init__(self) -> None:
+        """Reject cursors that were not issued by the service."""
+        if self.cursor:
+            try:
+                decode_cursor(self.cursor)
+            except InvalidCursorError:
+                raise InvalidCursorException()
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Pass the cursor of the next page to the client."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+async def get_cursor_page(get_page: Callable[..., Awaitable[tuple]], **kwargs) -> tuple:
+    """Load the page by the cursor, rejecting cursors issued for another index or sort."""
+    try:
+        return await get_page(**kwargs)
+    except InvalidCursorError:
+        raise InvalidCursorException()
@@ -1,17 +1,22 @@
 """API персон."""
-from typing import Optional
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 
-from api.v1.paging_params import PagingParams
+from api.v1.paging_params import PagingParams, get_cursor_page, set_next_cursor
+from api.v1.responses import get_source_fields, json_bytes_response
+from core.config import settings
 from errors import MissedQueryParameterException, PersonNotFoundException
 from models.film import FilmAPIResponse, map_film_response
-from models.person import PersonAPIResponse
+from models.person import PersonAPIResponse, map_person_response
 from services.film import FilmService, get_film_service
 from services.person import PersonsService, get_persons_service
 
 router = APIRouter()
 
+PERSON_SOURCE = get_source_fields(PersonAPIResponse)
+FILM_SOURCE = get_source_fields(FilmAPIResponse)
+
 
 @router.get(
     '/',
@@ -22,17 +27,28 @@ router = APIRouter()
     tags=['Список всех элементов'],
 )
 async def persons_list(
+        response: Response,
         person_service: PersonsService = Depends(get_persons_service),
         sort: Optional[str] = '-id',
         paging_params: PagingParams = Depends(),
-) -> list[PersonAPIResponse]:
+) -> Union[list[PersonAPIResponse], Response]:
     """Возвращает список персон для отправки по API, соответствующий критериям фильтрации."""
-    persons = await person_service.get_list(
-        sort=sort,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-    )
-    return [PersonAPIResponse(**item.dict()) for item in persons]
+    params = {
+        'sort': sort,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'source': PERSON_SOURCE,
+    }
+    if paging_params.cursor is not None:
+        items, next_cursor = await get_cursor_page(
+            person_service.get_list_page, cursor=paging_params.cursor, **params,
+        )
+        set_next_cursor(response, next_cursor)
+        return [map_person_response(item) for item in items]
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await person_service.get_list_response(map_person_response, **params))
+    persons = await person_service.get_list(**params)
+    return [map_person_response(item) for item in persons]
 
 
 @router.get(
@@ -44,20 +60,51 @@ async def persons_list(
     tags=['Полнотекстовый поиск'],
 )
 async def persons_search(
+        response: Response,
         person_service: PersonsService = Depends(get_persons_service),
         query: str = None,
         paging_params: PagingParams = Depends(),
-) -> list[PersonAPIResponse]:
+) -> Union[list[PersonAPIResponse], Response]:
     """Возвращает список персон для отправки по API, соответствующий критериям поиска."""
     if not query:
         raise MissedQueryParameterException(parameter='query')
 
-    search_result = await person_service.get_search_result(
-        query=query,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-    )
-    return [PersonAPIResponse(**item.dict()) for item in search_result]
+    params = {
+        'query': query,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'source': PERSON_SOURCE,
+    }
+    if paging_params.cursor is not None:
+        items, next_cursor = await get_cursor_page(
+            person_service.get_search_result_page, cursor=paging_params.cursor, **params,
+        )
+        set_next_cursor(response, next_cursor)
+        return [map_person_response(item) for item in items]
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await person_service.get_search_result_response(map_person_response, **params))
+    search_result = await person_service.get_search_result(**params)
+    return [map_person_response(item) for item in search_result]
+
+
+@router.get(
+    '/suggest',
+    response_model=list[PersonAPIResponse],
+    summary='Подсказки по именам персон.',
+    description='Автодополнение: персоны, в имени которых есть слово, начинающееся с запроса.',
+    response_description='Список подсказок.',
+    tags=['Полнотекстовый поиск'],
+)
+async def persons_suggest(
+        person_service: PersonsService = Depends(get_persons_service),
+        query: str = None,
+        size: int = Query(settings.SUGGEST_MAX_SIZE, ge=1, le=settings.SUGGEST_MAX_SIZE),
+) -> list[PersonAPIResponse]:
+    """Возвращает подсказки с персонами для строки, которую набирает пользователь."""
+    if not query:
+        raise MissedQueryParameterException(parameter='query')
+    persons = await person_service.suggest(query, size, source=PERSON_SOURCE)
+    return [map_person_response(person) for person in persons]
 
 
 @router.get(
@@ -71,7 +118,7 @@ async def persons_search(
 async def person_details(
         person_id: str,
         person_service: PersonsService = Depends(get_persons_service),
-) -> PersonAPIResponse:
+) -> Union[PersonAPIResponse, Response]:
     """Детализация персоны.
 
     Args:
@@ -81,12 +128,18 @@ async def person_details(
     Returns:
         PersonAPIResponse:
     """
-    person = await person_service.get_by_id(person_id)
+    if settings.RESPONSE_CACHE_ENABLED:
+        content = await person_service.get_by_id_response(map_person_response, person_id, source=PERSON_SOURCE)
+        if not content:
+            raise PersonNotFoundException()
+        return json_bytes_response(content)
+
+    person = await person_service.get_by_id(person_id, source=PERSON_SOURCE)
 
     if not person:
         raise PersonNotFoundException()
 
-    return PersonAPIResponse(**person.dict())
+    return map_person_response(person)
 
 
 @router.get(
@@ -114,15 +167,18 @@ async def films_by_person_id(
     Returns:
         PersonAPIResponse:
     """
-    person = await person_service.get_by_id(person_id)
+    person = await person_service.get_by_id(person_id, source=PERSON_SOURCE)
 
     if not person:
         raise PersonNotFoundException()
 
-    films = await film_service.get_search_result(
-        query=person.name,
-        page_size=paging_params.page_size,
-        page_number=paging_params.page_number,
-        fields=['actors_names', 'writers_names', 'director'],
-    )
+    params = {
+        'person_id': person_id,
+        'page_size': paging_params.page_size,
+        'page_number': paging_params.page_number,
+        'source': FILM_SOURCE,
+    }
+    if settings.RESPONSE_CACHE_ENABLED:
+        return json_bytes_response(await film_service.get_by_person_id_response(map_film_response, **params))
+    films = await film_service.get_by_person_id(**params)
     return [map_film_response(film) for film in films]
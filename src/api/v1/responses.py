@@ -0,0 +1,19 @@
+"""Ответы API из заранее сериализованного JSON."""
+from typing import Optional, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from core.config import settings
+
+
+def json_bytes_response(content: bytes) -> Response:
+    """Отдаёт готовый JSON без валидации `response_model`."""
+    return Response(content=content, media_type='application/json')
+
+
+def get_source_fields(response_model: Type[BaseModel]) -> Optional[tuple[str, ...]]:
+    """Поля документа, нужные для модели ответа API; `None` -- документ целиком."""
+    if not settings.ES_SOURCE_FILTERING:
+        return None
+    return tuple(response_model.__fields__)
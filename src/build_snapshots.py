@@ -0,0 +1,32 @@
+"""Сборка снимков индексов Elasticsearch для воркеров API."""
+import asyncio
+import logging
+import os
+
+from elasticsearch import AsyncElasticsearch
+
+from core.config import settings
+from db.data_providers.elastic import ElasticDataProvider
+from db.data_providers.snapshot import get_snapshot_path, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+INDEXES = (settings.MOVIES_ES_INDEX, settings.PERSONS_ES_INDEX, settings.GENRES_ES_INDEX)
+
+
+async def build_snapshots() -> None:
+    """Выгружает индексы фильмов, персон и жанров в файлы снимков в `SNAPSHOT_DIR`."""
+    os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+    es = AsyncElasticsearch(hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}'])
+    try:
+        for index in INDEXES:
+            provider = ElasticDataProvider(db_client=es, db_index=index)
+            count = await write_snapshot(get_snapshot_path(index), provider.iter_all())
+            logger.info('Snapshot of %s is written: %d documents', index, count)
+    finally:
+        await es.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(build_snapshots())
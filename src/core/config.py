@@ -2,7 +2,7 @@
 import os
 from logging import config as logging_config
 
-from pydantic import BaseSettings
+from pydantic import BaseSettings, root_validator
 
 from core.logger import LOGGING
 
@@ -24,8 +24,146 @@ class Settings(BaseSettings):
     PERSONS_ES_INDEX: str = os.getenv('PERSONS_ES_INDEX', 'persons')
     GENRES_ES_INDEX: str = os.getenv('GENRES_ES_INDEX', 'genres')
 
+    # Локальный (в памяти воркера) уровень кеша перед Redis; 0 -- выключен.
+    FILM_LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv('FILM_LOCAL_CACHE_MAX_ENTRIES', 0))
+    FILM_LOCAL_CACHE_MAX_BYTES: int = int(os.getenv('FILM_LOCAL_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    FILM_LOCAL_CACHE_TTL: float = float(os.getenv('FILM_LOCAL_CACHE_TTL', 10))
+    GENRE_LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv('GENRE_LOCAL_CACHE_MAX_ENTRIES', 0))
+    GENRE_LOCAL_CACHE_MAX_BYTES: int = int(os.getenv('GENRE_LOCAL_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+    GENRE_LOCAL_CACHE_TTL: float = float(os.getenv('GENRE_LOCAL_CACHE_TTL', 10))
+    PERSON_LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv('PERSON_LOCAL_CACHE_MAX_ENTRIES', 0))
+    PERSON_LOCAL_CACHE_MAX_BYTES: int = int(os.getenv('PERSON_LOCAL_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    PERSON_LOCAL_CACHE_TTL: float = float(os.getenv('PERSON_LOCAL_CACHE_TTL', 10))
+
+    # Блокировка в Redis, чтобы при промахе кеша в источник данных ходил только один воркер.
+    CACHE_LOCK_ENABLED: bool = os.getenv('CACHE_LOCK_ENABLED', 'false').lower() == 'true'
+    CACHE_LOCK_TTL_MS: int = int(os.getenv('CACHE_LOCK_TTL_MS', 3000))
+    CACHE_LOCK_POLL_INTERVAL: float = float(os.getenv('CACHE_LOCK_POLL_INTERVAL', 0.02))
+
+    # Сколько секунд после логического истечения можно отдавать устаревшее значение,
+    # пока оно обновляется в фоне; 0 -- выключено.
+    CACHE_STALE_TTL: int = int(os.getenv('CACHE_STALE_TTL', 0))
+    # Коэффициент XFetch для вероятностного досрочного обновления; 0 -- выключено.
+    CACHE_XFETCH_BETA: float = float(os.getenv('CACHE_XFETCH_BETA', 0))
+    # Доля случайного разброса TTL, например 0.1 -- это +-10 %.
+    CACHE_TTL_JITTER: float = float(os.getenv('CACHE_TTL_JITTER', 0))
+
+    # Кешировать готовые JSON-ответы API и отдавать их без построения моделей.
+    RESPONSE_CACHE_ENABLED: bool = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+    # Кешировать списки и результаты поиска как упорядоченные id, а сущности -- по отдельности.
+    CACHE_NORMALIZED_LISTS: bool = os.getenv('CACHE_NORMALIZED_LISTS', 'false').lower() == 'true'
+
+    # Объединять запросы сущностей по id в один `mget`; окно ожидания в микросекундах (0 -- один тик loop).
+    ES_BATCH_GET_ENABLED: bool = os.getenv('ES_BATCH_GET_ENABLED', 'false').lower() == 'true'
+    ES_BATCH_GET_WINDOW_US: int = int(os.getenv('ES_BATCH_GET_WINDOW_US', 0))
+    # Объединять поисковые запросы, пришедшие за `ES_MSEARCH_MAX_WAIT_MS`, в один `_msearch`.
+    ES_MSEARCH_ENABLED: bool = os.getenv('ES_MSEARCH_ENABLED', 'false').lower() == 'true'
+    ES_MSEARCH_MAX_BATCH_SIZE: int = int(os.getenv('ES_MSEARCH_MAX_BATCH_SIZE', 50))
+    ES_MSEARCH_MAX_WAIT_MS: float = float(os.getenv('ES_MSEARCH_MAX_WAIT_MS', 2))
+
+    # Поиск сначала по точным совпадениям слов, нечёткий (fuzziness AUTO) -- только если точных совпадений
+    # меньше `ES_TIERED_SEARCH_MIN_HITS` (по умолчанию -- размер страницы API по умолчанию).
+    # Уровень выбирается один раз на запрос, так что все его страницы ранжируются одинаково.
+    ES_TIERED_SEARCH_ENABLED: bool = os.getenv('ES_TIERED_SEARCH_ENABLED', 'false').lower() == 'true'
+    ES_TIERED_SEARCH_MIN_HITS: int = int(os.getenv('ES_TIERED_SEARCH_MIN_HITS', 50))
+
+    # Загружать из Elasticsearch только поля, которые нужны моделям ответа API.
+    ES_SOURCE_FILTERING: bool = os.getenv('ES_SOURCE_FILTERING', 'false').lower() == 'true'
+
+    # Обратный индекс персона -> фильмы в Redis для /api/v1/persons/{person_id}/film.
+    # Включается только вместе со сбросом кеша по тегам (CACHE_INVALIDATION_ENABLED), который
+    # обновляет индекс при изменении фильмов; раз в PERSON_FILMS_REBUILD_INTERVAL секунд индекс строится заново.
+    PERSON_FILMS_INDEX_ENABLED: bool = os.getenv('PERSON_FILMS_INDEX_ENABLED', 'false').lower() == 'true'
+    PERSON_FILMS_REBUILD_INTERVAL: int = int(os.getenv('PERSON_FILMS_REBUILD_INTERVAL', 60 * 60))
+
+    # Держать весь индекс жанров в памяти воркера и отвечать на запросы жанров без Redis и Elastic.
+    GENRES_REPLICA_ENABLED: bool = os.getenv('GENRES_REPLICA_ENABLED', 'false').lower() == 'true'
+    GENRES_REPLICA_REFRESH_INTERVAL: float = float(os.getenv('GENRES_REPLICA_REFRESH_INTERVAL', 60))
+
+    # Колоночный индекс фильмов в памяти воркера для списков с сортировкой и фильтром по жанру.
+    FILM_COLUMNAR_INDEX_ENABLED: bool = os.getenv('FILM_COLUMNAR_INDEX_ENABLED', 'false').lower() == 'true'
+    FILM_COLUMNAR_REFRESH_INTERVAL: float = float(os.getenv('FILM_COLUMNAR_REFRESH_INTERVAL', 300))
+    FILM_COLUMNAR_MAX_BYTES: int = int(os.getenv('FILM_COLUMNAR_MAX_BYTES', 256 * 1024 * 1024))
+
+    # Каталог со снимками индексов, которые воркеры отображают в память через mmap; пусто -- выключено.
+    SNAPSHOT_DIR: str = os.getenv('SNAPSHOT_DIR', '')
+    # Как часто (в секундах) проверять, не заменён ли файл снимка новой версией.
+    SNAPSHOT_CHECK_INTERVAL: float = float(os.getenv('SNAPSHOT_CHECK_INTERVAL', 5))
+    # Снимок старше стольких секунд не читается. entrypoint.sh пересобирает снимки
+    # раз в SNAPSHOT_REBUILD_INTERVAL секунд (по умолчанию 600).
+    SNAPSHOT_MAX_AGE: float = float(os.getenv('SNAPSHOT_MAX_AGE', 30 * 60))
+
+    # Точечный сброс кеша по событиям об изменении сущностей из Redis Stream.
+    # Пока он включён, записи кеша живут `CACHE_INVALIDATION_TTL` секунд вместо 5 минут.
+    CACHE_INVALIDATION_ENABLED: bool = os.getenv('CACHE_INVALIDATION_ENABLED', 'false').lower() == 'true'
+    CACHE_INVALIDATION_STREAM: str = os.getenv('CACHE_INVALIDATION_STREAM', 'changes')
+    CACHE_INVALIDATION_TTL: int = int(os.getenv('CACHE_INVALIDATION_TTL', 6 * 60 * 60))
+    # Результаты поиска не сбрасываются по событиям (изменение любой сущности может их задеть),
+    # поэтому живут не дольше стольких секунд.
+    CACHE_SEARCH_TTL: int = int(os.getenv('CACHE_SEARCH_TTL', 60 * 5))
+
+    # Префикс ключей кеша с номером поколения модели: сброс всего кеша модели -- один INCR.
+    CACHE_GENERATIONS_ENABLED: bool = os.getenv('CACHE_GENERATIONS_ENABLED', 'false').lower() == 'true'
+    # Сколько секунд воркер использует прочитанный номер поколения, не перечитывая его из Redis.
+    CACHE_GENERATION_CHECK_INTERVAL: float = float(os.getenv('CACHE_GENERATION_CHECK_INTERVAL', 1))
+
+    # Сжатие значений кеша от `CACHE_COMPRESSION_THRESHOLD` байт: none, zstd или lz4.
+    CACHE_COMPRESSION: str = os.getenv('CACHE_COMPRESSION', 'none')
+    CACHE_COMPRESSION_THRESHOLD: int = int(os.getenv('CACHE_COMPRESSION_THRESHOLD', 1024))
+    CACHE_ZSTD_LEVEL: int = int(os.getenv('CACHE_ZSTD_LEVEL', 3))
+    # Словарь zstd, обученный на документах индексов; после его замены нужно сбросить кеш.
+    CACHE_ZSTD_DICT_PATH: str = os.getenv('CACHE_ZSTD_DICT_PATH', '')
+
+    # Модели, ключи которых воркер держит у себя и сбрасывает по уведомлениям Redis (CLIENT TRACKING),
+    # через запятую, например `Film,Genre`; пусто -- выключено.
+    CACHE_TRACKING_MODELS: str = os.getenv('CACHE_TRACKING_MODELS', '')
+    CACHE_TRACKING_MAX_ENTRIES: int = int(os.getenv('CACHE_TRACKING_MAX_ENTRIES', 10_000))
+    # Раз в столько секунд соединение слежения пингуется; потеряв его, воркер сбрасывает копию и подключается заново.
+    CACHE_TRACKING_PING_INTERVAL: float = float(os.getenv('CACHE_TRACKING_PING_INTERVAL', 5))
+
+    # Узлы Redis для кеша через запятую (`host:port,host:port`), ключи распределяются
+    # консистентным хешированием; пусто -- один узел REDIS_HOST:REDIS_PORT.
+    # С несколькими узлами сервис не запускается со сбросом кеша по тегам (CACHE_INVALIDATION_ENABLED),
+    # а CLIENT TRACKING не включается.
+    REDIS_CACHE_NODES: str = os.getenv('REDIS_CACHE_NODES', '')
+    REDIS_CACHE_VIRTUAL_NODES: int = int(os.getenv('REDIS_CACHE_VIRTUAL_NODES', 160))
+
+    # Работа без кеша, когда Redis тормозит или недоступен: чтение, не уложившееся в
+    # `CACHE_READ_TIMEOUT_MS`, считается промахом (0 -- без ограничения); запись идёт через очередь
+    # на `CACHE_WRITE_QUEUE_SIZE` команд, лишние отбрасываются (0 -- запись в самом запросе);
+    # после `CACHE_BREAKER_FAILURES` ошибок подряд Redis не вызывается `CACHE_BREAKER_RESET_TIMEOUT` секунд.
+    CACHE_READ_TIMEOUT_MS: float = float(os.getenv('CACHE_READ_TIMEOUT_MS', 0))
+    CACHE_WRITE_QUEUE_SIZE: int = int(os.getenv('CACHE_WRITE_QUEUE_SIZE', 0))
+    CACHE_BREAKER_FAILURES: int = int(os.getenv('CACHE_BREAKER_FAILURES', 5))
+    CACHE_BREAKER_RESET_TIMEOUT: float = float(os.getenv('CACHE_BREAKER_RESET_TIMEOUT', 1))
+
+    # Убирать из поисковых запросов стоп-слова анализатора индексов (английские и русские).
+    SEARCH_STRIP_STOP_WORDS: bool = os.getenv('SEARCH_STRIP_STOP_WORDS', 'false').lower() == 'true'
+
+    # Кешировать первые `SEARCH_WINDOW_SIZE` id результатов поиска и отдавать страницы срезами из них; 0 -- выключено.
+    SEARCH_WINDOW_SIZE: int = int(os.getenv('SEARCH_WINDOW_SIZE', 0))
+
+    # Кешировать списки выровненными блоками по `LIST_BLOCK_SIZE` id, общими для страниц любого размера; 0 -- выключено.
+    LIST_BLOCK_SIZE: int = int(os.getenv('LIST_BLOCK_SIZE', 0))
+
+    # Подсказки для /films/suggest и /persons/suggest из префиксного индекса в памяти воркера;
+    # пока он выключен или не загружен, подсказки ищутся в Elastic.
+    SUGGEST_INDEX_ENABLED: bool = os.getenv('SUGGEST_INDEX_ENABLED', 'false').lower() == 'true'
+    SUGGEST_INDEX_REFRESH_INTERVAL: float = float(os.getenv('SUGGEST_INDEX_REFRESH_INTERVAL', 300))
+    SUGGEST_MAX_SIZE: int = int(os.getenv('SUGGEST_MAX_SIZE', 10))
+
+    # Сколько секунд кешируются фасеты списков фильмов (счётчики по жанрам, рейтингу и годам).
+    FACETS_CACHE_TTL: int = int(os.getenv('FACETS_CACHE_TTL', 15 * 60))
+
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+    @root_validator(skip_on_failure=True)
+    def check_sharded_invalidation(cls, values: dict) -> dict:
+        """Сброс по тегам удаляет ключи одним Lua-скриптом, а с несколькими узлами они лежат на разных."""
+        if values['REDIS_CACHE_NODES'] and values['CACHE_INVALIDATION_ENABLED']:
+            raise ValueError('CACHE_INVALIDATION_ENABLED can not be used with REDIS_CACHE_NODES')
+        return values
+
     class Config:
         """Env variables filename."""
 
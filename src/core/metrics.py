@@ -0,0 +1,29 @@
+"""Счётчики метрик сервиса (в пределах одного воркера)."""
+from collections import Counter
+
+
+class Metrics:
+    """Простой реестр счётчиков."""
+
+    def __init__(self) -> None:
+        self._counters: Counter = Counter()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """Увеличивает счётчик `name` на `value`."""
+        self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        """Возвращает текущее значение счётчика."""
+        return self._counters[name]
+
+    def ratio(self, hits: str, misses: str) -> float:
+        """Доля `hits` от суммы `hits` и `misses`."""
+        total = self._counters[hits] + self._counters[misses]
+        return self._counters[hits] / total if total else 0.0
+
+    def snapshot(self) -> dict[str, int]:
+        """Копия всех счётчиков."""
+        return dict(self._counters)
+
+
+metrics = Metrics()
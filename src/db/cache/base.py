@@ -1,6 +1,6 @@
 """Abstract caching class."""
 from abc import ABC, abstractmethod
-from typing import Callable, Optional, Union
+from typing import Any, Callable, Optional, Sequence, Union
 
 from pydantic import BaseModel
 
@@ -16,6 +16,18 @@ class AsyncCacheStorage(ABC):
     async def set(self, key: str, value: bytes, expire: int, **kwargs):
         pass
 
+    @abstractmethod
+    async def mget(self, key: str, *keys: str, **kwargs) -> list[Optional[bytes]]:
+        """Return the values of the keys in one round trip, `None` for the missing ones."""
+
+    @abstractmethod
+    def pipeline(self) -> Any:
+        """Return a pipeline that sends the queued commands at once on `execute`."""
+
+    @abstractmethod
+    async def eval(self, script: str, keys: list, args: list) -> Any:
+        """Run the Lua script atomically and return its result."""
+
 
 class BaseCache(ABC):
     """Base abstraction for a cache."""
@@ -32,3 +44,105 @@ class BaseCache(ABC):
         Если данных в кэше нет, ходит за ними в источник данных с помощью
         `get_from_db` и именованных аргументов `kwargs`.
         """
+
+    @abstractmethod
+    async def get_list_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            **kwargs,
+    ) -> list[BaseModel]:
+        """
+        Возвращает список сущностей из кэша.
+
+        Список может кэшироваться как упорядоченный набор id, тогда сами
+        сущности берутся из кэша `get_by_id`, а недостающие загружаются
+        одним запросом `get_by_ids`.
+        """
+
+    @abstractmethod
+    async def get_blocks_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            block_size: int,
+            max_blocks: Optional[int] = None,
+            **kwargs,
+    ) -> list[BaseModel]:
+        """
+        Возвращает страницу упорядоченного списка из кэша блоков по `block_size` id.
+
+        Блоки выровнены и не зависят от размера страницы, страница собирается
+        из одного-двух блоков, а сущности берутся из кэша `get_by_id`.
+        Страницы дальше первых `max_blocks` блоков загружаются как обычно.
+        """
+
+    @abstractmethod
+    async def get_many_from_cache_or_db(
+            self,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            entity_ids: list[str],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[BaseModel]:
+        """
+        Возвращает сущности по списку id в том же порядке.
+
+        Сущности берутся из кэша `get_by_id`, недостающие загружаются
+        одним запросом `get_by_ids`.
+        """
+
+    @abstractmethod
+    async def get_page_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            **kwargs,
+    ) -> tuple[list[BaseModel], Optional[str]]:
+        """
+        Возвращает страницу сущностей и курсор следующей страницы из кэша.
+
+        `get_from_db` должен вернуть словарь с `items` и `next_cursor`.
+        """
+
+    @abstractmethod
+    async def get_response_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            to_response: Callable[[BaseModel], BaseModel],
+            get_entities: Optional[Callable] = None,
+            **kwargs,
+    ) -> Optional[bytes]:
+        """
+        Возвращает готовый JSON ответа API из кэша.
+
+        Если ответа в кэше нет, строит его из сущностей, полученных через
+        `get_entities` (по умолчанию `get_from_cache_or_db`), с помощью `to_response`.
+        """
+
+    @abstractmethod
+    async def get_facets_from_cache_or_db(self, get_from_db: Callable, **kwargs) -> dict:
+        """
+        Возвращает фасеты сущностей, подходящих под `kwargs`, из кэша.
+
+        Если фасетов в кэше нет, считает их вызовом `get_from_db`.
+        """
+
+    @abstractmethod
+    async def get_cached_facets(self, get_from_db: Callable, **kwargs) -> Optional[dict]:
+        """Возвращает фасеты сущностей, подходящих под `kwargs`, если они есть в кэше, иначе `None`."""
+
+    @abstractmethod
+    async def set_facets(self, get_from_db: Callable, facets: dict, **kwargs) -> None:
+        """Кладёт в кэш фасеты, посчитанные вместе со страницей, как если бы их вернул `get_from_db`."""
+
+    @abstractmethod
+    async def invalidate(self, entity_ids: list[str], lists: Sequence[dict] = ()) -> int:
+        """
+        Удаляет из кэша все записи, построенные по сущностям `entity_ids`.
+
+        Вместе с ними удаляются списки с фильтрами из `lists` (`{}` -- списки
+        без фильтров), в которых изменённые сущности могли появиться.
+        Возвращает число удалённых записей.
+        """
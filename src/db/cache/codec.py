@@ -0,0 +1,110 @@
+"""Compression of the cached values."""
+import struct
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+import lz4.frame
+import zstandard
+
+from core.config import settings
+
+NONE = 'none'
+ZSTD = 'zstd'
+LZ4 = 'lz4'
+
+# Neither JSON nor the envelope (b'\x01') starts with these bytes, so plain
+# and compressed values written by different versions are read alike.
+ZSTD_MARKER = b'\x02'
+ZSTD_DICT_MARKER = b'\x03'
+LZ4_MARKER = b'\x04'
+DICT_ID = struct.Struct('!I')
+
+_zstd_decompressor = zstandard.ZstdDecompressor()
+# Decompressors of the loaded dictionaries by the dictionary id.
+_dict_decompressors: dict[int, zstandard.ZstdDecompressor] = {}
+
+
+class DecodeError(ValueError):
+    """The cached value can not be restored: it is corrupt, truncated or compressed with an unknown dictionary."""
+
+
+class UnknownDictionaryError(DecodeError):
+    """The value is compressed with a dictionary that is not loaded."""
+
+
+@dataclass
+class Compressor:
+    """
+    Compresses the values of at least `threshold` bytes with the codec.
+
+    A value is kept as is when compression does not make it smaller.
+    """
+
+    codec: str = NONE
+    threshold: int = 1024
+    level: int = 3
+    dictionary: Optional[zstandard.ZstdCompressionDict] = None
+    _zstd: Optional[zstandard.ZstdCompressor] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Check the codec and prepare the zstd compressor, registering its dictionary for decompression."""
+        if self.codec not in (NONE, ZSTD, LZ4):
+            raise ValueError(f'Unknown cache compression codec: {self.codec}')
+        if self.codec == ZSTD:
+            self._zstd = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary)
+            if self.dictionary is not None:
+                _dict_decompressors[self.dictionary.dict_id()] = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+
+    def compress(self, data: bytes) -> bytes:
+        """Return the compressed value with the codec marker or the data itself."""
+        if self.codec == NONE or len(data) < self.threshold:
+            return data
+        if self.codec == LZ4:
+            compressed = LZ4_MARKER + lz4.frame.compress(data)
+        elif self.dictionary is not None:
+            compressed = ZSTD_DICT_MARKER + DICT_ID.pack(self.dictionary.dict_id()) + self._zstd.compress(data)
+        else:
+            compressed = ZSTD_MARKER + self._zstd.compress(data)
+        return compressed if len(compressed) < len(data) else data
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Restore the value written by any `Compressor`, plain values are returned as is.
+
+    Raises `DecodeError` if the value can not be restored.
+    """
+    marker = data[:1]
+    try:
+        if marker == ZSTD_MARKER:
+            return _zstd_decompressor.decompress(data[1:])
+        if marker == ZSTD_DICT_MARKER:
+            dict_id, = DICT_ID.unpack_from(data, 1)
+            decompressor = _dict_decompressors.get(dict_id)
+            if decompressor is None:
+                raise UnknownDictionaryError(f'Zstandard dictionary {dict_id} is not loaded')
+            return decompressor.decompress(data[1 + DICT_ID.size:])
+        if marker == LZ4_MARKER:
+            return lz4.frame.decompress(data[1:])
+    except (zstandard.ZstdError, RuntimeError, struct.error) as exc:
+        # lz4 reports corrupt frames with RuntimeError.
+        raise DecodeError(f'Cached value can not be decompressed: {exc}') from exc
+    return data
+
+
+def load_dictionary(path: str) -> zstandard.ZstdCompressionDict:
+    """Read the dictionary trained with `train_zstd_dictionary.py`."""
+    with open(path, 'rb') as dictionary_file:
+        return zstandard.ZstdCompressionDict(dictionary_file.read())
+
+
+@lru_cache()
+def get_compressor() -> Compressor:
+    """Compressor configured by the settings, shared by all the caches."""
+    return Compressor(
+        codec=settings.CACHE_COMPRESSION,
+        threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+        level=settings.CACHE_ZSTD_LEVEL,
+        dictionary=load_dictionary(settings.CACHE_ZSTD_DICT_PATH) if settings.CACHE_ZSTD_DICT_PATH else None,
+    )
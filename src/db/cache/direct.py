@@ -0,0 +1,109 @@
+"""Pass-through cache for data providers that are fast enough on their own."""
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Type, Union
+
+import orjson
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+
+from db.cache.base import BaseCache
+
+
+@dataclass
+class DirectCache(BaseCache):
+    """
+    Builds the models straight from the data provider without caching.
+
+    Used for in-memory data providers, where a round trip to Redis
+    would be slower than the lookup itself.
+    """
+
+    model_class: Type[BaseModel]
+
+    async def get_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            **kwargs,
+    ) -> Union[Optional[BaseModel], list[BaseModel]]:
+        """Load the entity or the list of entities from the data provider."""
+        data = await get_from_db(**kwargs)
+        if isinstance(data, list):
+            return [self.model_class(**entity) for entity in data]
+        return self.model_class(**data) if data is not None else None
+
+    async def get_list_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            **kwargs,
+    ) -> list[BaseModel]:
+        """Load the list of entities from the data provider."""
+        return await self.get_from_cache_or_db(get_from_db, **kwargs)
+
+    async def get_blocks_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            block_size: int,
+            max_blocks: Optional[int] = None,
+            **kwargs,
+    ) -> list[BaseModel]:
+        """Load the page straight from the data provider, the blocks are not needed."""
+        return await self.get_from_cache_or_db(get_from_db, **kwargs)
+
+    async def get_many_from_cache_or_db(
+            self,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            entity_ids: list[str],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[BaseModel]:
+        """Load the entities by ids in one call, skipping the missing ones."""
+        entities = await get_by_ids(entity_ids, source=source)
+        return [self.model_class(**entity) for entity in entities if entity is not None]
+
+    async def get_page_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            **kwargs,
+    ) -> tuple[list[BaseModel], Optional[str]]:
+        """Load the page of entities and the cursor of the next page."""
+        page = await get_from_db(**kwargs)
+        return [self.model_class(**entity) for entity in page['items']], page['next_cursor']
+
+    async def get_response_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            to_response: Callable[[BaseModel], BaseModel],
+            get_entities: Optional[Callable] = None,
+            **kwargs,
+    ) -> Optional[bytes]:
+        """Build the serialized API response from the loaded entities."""
+        get_entities = get_entities or self.get_from_cache_or_db
+        data = await get_entities(get_from_db, **kwargs)
+        if data is None:
+            return None
+        if isinstance(data, list):
+            return orjson.dumps([to_response(entity) for entity in data], default=pydantic_encoder)
+        return orjson.dumps(to_response(data), default=pydantic_encoder)
+
+    async def get_facets_from_cache_or_db(self, get_from_db: Callable, **kwargs) -> dict:
+        """Load the facets from the data provider."""
+        return await get_from_db(**kwargs)
+
+    async def get_cached_facets(self, get_from_db: Callable, **kwargs) -> Optional[dict]:
+        """Nothing is cached."""
+        return None
+
+    async def set_facets(self, get_from_db: Callable, facets: dict, **kwargs) -> None:
+        """Nothing is cached."""
+
+    async def invalidate(self, entity_ids: list[str], lists: Sequence[dict] = ()) -> int:
+        """Nothing is cached, so there is nothing to drop."""
+        return 0
+
+    def hit_ratios(self) -> dict[str, float]:
+        """Nothing is cached, so there are no cache tiers."""
+        return {}
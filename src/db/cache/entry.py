@@ -0,0 +1,67 @@
+"""Cache entry envelope with the refresh metadata."""
+import math
+import random
+import struct
+from dataclasses import dataclass
+from typing import Optional, Type
+
+from db.cache.codec import DecodeError, decompress
+
+# JSON never starts with this byte, so entries without the envelope
+# (written before it was introduced) are still readable.
+ENVELOPE_MARKER = b'\x01'
+HEADER = struct.Struct('!dd')
+
+
+@dataclass
+class CacheEntry:
+    """Serialized data with the time it took to compute and its logical expiry."""
+
+    data: bytes
+    delta: float = 0.0
+    expiry: Optional[float] = None
+
+    def pack(self) -> bytes:
+        """Serialize the entry with the envelope header."""
+        return ENVELOPE_MARKER + HEADER.pack(self.delta, self.expiry or 0.0) + self.data
+
+    @classmethod
+    def unpack(cls: Type['CacheEntry'], raw: bytes) -> 'CacheEntry':
+        """
+        Deserialize the entry, plain values are returned without metadata, compressed -- decompressed.
+
+        Raises `DecodeError` if the entry is truncated or can not be decompressed.
+        """
+        if not raw.startswith(ENVELOPE_MARKER):
+            return cls(data=decompress(raw))
+        try:
+            delta, expiry = HEADER.unpack_from(raw, len(ENVELOPE_MARKER))
+        except struct.error as exc:
+            raise DecodeError(f'Cache entry header is truncated: {exc}') from exc
+        return cls(
+            data=decompress(raw[len(ENVELOPE_MARKER) + HEADER.size:]),
+            delta=delta,
+            expiry=expiry or None,
+        )
+
+    def is_stale(self, now: float) -> bool:
+        """Whether the entry is past its logical expiry."""
+        return self.expiry is not None and now >= self.expiry
+
+    def should_refresh_early(self, now: float, beta: float) -> bool:
+        """
+        XFetch: probabilistic early recomputation.
+
+        The closer the expiry and the longer the computation, the higher
+        the chance to refresh the entry before it expires.
+        """
+        if self.expiry is None or beta <= 0:
+            return False
+        return now - self.delta * beta * math.log(1 - random.random()) >= self.expiry
+
+
+def jitter_ttl(ttl: int, jitter: float) -> int:
+    """Spread the TTL randomly by +-`jitter` share of it."""
+    if jitter <= 0:
+        return ttl
+    return max(1, round(ttl * (1 + random.uniform(-jitter, jitter))))
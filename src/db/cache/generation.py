@@ -0,0 +1,69 @@
+"""Per-model generations of the cache keyspace."""
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aioredis import Redis
+
+from core.metrics import metrics
+
+SWEEP_BATCH_SIZE = 500
+
+
+def get_namespace(name: str, generation: int) -> str:
+    """Prefix of the cache keys of the model in the generation."""
+    return f'{name}:g{generation}'
+
+
+@dataclass
+class Generation:
+    """
+    Generation counter of the model keyspace stored in Redis.
+
+    The value is cached in-process for `check_interval` seconds, so the
+    other workers switch to a new generation within that time.
+    """
+
+    cache_client: Redis
+    name: str
+    check_interval: float = 1.0
+    _value: Optional[int] = field(default=None, init=False, repr=False)
+    _checked_at: float = field(default=float('-inf'), init=False, repr=False)
+
+    @property
+    def key(self) -> str:
+        """Redis key of the counter."""
+        return f'Generation:{self.name}'
+
+    async def get(self) -> int:
+        """Return the current generation."""
+        now = time.monotonic()
+        if self._value is None or now - self._checked_at >= self.check_interval:
+            value = await self.cache_client.get(self.key)
+            self._value = int(value) if value else 0
+            self._checked_at = now
+        return self._value
+
+    async def bump(self) -> int:
+        """Start a new generation, all the keys of the previous ones become unreachable."""
+        self._value = await self.cache_client.incr(self.key)
+        self._checked_at = time.monotonic()
+        metrics.incr(f'cache.{self.name}.generation.bumps')
+        return self._value
+
+
+async def sweep(cache_client: Redis, pattern: str) -> int:
+    """
+    Remove the keys matching the pattern and return their number.
+
+    SCAN walks the keyspace in small steps and UNLINK frees the values in
+    a background thread, so Redis is not blocked on a big keyspace.
+    """
+    removed = 0
+    cursor = 0
+    while True:
+        cursor, keys = await cache_client.scan(cursor, match=pattern, count=SWEEP_BATCH_SIZE)
+        if keys:
+            removed += await cache_client.unlink(*keys)
+        if not cursor:
+            return removed
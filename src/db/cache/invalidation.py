@@ -0,0 +1,91 @@
+"""Cache invalidation driven by the change feed in a Redis Stream."""
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Union
+
+from aioredis import Redis
+
+from core.metrics import metrics
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+# Сколько последних событий хранить в потоке.
+STREAM_MAX_LEN = 100_000
+RETRY_DELAY = 1.0
+
+logger = logging.getLogger(__name__)
+
+InvalidationHandler = Callable[[list[str], bool], Awaitable]
+
+
+async def publish_change(cache_client: Redis, stream: str, entity: str, entity_id: str, op: str = UPSERT) -> bytes:
+    """Publish the change of the entity (`film`, `person`, `genre`) to the stream."""
+    if op not in (UPSERT, DELETE):
+        raise ValueError(f'Unknown operation: {op}')
+    return await cache_client.xadd(
+        stream,
+        {'entity': entity, 'id': entity_id, 'op': op},
+        max_len=STREAM_MAX_LEN,
+        exact_len=False,
+    )
+
+
+@dataclass
+class InvalidationConsumer:
+    """
+    Reads the change feed and invalidates the caches of the changed entities.
+
+    Every worker reads the whole stream on its own (no consumer group), so
+    each of them also drops its per-process caches. Events of one batch are
+    grouped by entity type and operation, and every handler of the entity
+    type is called with the ids and the `deleted` flag.
+    """
+
+    cache_client: Redis
+    stream: str
+    handlers: dict[str, list[InvalidationHandler]]
+    block_ms: int = 5000
+    batch_size: int = 500
+
+    async def run(self) -> None:
+        """Consume the events published after the start until cancelled."""
+        latest_id = '$'
+        while True:
+            try:
+                messages = await self.cache_client.xread(
+                    [self.stream],
+                    timeout=self.block_ms,
+                    count=self.batch_size,
+                    latest_ids=[latest_id],
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Change feed %s is not read', self.stream)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            if not messages:
+                continue
+            latest_id = messages[-1][1]
+            await self.handle([fields for _, _, fields in messages])
+
+    async def handle(self, events: list[dict]) -> None:
+        """Invalidate the caches for the batch of events."""
+        changes = defaultdict(list)
+        for event in events:
+            event = {_decode(name): _decode(value) for name, value in event.items()}
+            changes[event['entity'], event['op'] == DELETE].append(event['id'])
+        for (entity, deleted), entity_ids in changes.items():
+            metrics.incr(f'invalidation.{entity}.events', len(entity_ids))
+            for handler in self.handlers.get(entity, []):
+                try:
+                    await handler(entity_ids, deleted)
+                except Exception:
+                    logger.exception('Caches of %s %s are not invalidated', entity, entity_ids)
+
+
+def _decode(value: Union[bytes, str]) -> str:
+    """Stream fields come as bytes."""
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,63 @@
+"""In-process LRU cache tier."""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class LocalCache:
+    """
+    Per-worker LRU cache of serialized values.
+
+    Bounded both by the number of entries and by the total size of values
+    in bytes. Every entry lives no longer than `ttl` seconds.
+    """
+
+    max_entries: int
+    max_bytes: int
+    ttl: float
+    _entries: OrderedDict = field(default_factory=OrderedDict, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value or `None` if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store the value evicting the least recently used entries."""
+        if len(value) > self.max_bytes:
+            return
+        self.delete(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        self._entries[key] = (expires_at, value)
+        self._size += len(value)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def delete(self, key: str) -> None:
+        """Remove the entry if it exists."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self._size = 0
+
+
+def get_local_cache(max_entries: int, max_bytes: int, ttl: float) -> Optional[LocalCache]:
+    """Return the local cache tier or `None` if it is disabled in settings."""
+    if max_entries <= 0 or max_bytes <= 0 or ttl <= 0:
+        return None
+    return LocalCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
@@ -0,0 +1,39 @@
+"""Short-lived Redis lock shared by all service workers."""
+import uuid
+from dataclasses import dataclass, field
+
+from aioredis import Redis
+
+from db.cache.base import AsyncCacheStorage
+
+# Удаляем ключ, только если блокировка всё ещё принадлежит нам.
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class RedisLock:
+    """Lock based on `SET key token NX PX ttl`."""
+
+    cache_client: AsyncCacheStorage
+    key: str
+    ttl_ms: int
+    token: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    async def acquire(self) -> bool:
+        """Try to take the lock without waiting."""
+        return bool(await self.cache_client.set(
+            self.key, self.token, pexpire=self.ttl_ms, exist=Redis.SET_IF_NOT_EXIST,
+        ))
+
+    async def release(self) -> None:
+        """Release the lock if it has not expired yet."""
+        await self.cache_client.eval(RELEASE_SCRIPT, keys=[self.key], args=[self.token])
+
+    async def is_locked(self) -> bool:
+        """Check whether anyone holds the lock."""
+        return await self.cache_client.get(self.key) is not None
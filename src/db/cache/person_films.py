@@ -0,0 +1,191 @@
+"""Reverse index person -> films stored in Redis."""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from aioredis import Redis
+from aioredis.commands import Pipeline
+
+from core.metrics import metrics
+from db.cache.lock import RedisLock
+from db.cache.resilience import REDIS_ERRORS, CircuitBreaker, get_circuit_breaker
+from db.data_providers.films import PERSON_ROLES, FilmsDataProvider
+
+BUILD_LOCK_TTL_MS = 10 * 60 * 1000
+PIPELINE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PersonFilmsIndex:
+    """
+    Film ids of every person ordered by the IMDB rating.
+
+    Every build writes a new version of the index:
+    `PersonFilms:<version>:<person_id>` is a sorted set of film ids scored
+    with the rating, `FilmPersons:<version>:<film_id>` is a set of person ids
+    of the film that is used to update the index incrementally.
+    `PersonFilms:built` holds the current version and expires after
+    `rebuild_interval` seconds, so the next build starts from scratch and
+    the keys of the old versions expire on their own.
+
+    The index is only a shortcut: while it is not built or Redis fails,
+    `get_film_ids` returns `None` and the films are searched in Elastic.
+    """
+
+    cache_client: Redis
+    db: FilmsDataProvider
+    prefix: str = 'PersonFilms'
+    rebuild_interval: int = 60 * 60
+    check_interval: float = 60.0
+    read_timeout: float = 0.0
+    breaker: Optional[CircuitBreaker] = field(default_factory=get_circuit_breaker)
+
+    async def get_film_ids(self, person_id: str, page_size: int, page_number: int) -> Optional[list[str]]:
+        """Return the page of film ids or `None` if the index is not built yet or Redis fails."""
+        version = await self._get_version()
+        if version is None:
+            return None
+        start = (page_number - 1) * page_size
+        return await self._call(lambda: self.cache_client.zrevrange(
+            self._person_key(version, person_id), start, start + page_size - 1, encoding='utf-8',
+        ))
+
+    async def run(self) -> None:
+        """Build the index whenever its version expires, checking every `check_interval` seconds."""
+        while True:
+            try:
+                await self.build_once()
+            except Exception:
+                logger.exception('Person films index is not built')
+            await asyncio.sleep(self.check_interval)
+
+    async def build_once(self) -> None:
+        """Build the index unless it is built or being built by another worker."""
+        if await self.cache_client.exists(self._built_key):
+            return
+        lock = RedisLock(cache_client=self.cache_client, key=f'{self.prefix}:lock', ttl_ms=BUILD_LOCK_TTL_MS)
+        if not await lock.acquire():
+            return
+        try:
+            await self.build()
+        finally:
+            await lock.release()
+
+    async def build(self) -> None:
+        """Build a new version of the index from all the films and make it current."""
+        version = uuid.uuid4().hex
+        pipeline = self.cache_client.pipeline()
+        commands = 0
+        films = 0
+        async for film in self.db.iter_all(source=self._film_source()):
+            self._add_film(pipeline, version, film, self._get_person_ids(film))
+            films += 1
+            commands += 1
+            if commands >= PIPELINE_SIZE:
+                await pipeline.execute()
+                pipeline = self.cache_client.pipeline()
+                commands = 0
+        pipeline.set(self._built_key, version, expire=self.rebuild_interval)
+        await pipeline.execute()
+        metrics.incr('person_films.builds')
+        logger.info('Person films index %s is built from %d films', version, films)
+
+    async def update_film(self, film: dict) -> None:
+        """Update the index after the film was created or changed."""
+        version = await self._get_version()
+        if version is None:
+            return
+        person_ids = self._get_person_ids(film)
+        stale_ids = set(await self._get_film_person_ids(version, film['id'])) - person_ids
+        pipeline = self.cache_client.pipeline()
+        self._remove_film(pipeline, version, film['id'], stale_ids)
+        self._add_film(pipeline, version, film, person_ids)
+        await self._call(pipeline.execute)
+
+    async def remove_film(self, film_id: str) -> None:
+        """Update the index after the film was deleted."""
+        version = await self._get_version()
+        if version is None:
+            return
+        person_ids = await self._get_film_person_ids(version, film_id)
+        pipeline = self.cache_client.pipeline()
+        self._remove_film(pipeline, version, film_id, person_ids)
+        pipeline.delete(self._film_key(version, film_id))
+        await self._call(pipeline.execute)
+
+    def _add_film(self, pipeline: Pipeline, version: str, film: dict, person_ids: Iterable[str]) -> None:
+        """Queue the commands adding the film to its persons."""
+        film_key = self._film_key(version, film['id'])
+        pipeline.delete(film_key)
+        for person_id in person_ids:
+            person_key = self._person_key(version, person_id)
+            pipeline.zadd(person_key, film.get('imdb_rating') or 0, film['id'])
+            pipeline.expire(person_key, self._keys_ttl)
+            pipeline.sadd(film_key, person_id)
+        pipeline.expire(film_key, self._keys_ttl)
+
+    def _remove_film(self, pipeline: Pipeline, version: str, film_id: str, person_ids: Iterable[str]) -> None:
+        """Queue the commands removing the film from the persons."""
+        for person_id in person_ids:
+            pipeline.zrem(self._person_key(version, person_id), film_id)
+
+    async def _get_version(self) -> Optional[str]:
+        """Return the current version of the index, `None` if it is not built or Redis fails."""
+        return await self._call(lambda: self.cache_client.get(self._built_key, encoding='utf-8'))
+
+    async def _get_film_person_ids(self, version: str, film_id: str) -> list[str]:
+        """Person ids the film is indexed for."""
+        person_ids = await self._call(
+            lambda: self.cache_client.smembers(self._film_key(version, film_id), encoding='utf-8'),
+        )
+        return person_ids or []
+
+    async def _call(self, command: Callable[[], Awaitable]) -> Any:
+        """Run the Redis command within `read_timeout`, `None` if the breaker is open or Redis fails."""
+        if self.breaker is not None and not self.breaker.allow():
+            metrics.incr('person_films.degraded.breaker_open')
+            return None
+        try:
+            if self.read_timeout > 0:
+                result = await asyncio.wait_for(command(), self.read_timeout)
+            else:
+                result = await command()
+        except REDIS_ERRORS as exc:
+            metrics.incr('person_films.degraded.errors')
+            logger.debug('Person films index is unavailable: %r', exc)
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            return None
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return result
+
+    @staticmethod
+    def _get_person_ids(film: dict) -> set[str]:
+        """Ids of all the persons of the film."""
+        return {person['id'] for role in PERSON_ROLES for person in film.get(role) or []}
+
+    @staticmethod
+    def _film_source() -> list[str]:
+        """Fields of the film documents needed for the index."""
+        return ['id', 'imdb_rating'] + [f'{role}.id' for role in PERSON_ROLES]
+
+    @property
+    def _built_key(self) -> str:
+        return f'{self.prefix}:built'
+
+    @property
+    def _keys_ttl(self) -> int:
+        """Return the TTL of the keys of a version: they outlive it, so the reads do not miss them during a rebuild."""
+        return 2 * self.rebuild_interval
+
+    def _person_key(self, version: str, person_id: str) -> str:
+        return f'{self.prefix}:{version}:{person_id}'
+
+    @staticmethod
+    def _film_key(version: str, film_id: str) -> str:
+        return f'FilmPersons:{version}:{film_id}'
@@ -1,16 +1,45 @@
 """Caching API queries."""
-from dataclasses import dataclass
-from typing import Callable, Optional, Type, Union
+import asyncio
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence, Type, Union
 
 import orjson
 from aioredis import Redis
+from aioredis.commands import Pipeline
 from pydantic import BaseModel
 from pydantic.json import pydantic_encoder
 
+from core.config import settings
+from core.metrics import metrics
 from db.cache.base import AsyncCacheStorage
+from db.cache.codec import Compressor, DecodeError, get_compressor
+from db.cache.entry import CacheEntry, jitter_ttl
+from db.cache.generation import Generation, get_namespace, sweep
+from db.cache.local import LocalCache
+from db.cache.lock import RedisLock
+from db.cache.resilience import REDIS_ERRORS, CircuitBreaker, WriteQueue, get_circuit_breaker, get_write_queue
 
 DEFAULT_TIME_TO_LIVE = 60 * 5
 
+# Атомарно переименовываем тег, если он есть: ключи, записанные после этого, попадут уже
+# в новый тег, а переименованный разбирается пачками вне Lua, не блокируя Redis.
+DETACH_TAG_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+    redis.call('rename', KEYS[1], KEYS[2])
+    return 1
+end
+return 0
+"""
+TAG_DRAIN_BATCH_SIZE = 500
+# Параметры страницы списка; остальные параметры -- фильтры, по которым списки тегируются.
+PAGING_PARAMS = frozenset(('page_size', 'page_number', 'sort', 'cursor', 'source'))
+
+logger = logging.getLogger(__name__)
+
 redis: Optional[Redis] = None
 
 
@@ -19,13 +48,54 @@ async def get_redis() -> Redis:
     return redis
 
 
+def get_cache_ttl(default: int) -> int:
+    """Return the TTL of the cache entries, longer when they are invalidated by the change feed."""
+    return settings.CACHE_INVALIDATION_TTL if settings.CACHE_INVALIDATION_ENABLED else default
+
+
 @dataclass
 class Cache:
-    """Caches queries with Redis."""
+    """
+    Caches queries with Redis.
+
+    The cache fails open: a Redis read that errors or does not fit into
+    `read_timeout` is a miss, and the data comes from the data source.
+    Writes go through `write_queue` when it is set, so a slow Redis does not
+    hold the response, and `breaker` keeps the requests off a failing Redis.
+    """
 
     cache_client: AsyncCacheStorage
     model_class: Type[BaseModel]
     ttl: int = DEFAULT_TIME_TO_LIVE
+    local_cache: Optional[LocalCache] = None
+    use_lock: bool = settings.CACHE_LOCK_ENABLED
+    lock_ttl_ms: int = settings.CACHE_LOCK_TTL_MS
+    lock_poll_interval: float = settings.CACHE_LOCK_POLL_INTERVAL
+    stale_ttl: int = settings.CACHE_STALE_TTL
+    xfetch_beta: float = settings.CACHE_XFETCH_BETA
+    ttl_jitter: float = settings.CACHE_TTL_JITTER
+    normalize_lists: bool = settings.CACHE_NORMALIZED_LISTS
+    tag_entries: bool = settings.CACHE_INVALIDATION_ENABLED
+    use_generations: bool = settings.CACHE_GENERATIONS_ENABLED
+    compressor: Compressor = field(default_factory=get_compressor)
+    facets_ttl: int = settings.FACETS_CACHE_TTL
+    search_ttl: int = settings.CACHE_SEARCH_TTL
+    read_timeout: float = settings.CACHE_READ_TIMEOUT_MS / 1000
+    breaker: Optional[CircuitBreaker] = field(default_factory=get_circuit_breaker)
+    write_queue: Optional[WriteQueue] = field(default_factory=get_write_queue)
+    _in_flight: dict[str, asyncio.Task] = field(default_factory=dict, init=False, repr=False)
+    _generation: Optional[Generation] = field(default=None, init=False, repr=False)
+    _namespace: str = field(default='', init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Start with the keys of the model without a generation, set up the generation counter if enabled."""
+        self._namespace = self.model_class.__name__
+        if self.use_generations:
+            self._generation = Generation(
+                cache_client=self.cache_client,
+                name=self.model_class.__name__,
+                check_interval=settings.CACHE_GENERATION_CHECK_INTERVAL,
+            )
 
     async def get_from_cache_or_db(
             self,
@@ -33,15 +103,634 @@ class Cache:
             **kwargs,
     ) -> Union[Optional[BaseModel], list[BaseModel]]:
         """Retrieve the data from the data source for further caching."""
+        await self._sync_namespace()
         key = self._get_caching_key(get_from_db, **kwargs)
-        cached_data = await self.cache_client.get(key)
-        if cached_data:
-            data = cached_data
-        else:
-            data_raw = await get_from_db(**kwargs)
-            data = orjson.dumps(data_raw, default=pydantic_encoder)
-            await self.cache_client.set(key, data, expire=self.ttl)
+        return self._load(await self._get_data(key, get_from_db, **kwargs))
+
+    async def get_list_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            **kwargs,
+    ) -> list[BaseModel]:
+        """
+        Retrieve the list of entities.
+
+        With `normalize_lists` only the ordered IDs are cached for the query.
+        The entities are hydrated from the `get_by_id` entries with one MGET,
+        the missing ones are loaded with a single `get_by_ids` call.
+        """
+        if not self.normalize_lists:
+            return await self.get_from_cache_or_db(get_from_db, **kwargs)
+
+        await self._sync_namespace()
+        loaded: dict[str, dict] = {}
+        source = kwargs.get('source')
+
+        async def get_ids(**ids_kwargs) -> list[str]:
+            entities = await get_from_db(**ids_kwargs)
+            await self._set_entities(get_by_id, entities, source)
+            loaded.update((entity['id'], entity) for entity in entities)
+            return [entity['id'] for entity in entities]
+
+        key = f'{self._get_caching_key(get_from_db, **kwargs)}:ids'
+        ids = orjson.loads(await self._get_data(key, get_ids, **kwargs))
+        entities = await self._hydrate(ids, get_by_id, get_by_ids, loaded, source)
+        return [self.model_class(**entity) for entity in entities]
+
+    async def get_blocks_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            block_size: int,
+            page_size: int,
+            page_number: int = 1,
+            source: Optional[Sequence[str]] = None,
+            max_blocks: Optional[int] = None,
+            **kwargs,
+    ) -> list[BaseModel]:
+        """
+        Retrieve the page of a ranked list from the cached blocks of ids.
+
+        The ids are loaded with `get_from_db` and cached in aligned blocks of
+        `block_size`, whatever the page size, so pages of any size share the
+        same entries and a page is sliced from one or two blocks. The
+        entities of the page are hydrated from the `get_by_id` entries.
+        With `max_blocks` the pages reaching past the first blocks are
+        loaded as usual.
+        """
+        start = (page_number - 1) * page_size
+        first, last = start // block_size, (start + page_size - 1) // block_size
+        if max_blocks is not None and last >= max_blocks:
+            metrics.incr(self._metric('blocks', 'past_limit'))
+            return await self.get_list_from_cache_or_db(
+                get_from_db, get_by_id, get_by_ids,
+                page_size=page_size, page_number=page_number, source=source, **kwargs,
+            )
+
+        await self._sync_namespace()
+
+        async def get_ids(**ids_kwargs) -> list[str]:
+            return [entity['id'] for entity in await get_from_db(**ids_kwargs)]
+
+        key = self._get_caching_key(get_from_db, **kwargs)
+        blocks = await asyncio.gather(*(
+            self._get_data(
+                f'{key}:block={block_size}:{number}', get_ids,
+                page_size=block_size, page_number=number + 1, source=('id',), **kwargs,
+            )
+            for number in range(first, last + 1)
+        ))
+        ids = [entity_id for block in blocks for entity_id in orjson.loads(block)]
+        offset = start - first * block_size
+        entities = await self._hydrate(ids[offset:offset + page_size], get_by_id, get_by_ids, {}, source)
+        return [self.model_class(**entity) for entity in entities]
+
+    async def get_many_from_cache_or_db(
+            self,
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            entity_ids: list[str],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[BaseModel]:
+        """Retrieve the entities by ids from the `get_by_id` entries, loading the missing ones at once."""
+        await self._sync_namespace()
+        entities = await self._hydrate(entity_ids, get_by_id, get_by_ids, {}, source)
+        return [self.model_class(**entity) for entity in entities]
+
+    async def get_page_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            **kwargs,
+    ) -> tuple[list[BaseModel], Optional[str]]:
+        """Retrieve the page of entities and the cursor of the next page."""
+        await self._sync_namespace()
+        key = self._get_caching_key(get_from_db, **kwargs)
+        page = orjson.loads(await self._get_data(key, get_from_db, **kwargs))
+        return [self.model_class(**entity) for entity in page['items']], page['next_cursor']
+
+    async def get_response_from_cache_or_db(
+            self,
+            get_from_db: Callable,
+            to_response: Callable[[BaseModel], BaseModel],
+            get_entities: Optional[Callable] = None,
+            **kwargs,
+    ) -> Optional[bytes]:
+        """
+        Retrieve the serialized API response.
+
+        On a hit the cached bytes are returned as is, without building
+        any models. On a miss the entities are loaded with `get_entities`
+        (`get_from_cache_or_db` by default), mapped with `to_response`,
+        and the result is serialized and cached.
+        """
+        await self._sync_namespace()
+        get_entities = get_entities or self.get_from_cache_or_db
+
+        async def render(**render_kwargs) -> Union[Optional[BaseModel], list[BaseModel]]:
+            data = await get_entities(get_from_db, **render_kwargs)
+            if isinstance(data, list):
+                return [to_response(entity) for entity in data]
+            return to_response(data) if data is not None else None
+
+        key = f'{self._get_caching_key(get_from_db, **kwargs)}:response'
+        data = await self._get_data(key, render, **kwargs)
+        return None if data == b'null' else data
+
+    async def get_facets_from_cache_or_db(self, get_from_db: Callable, **kwargs) -> dict:
+        """
+        Retrieve the facets of the entities matching the `kwargs`.
+
+        The facets are cached for `facets_ttl`, which may be longer than
+        the TTL of the pages, as the counts change slowly. With tagged
+        entries the facets of search results live no longer than `search_ttl`.
+        """
+        facets = await self.get_cached_facets(get_from_db, **kwargs)
+        if facets is not None:
+            return facets
+        facets = await get_from_db(**kwargs)
+        await self.set_facets(get_from_db, facets, **kwargs)
+        return facets
+
+    async def get_cached_facets(self, get_from_db: Callable, **kwargs) -> Optional[dict]:
+        """Return the cached facets of the entities matching the `kwargs`, `None` if they are not cached."""
+        await self._sync_namespace()
+        key = self._get_caching_key(get_from_db, **kwargs)
+        cached_data = await self._get(key)
+        entry = await self._unpack(key, cached_data) if cached_data else None
+        return orjson.loads(entry.data) if entry is not None else None
+
+    async def set_facets(self, get_from_db: Callable, facets: dict, **kwargs) -> None:
+        """
+        Cache the facets as if they were loaded by `get_from_db` with the `kwargs`.
+
+        Lets a page query that counted the facets along with the hits fill
+        the entry, so the facets do not need a query of their own.
+        """
+        await self._sync_namespace()
+        key = self._get_caching_key(get_from_db, **kwargs)
+        ttl = self.facets_ttl
+        if self.tag_entries and self._is_search(kwargs):
+            ttl = min(ttl, self.search_ttl)
+        data, ttl = self._pack(orjson.dumps(facets), ttl=ttl)
+        await self._set(key, data, ttl)
+        if self.tag_entries:
+            pipeline = self.cache_client.pipeline()
+            self._tag(pipeline, key, [], ttl, lists=self._get_list_filters(kwargs))
+            await self._write(pipeline.execute)
+
+    async def invalidate(self, entity_ids: list[str], lists: Sequence[dict] = ()) -> int:
+        """
+        Drop every cached entry that references the entities, and the lists matching the filters of `lists`.
+
+        Entries are found by the tag sets filled at write time: every entity
+        has its own tag, and every list is tagged by its filters (`{}` for
+        the lists without filters). The caller passes the filters of the
+        lists a changed entity may enter or move in. Search results are not
+        tagged by filters, any change may affect them, so they only live
+        for `search_ttl`. The tags are detached atomically and drained in
+        batches, so a big tag does not block Redis. The local tier is
+        cleared as a whole because other workers can not see its keys.
+        Returns the number of dropped entries.
+        """
+        await self._sync_namespace()
+        tag_keys = [self._get_tag_key(entity_id) for entity_id in entity_ids]
+        tag_keys.extend(self._get_lists_tag_key(filters) for filters in lists)
+        if not tag_keys:
+            return 0
+        dropped = await self._drop_tags(tag_keys)
+        if self.local_cache is not None:
+            self.local_cache.clear()
+        metrics.incr(self._metric('invalidation', 'entries'), dropped)
+        return dropped
+
+    async def flush(self) -> None:
+        """
+        Drop all the cached entries of the model.
+
+        With generations the counter is bumped, which makes every old key
+        unreachable at once; the keys of the previous generation are then
+        unlinked in the background (the older ones simply expire). Without
+        generations the keys of the model are unlinked right away.
+        """
+        name = self.model_class.__name__
+        if self.local_cache is not None:
+            self.local_cache.clear()
+        if self._generation is None:
+            for pattern in (f'{name}:*', f'Tag:{name}:*'):
+                await sweep(self.cache_client, pattern)
+            return
+        generation = await self._generation.bump()
+        self._namespace = get_namespace(name, generation)
+        task = asyncio.ensure_future(self._sweep_namespace(get_namespace(name, generation - 1)))
+        task.add_done_callback(self._log_background_error)
+
+    def hit_ratios(self) -> dict[str, float]:
+        """Return hit ratios of the local and the Redis cache tiers."""
+        return {
+            tier: metrics.ratio(self._metric(tier, 'hits'), self._metric(tier, 'misses'))
+            for tier in ('local', 'redis')
+        }
 
+    async def _hydrate(
+            self,
+            ids: list[str],
+            get_by_id: Callable,
+            get_by_ids: Callable,
+            loaded: dict[str, dict],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[dict]:
+        """Return the entities in the order of `ids`, skipping the missing ones."""
+        entities = {entity_id: loaded[entity_id] for entity_id in ids if entity_id in loaded}
+        unknown = [entity_id for entity_id in ids if entity_id not in entities]
+        keys = [self._get_caching_key(get_by_id, entity_id=entity_id, source=source) for entity_id in unknown]
+        missing = []
+        for key, entity_id, cached_data in zip(keys, unknown, await self._get_many(keys)):
+            entry = await self._unpack(key, cached_data) if cached_data else None
+            data = entry.data if entry is not None else None
+            if data and data != b'null':
+                entities[entity_id] = orjson.loads(data)
+            else:
+                missing.append(entity_id)
+
+        if missing:
+            metrics.incr(self._metric('hydrate', 'db_loads'), len(missing))
+            found = [entity for entity in await get_by_ids(missing, source=source) if entity]
+            await self._set_entities(get_by_id, found, source)
+            entities.update((entity['id'], entity) for entity in found)
+        return [entities[entity_id] for entity_id in ids if entity_id in entities]
+
+    async def _set_entities(
+            self,
+            get_by_id: Callable,
+            entities: Iterable[dict],
+            source: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Store the entities under their `get_by_id` caching keys."""
+        items = {
+            self._get_caching_key(get_by_id, entity_id=entity['id'], source=source): (
+                entity['id'],
+                self._pack(orjson.dumps(entity, default=pydantic_encoder)),
+            )
+            for entity in entities
+        }
+        await self._set_many({key: value for key, (_, value) in items.items()})
+        if self.tag_entries and items:
+            pipeline = self.cache_client.pipeline()
+            for key, (entity_id, (_, ttl)) in items.items():
+                self._tag(pipeline, key, [entity_id], ttl)
+            await self._write(pipeline.execute)
+
+    async def _get_data(self, key: str, get_from_db: Callable, **kwargs) -> bytes:
+        """Return the serialized data for the key, refreshing or filling it if needed."""
+        cached_data = await self._get(key)
+        entry = await self._unpack(key, cached_data) if cached_data else None
+        if entry is not None:
+            if self._needs_refresh(entry):
+                self._refresh_in_background(key, get_from_db, **kwargs)
+            return entry.data
+
+        entry = await self._unpack(key, await self._fill(key, get_from_db, **kwargs))
+        if entry is None:
+            # Filled by another worker with a value this one can not read, e.g. with a new zstd dictionary.
+            entry = CacheEntry.unpack(await self._compute(key, get_from_db, **kwargs))
+        return entry.data
+
+    async def _unpack(self, key: str, cached_data: bytes) -> Optional[CacheEntry]:
+        """Unpack the cached value; a value that can not be decoded is dropped and `None` is returned."""
+        try:
+            return CacheEntry.unpack(cached_data)
+        except DecodeError as exc:
+            metrics.incr(self._metric('redis', 'decode_errors'))
+            logger.warning('Cached value of %s can not be decoded and is dropped: %r', key, exc)
+            if self.local_cache is not None:
+                self.local_cache.delete(key)
+            await self._write(lambda: self.cache_client.unlink(key))
+            return None
+
+    def _needs_refresh(self, entry: CacheEntry) -> bool:
+        """Whether the entry is stale or is chosen for the early refresh."""
+        now = time.time()
+        return entry.is_stale(now) or entry.should_refresh_early(now, self.xfetch_beta)
+
+    def _refresh_in_background(self, key: str, get_from_db: Callable, **kwargs) -> None:
+        """Refresh the entry while the callers are served the cached value."""
+        if key in self._in_flight:
+            return
+        metrics.incr(self._metric('refresh', 'background'))
+        task = self._start_fill(key, get_from_db, **kwargs)
+        task.add_done_callback(self._log_background_error)
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Task) -> None:
+        """Log the error of the background refresh or sweep."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning('Background cache task failed: %r', task.exception())
+
+    async def _fill(self, key: str, get_from_db: Callable, **kwargs) -> bytes:
+        """
+        Load the data for the key once for all concurrent callers.
+
+        The first coroutine starts loading, the others await the same task.
+        """
+        if key in self._in_flight:
+            metrics.incr(self._metric('single_flight', 'joined'))
+        return await asyncio.shield(self._start_fill(key, get_from_db, **kwargs))
+
+    def _start_fill(self, key: str, get_from_db: Callable, **kwargs) -> asyncio.Task:
+        """Return the in-flight loading task for the key, start it if there is none."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_from_db(key, get_from_db, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    async def _load_from_db(self, key: str, get_from_db: Callable, **kwargs) -> bytes:
+        """
+        Load the data from the data source and cache it.
+
+        With `use_lock` only one worker queries the data source, the others
+        wait until the value appears in Redis. If the lock can not be taken
+        because of Redis, the data source is queried without it.
+        """
+        if not self.use_lock:
+            return await self._compute(key, get_from_db, **kwargs)
+
+        lock = RedisLock(cache_client=self.cache_client, key=f'{key}:lock', ttl_ms=self.lock_ttl_ms)
+        acquired = await self._call(lock.acquire)
+        if acquired is None:
+            return await self._compute(key, get_from_db, **kwargs)
+        if acquired:
+            try:
+                return await self._compute(key, get_from_db, **kwargs)
+            finally:
+                # Queued after the value, so the waiters find it in Redis once the lock is gone.
+                if not await self._write(lock.release):
+                    await self._call(lock.release)
+
+        metrics.incr(self._metric('lock', 'waits'))
+        data = await self._wait_for_fill(key, lock)
+        if data:
+            return data
+        metrics.incr(self._metric('lock', 'timeouts'))
+        return await self._compute(key, get_from_db, **kwargs)
+
+    async def _wait_for_fill(self, key: str, lock: RedisLock) -> Optional[bytes]:
+        """Poll Redis until another worker fills the key or drops the lock."""
+        deadline = time.monotonic() + self.lock_ttl_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            data = await self._call(lambda: self.cache_client.get(key))
+            if data:
+                return data
+            if not await self._call(lock.is_locked, default=False):
+                return None
+        return None
+
+    async def _compute(self, key: str, get_from_db: Callable, **kwargs) -> bytes:
+        """
+        Query the data source and store the result in the cache.
+
+        If stale serving or early refresh is on, the value is wrapped into
+        the envelope and kept in Redis for `stale_ttl` after its logical expiry.
+        """
+        started = time.monotonic()
+        data_raw = await get_from_db(**kwargs)
+        is_search = self.tag_entries and self._is_search(kwargs)
+        data, ttl = self._pack(
+            orjson.dumps(data_raw, default=pydantic_encoder),
+            delta=time.monotonic() - started,
+            ttl=min(self.ttl, self.search_ttl) if is_search else None,
+        )
+        await self._set(key, data, ttl)
+        if self.tag_entries:
+            lists = self._get_list_filters(kwargs) if self._is_list(data_raw) else None
+            pipeline = self.cache_client.pipeline()
+            self._tag(pipeline, key, self._get_entity_ids(data_raw, kwargs), ttl, lists=lists)
+            await self._write(pipeline.execute)
+        return data
+
+    async def _sync_namespace(self) -> None:
+        """Switch the keys to the current generation of the model keyspace, keep the last one if Redis fails."""
+        if self._generation is not None:
+            generation = await self._call(self._generation.get)
+            if generation is not None:
+                self._namespace = get_namespace(self.model_class.__name__, generation)
+
+    async def _sweep_namespace(self, namespace: str) -> None:
+        """Unlink the keys and the tag sets of the abandoned namespace."""
+        removed = 0
+        for pattern in (f'{namespace}:*', f'Tag:{namespace}:*'):
+            removed += await sweep(self.cache_client, pattern)
+        logger.info('Cache namespace %s is swept: %d keys', namespace, removed)
+
+    def _tag(
+            self,
+            pipeline: Pipeline,
+            key: str,
+            entity_ids: Iterable[str],
+            ttl: int,
+            lists: Optional[dict] = None,
+    ) -> None:
+        """
+        Queue the commands adding the key to the tags of the entities and of the lists with the `lists` filters.
+
+        A tag is a sorted set of keys scored by their expiry: the expired keys
+        are trimmed on every write, so a tag only holds the live keys.
+        """
+        tag_keys = [self._get_tag_key(entity_id) for entity_id in entity_ids]
+        if lists is not None:
+            tag_keys.append(self._get_lists_tag_key(lists))
+        now = time.time()
+        for tag_key in tag_keys:
+            pipeline.zadd(tag_key, now + ttl, key)
+            pipeline.zremrangebyscore(tag_key, max=now)
+            pipeline.expire(tag_key, self._tag_ttl)
+
+    async def _drop_tags(self, tag_keys: list[str]) -> int:
+        """Unlink the keys of the tags and the tags themselves, return the number of unlinked keys."""
+        detached = []
+        for tag_key in tag_keys:
+            detached_key = f'{tag_key}:detached:{uuid.uuid4().hex}'
+            if await self.cache_client.eval(DETACH_TAG_SCRIPT, keys=[tag_key, detached_key], args=[]):
+                detached.append(detached_key)
+        dropped = 0
+        for detached_key in detached:
+            start = 0
+            while True:
+                keys = await self.cache_client.zrange(detached_key, start, start + TAG_DRAIN_BATCH_SIZE - 1)
+                if keys:
+                    dropped += await self.cache_client.unlink(*keys)
+                if len(keys) < TAG_DRAIN_BATCH_SIZE:
+                    break
+                start += TAG_DRAIN_BATCH_SIZE
+            await self.cache_client.unlink(detached_key)
+        return dropped
+
+    @property
+    def _tag_ttl(self) -> int:
+        """Return the TTL of the tags: they outlive the longest living key, the expired keys are trimmed anyway."""
+        longest = max(self.ttl, self.facets_ttl, self.search_ttl) * (1 + max(self.ttl_jitter, 0))
+        return math.ceil(longest) + max(self.stale_ttl, 0)
+
+    @staticmethod
+    def _is_search(kwargs: dict) -> bool:
+        """Whether the entry is built for a search query rather than for a list with filters."""
+        return kwargs.get('query') is not None
+
+    @classmethod
+    def _get_list_filters(cls: Type['Cache'], kwargs: dict) -> Optional[dict]:
+        """Return the filters the list is tagged with, `None` for search results, which are not tagged."""
+        if cls._is_search(kwargs):
+            return None
+        return {name: value for name, value in kwargs.items() if name not in PAGING_PARAMS and value is not None}
+
+    @staticmethod
+    def _is_list(data: Any) -> bool:
+        """Whether the data is a list of entities (or a page of them) rather than a single entity."""
+        return isinstance(data, list) or isinstance(data, dict) and 'items' in data
+
+    @staticmethod
+    def _get_entity_ids(data: Any, kwargs: dict) -> set[str]:
+        """Ids of the entities the cached data was built from."""
+        entity_ids = {kwargs['entity_id']} if kwargs.get('entity_id') else set()
+        if isinstance(data, dict) and 'items' in data:
+            data = data['items']
+        if not isinstance(data, list):
+            data = [data] if data is not None else []
+        for item in data:
+            if isinstance(item, str):
+                entity_ids.add(item)
+            elif isinstance(item, dict):
+                entity_ids.add(item['id'])
+            elif getattr(item, 'id', None) is not None:
+                entity_ids.add(item.id)
+        return entity_ids
+
+    def _pack(self, data: bytes, delta: float = 0.0, ttl: Optional[int] = None) -> tuple[bytes, int]:
+        """Return the value to store (compressed if it is big enough) and its TTL in Redis, `ttl` by default."""
+        data = self.compressor.compress(data)
+        ttl = jitter_ttl(ttl or self.ttl, self.ttl_jitter)
+        if self.stale_ttl > 0 or self.xfetch_beta > 0:
+            data = CacheEntry(data=data, delta=delta, expiry=time.time() + ttl).pack()
+            ttl += self.stale_ttl
+        return data, ttl
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        """Look the key up in the local tier first, then in Redis."""
+        if self.local_cache is not None:
+            data = self.local_cache.get(key)
+            if data is not None:
+                metrics.incr(self._metric('local', 'hits'))
+                return data
+            metrics.incr(self._metric('local', 'misses'))
+
+        data = await self._call(lambda: self.cache_client.get(key))
+        metrics.incr(self._metric('redis', 'hits' if data else 'misses'))
+        if data and self.local_cache is not None:
+            self.local_cache.set(key, data)
+        return data
+
+    async def _get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        """Look the keys up in the local tier first, then in Redis with one MGET."""
+        values = [self.local_cache.get(key) if self.local_cache is not None else None for key in keys]
+        missed = [i for i, value in enumerate(values) if value is None]
+        if self.local_cache is not None:
+            metrics.incr(self._metric('local', 'hits'), len(keys) - len(missed))
+            metrics.incr(self._metric('local', 'misses'), len(missed))
+        if not missed:
+            return values
+
+        fetched = await self._call(
+            lambda: self.cache_client.mget(*[keys[i] for i in missed]),
+            default=[None] * len(missed),
+        )
+        for i, data in zip(missed, fetched):
+            values[i] = data
+            metrics.incr(self._metric('redis', 'hits' if data else 'misses'))
+            if data and self.local_cache is not None:
+                self.local_cache.set(keys[i], data)
+        return values
+
+    async def _set(self, key: str, data: bytes, ttl: int) -> None:
+        """Store the data in Redis and in the local tier."""
+        if self.local_cache is not None:
+            self.local_cache.set(key, data, ttl)
+        await self._write(lambda: self.cache_client.set(key, data, expire=ttl))
+
+    async def _set_many(self, items: dict[str, tuple[bytes, int]]) -> None:
+        """Store several values in Redis with one pipeline."""
+        if not items:
+            return
+        pipeline = self.cache_client.pipeline()
+        for key, (data, ttl) in items.items():
+            pipeline.set(key, data, expire=ttl)
+            if self.local_cache is not None:
+                self.local_cache.set(key, data, ttl)
+        await self._write(pipeline.execute)
+
+    async def _call(self, command: Callable[[], Awaitable], default: Any = None) -> Any:
+        """
+        Run the Redis command within `read_timeout`.
+
+        Return `default` if the breaker is open, the command is too slow
+        or Redis fails, so the caller goes on as if the cache was empty.
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            metrics.incr(self._metric('degraded', 'breaker_open'))
+            return default
+        try:
+            if self.read_timeout > 0:
+                result = await asyncio.wait_for(command(), self.read_timeout)
+            else:
+                result = await command()
+        except asyncio.TimeoutError:
+            metrics.incr(self._metric('degraded', 'timeouts'))
+            self._record_failure()
+            return default
+        except REDIS_ERRORS as exc:
+            metrics.incr(self._metric('degraded', 'errors'))
+            logger.debug('Cache read failed: %r', exc)
+            self._record_failure()
+            return default
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return result
+
+    async def _write(self, command: Callable[[], Awaitable]) -> bool:
+        """
+        Queue the Redis write or run it right away; a failed write is only counted.
+
+        Return whether the write is queued or done.
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            metrics.incr(self._metric('degraded', 'writes_skipped'))
+            return False
+        if self.write_queue is not None:
+            if not self.write_queue.submit(command):
+                metrics.incr(self._metric('degraded', 'writes_dropped'))
+                return False
+            return True
+        try:
+            await command()
+        except REDIS_ERRORS as exc:
+            metrics.incr(self._metric('degraded', 'write_errors'))
+            logger.debug('Cache write failed: %r', exc)
+            self._record_failure()
+            return False
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return True
+
+    def _record_failure(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record_failure()
+
+    def _load(self, data: bytes) -> Union[Optional[BaseModel], list[BaseModel]]:
+        """Deserialize the cached data into the model instances."""
         d = orjson.loads(data)
         if isinstance(d, dict):
             return self.model_class(**d)
@@ -50,8 +739,28 @@ class Cache:
         else:
             return None
 
+    def _metric(self, tier: str, name: str) -> str:
+        """Return the metric name for the cache tier of the model."""
+        return f'cache.{self.model_class.__name__}.{tier}.{name}'
+
+    def _get_tag_key(self, entity_id: str) -> str:
+        """Return the key of the set of cached keys referencing the entity."""
+        return f'Tag:{self._namespace}:id:{entity_id}'
+
+    def _get_lists_tag_key(self, filters: dict) -> str:
+        """Return the key of the tag of the cached lists of the model with the filters."""
+        params = [f'{name}={self._format_key_value(value)}' for name, value in sorted(filters.items())]
+        return ':'.join([f'Tag:{self._namespace}:lists'] + params)
+
     def _get_caching_key(self, fn: Callable, **kwargs) -> str:
         """Return a caching key based on model, method, and its parameters."""
-        params = [f'{k}={v}' for k, v in kwargs.items() if v is not None]
-        caching_key_parts = [self.model_class.__name__, fn.__name__] + params
+        params = [f'{k}={self._format_key_value(v)}' for k, v in kwargs.items() if v is not None]
+        caching_key_parts = [self._namespace, fn.__name__] + params
         return ':'.join(caching_key_parts)
+
+    @staticmethod
+    def _format_key_value(value: Any) -> str:
+        """Render the parameter value for the caching key, sequences -- comma separated."""
+        if isinstance(value, (list, tuple)):
+            return ','.join(map(str, value))
+        return str(value)
@@ -0,0 +1,130 @@
+"""Keeping the service up while Redis is slow or down."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional
+
+from aioredis import RedisError
+
+from core.config import settings
+from core.metrics import metrics
+
+# Errors after which the cache is skipped and the data is loaded from the data provider.
+REDIS_ERRORS = (RedisError, ConnectionError, OSError, asyncio.TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Stops calling Redis after `failure_threshold` failures in a row.
+
+    Every `reset_timeout` seconds one call is let through as a probe:
+    its success closes the breaker, its failure keeps it open.
+    """
+
+    failure_threshold: int = 5
+    reset_timeout: float = 1.0
+    _failures: int = field(default=0, init=False, repr=False)
+    _opened_at: Optional[float] = field(default=None, init=False, repr=False)
+
+    @property
+    def is_open(self) -> bool:
+        """Whether Redis calls are being skipped."""
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether Redis may be called now."""
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_timeout:
+            return False
+        self._opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        if self._opened_at is not None:
+            logger.info('Redis is back, the cache circuit breaker is closed')
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Count the failed call, open the breaker after `failure_threshold` of them in a row."""
+        self._failures += 1
+        if self._failures < self.failure_threshold:
+            return
+        if self._opened_at is None:
+            logger.warning('Redis is failing, the cache circuit breaker is open')
+            metrics.incr('cache.breaker.opened')
+        self._opened_at = time.monotonic()
+
+
+@dataclass
+class WriteQueue:
+    """
+    Runs the cache writes in the background, off the request path.
+
+    The queue holds at most `max_size` writes; new writes are dropped
+    while it is full. The outcome of every write is reported to the breaker.
+    The worker is started by the first write.
+    """
+
+    max_size: int = 1000
+    breaker: Optional[CircuitBreaker] = None
+    _queue: Optional[asyncio.Queue] = field(default=None, init=False, repr=False)
+    _worker: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+
+    def submit(self, write: Callable[[], Awaitable]) -> bool:
+        """Queue the write, `False` if it is dropped."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._worker = asyncio.ensure_future(self._run())
+        try:
+            self._queue.put_nowait(write)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        """Stop the worker, the writes left in the queue are dropped."""
+        if self._worker is not None:
+            self._worker.cancel()
+
+    async def _run(self) -> None:
+        """Perform the queued writes one by one."""
+        while True:
+            write = await self._queue.get()
+            try:
+                await write()
+            except REDIS_ERRORS as exc:
+                metrics.incr('cache.writes.errors')
+                logger.debug('Cache write failed: %r', exc)
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+
+
+@lru_cache()
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """Breaker shared by all the caches of the worker, `None` if it is disabled."""
+    if settings.CACHE_BREAKER_FAILURES <= 0:
+        return None
+    return CircuitBreaker(
+        failure_threshold=settings.CACHE_BREAKER_FAILURES,
+        reset_timeout=settings.CACHE_BREAKER_RESET_TIMEOUT,
+    )
+
+
+@lru_cache()
+def get_write_queue() -> Optional[WriteQueue]:
+    """Queue of background writes shared by all the caches of the worker, `None` if writes are awaited."""
+    if settings.CACHE_WRITE_QUEUE_SIZE <= 0:
+        return None
+    return WriteQueue(max_size=settings.CACHE_WRITE_QUEUE_SIZE, breaker=get_circuit_breaker())
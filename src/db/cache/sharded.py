@@ -0,0 +1,272 @@
+"""Cache storage spread over several Redis nodes with consistent hashing."""
+import asyncio
+import bisect
+import hashlib
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+import aioredis
+from aioredis import PoolClosedError, Redis
+
+from aioredis.commands import Pipeline
+
+from core.metrics import metrics
+from db.cache.base import AsyncCacheStorage
+from db.cache.resilience import CircuitBreaker
+
+NODE_CONNECT_TIMEOUT = 0.5
+# Errors of an unreachable node; its keys are treated as misses.
+NODE_ERRORS = (ConnectionError, OSError, asyncio.TimeoutError, PoolClosedError)
+# Single-key commands that go to the node of their key as is.
+KEY_COMMANDS = frozenset(('exists', 'expire', 'incr', 'smembers', 'xadd', 'zadd', 'zrange', 'zrem', 'zrevrange'))
+# Single-key commands that may be queued in a pipeline.
+PIPELINE_COMMANDS = frozenset(('delete', 'expire', 'sadd', 'set', 'zadd', 'zrem', 'zremrangebyscore'))
+
+logger = logging.getLogger(__name__)
+
+
+class CrossNodeError(ValueError):
+    """
+    The keys of a multi-key command live on different nodes.
+
+    Not one of `REDIS_ERRORS` on purpose: it is raised for every call with
+    these keys, whatever the state of the nodes, so it is a bug in the key
+    layout (missing `{hash tags}`) to surface rather than a cache miss.
+    """
+
+
+def _hash(value: str) -> int:
+    """Return the position of the value on the ring."""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def _hash_key(key: str) -> str:
+    """Part of the key that is hashed: the `{tag}` if there is one, as in Redis Cluster."""
+    start = key.find('{')
+    if start != -1:
+        end = key.find('}', start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+@dataclass(eq=False)
+class ShardedCacheStorage(AsyncCacheStorage):
+    """
+    Spreads the keys over `nodes` on a consistent hash ring.
+
+    Compared and hashed by identity, as the cached service factories take it as an argument.
+
+    Every node gets `virtual_nodes` points on the ring, so adding or
+    removing a node moves only its share of the keys. Multi-key reads and
+    pipelines are split into one batch per node, and the batches run
+    concurrently. When a node is unreachable, reads of its keys return
+    `None` and writes to it are dropped. Every node has its own circuit
+    breaker: after `failure_threshold` failures in a row the node is
+    skipped, without waiting for its timeouts, and probed every
+    `reset_timeout` seconds. The other nodes keep serving their keys.
+    Only the commands of `KEY_COMMANDS` are delegated to the nodes besides
+    the methods below.
+    """
+
+    nodes: Sequence[Redis]
+    names: Sequence[str]
+    virtual_nodes: int = 160
+    failure_threshold: int = 5
+    reset_timeout: float = 1.0
+    _ring: list[int] = field(default_factory=list, init=False, repr=False)
+    _ring_nodes: list[int] = field(default_factory=list, init=False, repr=False)
+    _breakers: list[CircuitBreaker] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Place the virtual nodes on the ring."""
+        self._breakers = [
+            CircuitBreaker(failure_threshold=self.failure_threshold, reset_timeout=self.reset_timeout)
+            for _ in self.nodes
+        ]
+        points = sorted(
+            (_hash(f'{name}#{replica}'), index)
+            for index, name in enumerate(self.names)
+            for replica in range(self.virtual_nodes)
+        )
+        self._ring = [point for point, _ in points]
+        self._ring_nodes = [index for _, index in points]
+
+    async def get(self, key: str, **kwargs) -> Optional[bytes]:
+        """Read the key from its node, `None` if the node is unreachable."""
+        return await self._call(self._get_node(key), 'get', key, **kwargs)
+
+    async def set(self, key: str, value: bytes, expire: int = 0, **kwargs) -> Optional[bool]:
+        """Write the key to its node, the write is dropped if the node is unreachable."""
+        return await self._call(self._get_node(key), 'set', key, value, expire=expire, **kwargs)
+
+    async def mget(self, key: str, *keys: str, **kwargs) -> list[Optional[bytes]]:
+        """Read the keys with one MGET per node."""
+        all_keys = [key, *keys]
+        by_node = self._group(all_keys)
+
+        async def node_mget(index: int, node_keys: list[str]) -> list:
+            values = await self._call(index, 'mget', *node_keys, **kwargs)
+            return values if values is not None else [None] * len(node_keys)
+
+        results = await asyncio.gather(*(node_mget(index, node_keys) for index, node_keys in by_node.items()))
+        values = {}
+        for node_keys, node_values in zip(by_node.values(), results):
+            values.update(zip(node_keys, node_values))
+        return [values[k] for k in all_keys]
+
+    def pipeline(self) -> 'ShardedPipeline':
+        """Return a pipeline that is split by the nodes on `execute`."""
+        return ShardedPipeline(self)
+
+    async def eval(self, script: str, keys: list, args: list) -> Any:
+        """Run the script on the node of the keys; all of them must be on one node, else `CrossNodeError`."""
+        nodes = set(self._group(keys)) if keys else {0}
+        if len(nodes) > 1:
+            raise CrossNodeError('Script keys are spread over several nodes, use {hash tags}')
+        return await self._call(nodes.pop(), 'eval', script, keys=keys, args=args)
+
+    async def scan(
+            self,
+            cursor: int = 0,
+            match: Optional[str] = None,
+            count: Optional[int] = None,
+    ) -> tuple[int, list[bytes]]:
+        """
+        SCAN all the nodes one after another.
+
+        The node index is kept in the lowest part of the cursor, so the
+        callers walk the whole keyspace with the usual cursor loop.
+        """
+        index, node_cursor = cursor % len(self.nodes), cursor // len(self.nodes)
+        result = await self._call(index, 'scan', node_cursor, match=match, count=count)
+        node_cursor, keys = result if result is not None else (0, [])
+        if node_cursor:
+            return node_cursor * len(self.nodes) + index, keys
+        next_index = index + 1
+        return (next_index if next_index < len(self.nodes) else 0), keys
+
+    async def unlink(self, key: str, *keys: str) -> int:
+        """Unlink the keys with one UNLINK per node, return the number of unlinked keys."""
+        results = await asyncio.gather(*(
+            self._call(index, 'unlink', *node_keys) for index, node_keys in self._group([key, *keys]).items()
+        ))
+        return sum(result or 0 for result in results)
+
+    async def xread(self, streams: list[str], **kwargs) -> Optional[list]:
+        """Read the streams from the node of the first one."""
+        return await self._call(self._get_node(streams[0]), 'xread', streams, **kwargs)
+
+    def close(self) -> None:
+        """Close the pools of all the nodes."""
+        for node in self.nodes:
+            node.close()
+
+    async def wait_closed(self) -> None:
+        """Wait until the pools of all the nodes are closed."""
+        await asyncio.gather(*(node.wait_closed() for node in self.nodes))
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable]:
+        """Send the single-key commands of `KEY_COMMANDS` to the node of their key."""
+        if name not in KEY_COMMANDS:
+            raise AttributeError(name)
+
+        async def command(key: str, *args, **kwargs) -> Any:
+            return await self._call(self._get_node(key), name, key, *args, **kwargs)
+        return command
+
+    def _get_node(self, key: str) -> int:
+        """Index of the node the key belongs to."""
+        position = bisect.bisect(self._ring, _hash(_hash_key(key))) % len(self._ring)
+        return self._ring_nodes[position]
+
+    def _group(self, keys: list[str]) -> dict[int, list[str]]:
+        """Keys by the indexes of their nodes."""
+        by_node = defaultdict(list)
+        for key in keys:
+            by_node[self._get_node(key)].append(key)
+        return by_node
+
+    async def _call(self, index: int, name: str, *args, **kwargs) -> Any:
+        """Run the command on the node, `None` if the node is unreachable or its breaker is open."""
+        if not self._breakers[index].allow():
+            metrics.incr(f'cache.sharded.{self.names[index]}.skipped')
+            return None
+        try:
+            result = await getattr(self.nodes[index], name)(*args, **kwargs)
+        except NODE_ERRORS as exc:
+            self._record_failure(index, exc)
+            return None
+        self._breakers[index].record_success()
+        return result
+
+    def _record_failure(self, index: int, exc: Exception) -> None:
+        """Count the failure of the node for its breaker."""
+        metrics.incr(f'cache.sharded.{self.names[index]}.errors')
+        logger.warning('Redis node %s is unreachable: %r', self.names[index], exc)
+        self._breakers[index].record_failure()
+
+
+@dataclass
+class ShardedPipeline:
+    """Pipeline that sends one pipeline per node and returns the results in the order of the commands."""
+
+    storage: ShardedCacheStorage
+    _commands: list[tuple[int, str, tuple, dict]] = field(default_factory=list, init=False, repr=False)
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        """Queue the single-key commands of `PIPELINE_COMMANDS` for the node of their key."""
+        if name not in PIPELINE_COMMANDS:
+            raise AttributeError(name)
+
+        def command(key: str, *args, **kwargs) -> None:
+            self._commands.append((self.storage._get_node(key), name, (key, *args), kwargs))
+        return command
+
+    async def execute(self, return_exceptions: bool = False) -> list:
+        """Run the queued commands, one pipeline per node; the results of the unreachable nodes are `None`."""
+        by_node = defaultdict(list)
+        for position, (index, name, args, kwargs) in enumerate(self._commands):
+            by_node[index].append((position, name, args, kwargs))
+        results: list = [None] * len(self._commands)
+
+        async def run(index: int, commands: list) -> None:
+            if not self.storage._breakers[index].allow():
+                metrics.incr(f'cache.sharded.{self.storage.names[index]}.skipped')
+                return
+            pipeline: Pipeline = self.storage.nodes[index].pipeline()
+            for _, name, args, kwargs in commands:
+                getattr(pipeline, name)(*args, **kwargs)
+            try:
+                node_results = await pipeline.execute(return_exceptions=True)
+            except NODE_ERRORS as exc:
+                self.storage._record_failure(index, exc)
+                return
+            self.storage._breakers[index].record_success()
+            for (position, *_), result in zip(commands, node_results):
+                results[position] = None if isinstance(result, Exception) else result
+
+        await asyncio.gather(*(run(index, commands) for index, commands in by_node.items()))
+        self._commands = []
+        return results
+
+
+async def create_sharded_storage(addresses: Sequence[str], virtual_nodes: int = 160) -> ShardedCacheStorage:
+    """
+    Create the storage over the `host:port` addresses.
+
+    The pools connect lazily, so the service starts even if a node is down.
+    """
+    nodes = []
+    for address in addresses:
+        host, port = address.strip().rsplit(':', 1)
+        nodes.append(await aioredis.create_redis_pool(
+            (host, int(port)), minsize=0, maxsize=20, timeout=NODE_CONNECT_TIMEOUT,
+        ))
+    return ShardedCacheStorage(
+        nodes=nodes,
+        names=[address.strip() for address in addresses],
+        virtual_nodes=virtual_nodes,
+    )
@@ -0,0 +1,224 @@
+"""Redis storage with a client-side copy of the keys kept fresh by `CLIENT TRACKING`."""
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+import aioredis
+from aioredis import Channel, Redis
+from aioredis.commands import Pipeline
+
+from core.metrics import metrics
+from db.cache.base import AsyncCacheStorage
+from db.cache.resilience import REDIS_ERRORS
+
+INVALIDATE_CHANNEL = '__redis__:invalidate'
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class TrackingCacheStorage(AsyncCacheStorage):
+    """
+    Keeps the values of the keys with `prefixes` in process memory.
+
+    Compared and hashed by identity, as the cached service factories take it as an argument.
+
+    Tracking is enabled in the broadcast mode on a dedicated connection, so
+    Redis notifies about every change of a key with one of the prefixes,
+    whichever pool connection has read it. The notifications are redirected
+    to a subscriber connection (RESP2 has no push messages on the command
+    connections) and drop the local copies.
+
+    A value read while its key is being invalidated is not kept. The idle
+    tracking connection is pinged every `ping_interval` seconds: when either
+    connection is lost, Redis stops sending the notifications, so the local
+    copy is dropped and both connections are opened again. Until then the
+    keys are read from Redis. Everything except `get`/`mget`/`set` goes to
+    `redis` as is.
+    """
+
+    redis: Redis
+    address: tuple[str, int]
+    prefixes: Sequence[str]
+    max_entries: int = 10_000
+    ping_interval: float = 5.0
+    _values: OrderedDict = field(default_factory=OrderedDict, init=False, repr=False)
+    _reading: dict[str, bool] = field(default_factory=dict, init=False, repr=False)
+    _tracking: bool = field(default=False, init=False, repr=False)
+    _tracker: Optional[Redis] = field(default=None, init=False, repr=False)
+    _subscriber: Optional[Redis] = field(default=None, init=False, repr=False)
+    _listener: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+    _watcher: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+
+    async def start(self) -> None:
+        """Turn the tracking on and start watching its connections."""
+        await self._connect()
+        self._watcher = asyncio.ensure_future(self._watch())
+
+    async def get(self, key: str, **kwargs) -> Optional[bytes]:
+        """Return the local copy of the tracked key or read it from Redis."""
+        if kwargs or not self._is_tracked(key):
+            return await self.redis.get(key, **kwargs)
+        if key in self._values:
+            self._values.move_to_end(key)
+            metrics.incr('cache.tracking.hits')
+            return self._values[key]
+        metrics.incr('cache.tracking.misses')
+        self._reading[key] = True
+        try:
+            value = await self.redis.get(key)
+            self._keep(key, value)
+        finally:
+            self._reading.pop(key, None)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: int = 0, **kwargs) -> bool:
+        """Write to Redis; the local copy is dropped and filled on the next read."""
+        self._drop(key)
+        return await self.redis.set(key, value, expire=expire, **kwargs)
+
+    async def mget(self, key: str, *keys: str, **kwargs) -> list[Optional[bytes]]:
+        """Return the local copies of the tracked keys, the rest are read with one MGET."""
+        all_keys = [key, *keys]
+        values = [self._values.get(k) if self._is_tracked(k) else None for k in all_keys]
+        missed = [k for k, value in zip(all_keys, values) if value is None]
+        metrics.incr('cache.tracking.hits', len(all_keys) - len(missed))
+        if not missed:
+            return values
+        metrics.incr('cache.tracking.misses', len(missed))
+        for k in missed:
+            self._reading[k] = True
+        try:
+            fetched = dict(zip(missed, await self.redis.mget(*missed, **kwargs)))
+            for k, value in fetched.items():
+                if self._is_tracked(k):
+                    self._keep(k, value)
+        finally:
+            for k in missed:
+                self._reading.pop(k, None)
+        return [value if value is not None else fetched[k] for k, value in zip(all_keys, values)]
+
+    def pipeline(self) -> Pipeline:
+        """Return a pipeline of the pool; its writes are seen through the notifications."""
+        return self.redis.pipeline()
+
+    async def eval(self, script: str, keys: list, args: list) -> Any:
+        """Run the script on the pool."""
+        return await self.redis.eval(script, keys=keys, args=args)
+
+    def close(self) -> None:
+        """Stop watching, close the tracking connections and the pool."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+        self._disconnect()
+        self.redis.close()
+
+    async def wait_closed(self) -> None:
+        """Wait until the pool is closed."""
+        await self.redis.wait_closed()
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate the other commands to the pool."""
+        return getattr(self.redis, name)
+
+    async def _connect(self) -> None:
+        """Open the subscriber and the tracking connections and turn the tracking on."""
+        subscriber = await aioredis.create_redis(self.address)
+        try:
+            subscriber_id = await subscriber.execute(b'CLIENT', b'ID')
+            channel, = await subscriber.subscribe(INVALIDATE_CHANNEL)
+            tracker = await aioredis.create_redis(self.address)
+        except BaseException:
+            subscriber.close()
+            raise
+        try:
+            prefix_args = [arg for prefix in self.prefixes for arg in (b'PREFIX', prefix)]
+            await tracker.execute(b'CLIENT', b'TRACKING', b'on', b'REDIRECT', subscriber_id, b'BCAST', *prefix_args)
+        except BaseException:
+            subscriber.close()
+            tracker.close()
+            raise
+        self._subscriber, self._tracker = subscriber, tracker
+        self._listener = asyncio.ensure_future(self._listen(subscriber, channel))
+        self._tracking = True
+
+    def _disconnect(self) -> None:
+        """Stop serving the local copy and close the tracking connections."""
+        self._tracking = False
+        self._drop_all()
+        for connection in (self._tracker, self._subscriber):
+            if connection is not None:
+                connection.close()
+        self._tracker = self._subscriber = None
+
+    async def _watch(self) -> None:
+        """Check the tracking connections every `ping_interval` seconds and reopen them when they are lost."""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if await self._is_alive():
+                continue
+            logger.warning('Client-side cache tracking is lost, the local copy is dropped')
+            metrics.incr('cache.tracking.reconnects')
+            self._disconnect()
+            try:
+                await self._connect()
+            except REDIS_ERRORS:
+                logger.warning('Client-side cache tracking is not restarted, retrying in %s s', self.ping_interval)
+                continue
+            logger.info('Client-side cache tracking is restarted')
+
+    async def _is_alive(self) -> bool:
+        """Whether both connections are open and the tracking one answers a ping in time."""
+        if not self._tracking or self._subscriber is None or self._tracker is None or self._tracker.closed:
+            return False
+        try:
+            await asyncio.wait_for(self._tracker.ping(), timeout=self.ping_interval)
+        except REDIS_ERRORS:
+            return False
+        return True
+
+    def _is_tracked(self, key: str) -> bool:
+        """Whether the local copy of the key is kept fresh by the notifications."""
+        return self._tracking and key.startswith(tuple(self.prefixes))
+
+    def _keep(self, key: str, value: Optional[bytes]) -> None:
+        """Keep the value unless the key was invalidated while it was being read."""
+        if value is None or not self._reading.get(key):
+            return
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_entries:
+            self._values.popitem(last=False)
+
+    def _drop(self, key: str) -> None:
+        """Drop the local copy of the key, and the value being read for it."""
+        self._values.pop(key, None)
+        if key in self._reading:
+            self._reading[key] = False
+
+    def _drop_all(self) -> None:
+        """Drop the whole local copy, and the values being read."""
+        self._values.clear()
+        for key in self._reading:
+            self._reading[key] = False
+
+    async def _listen(self, subscriber: Redis, channel: Channel) -> None:
+        """Apply the invalidation messages until the subscriber connection is closed."""
+        try:
+            while await channel.wait_message():
+                keys = await channel.get()
+                metrics.incr('cache.tracking.invalidations')
+                if keys is None:
+                    # Sent on FLUSHDB/FLUSHALL.
+                    self._drop_all()
+                    continue
+                for key in keys:
+                    self._drop(key.decode() if isinstance(key, bytes) else key)
+        finally:
+            if self._subscriber is subscriber:
+                # Lost rather than closed by `_disconnect`: serve from Redis until the watcher reconnects.
+                logger.warning('Client-side cache tracking stopped, the local copy is dropped')
+                self._tracking = False
+                self._drop_all()
@@ -1,26 +1,42 @@
 """Base abstraction for data providers."""
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Sequence
 
 
 class AsyncDataProvider(ABC):
     """Abstract Data Provider."""
 
     @abstractmethod
-    async def get(self, index: str, entity_id: str) -> Optional[dict]:
+    async def get(self, index: str, entity_id: str, **kwargs) -> Optional[dict]:
         """Get the entity by id."""
 
+    @abstractmethod
+    async def mget(self, **kwargs) -> dict:
+        """Get several entities by their ids."""
+
     @abstractmethod
     async def search(self, **kwargs) -> list:
         """Get entities according the `kwargs` criteria."""
 
+    @abstractmethod
+    async def msearch(self, **kwargs) -> dict:
+        """Run several searches in one request."""
+
 
 class BaseDataProvider(ABC):
     """Base abstraction for data providers."""
 
     @abstractmethod
-    async def get_by_id(self, entity_id: str) -> Optional[dict]:
-        """Get the entity by id."""
+    async def get_by_id(self, entity_id: str, source: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Get the entity by id, `source` limits the fields of the document."""
+
+    @abstractmethod
+    async def get_by_ids(
+            self,
+            entity_ids: list[str],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[Optional[dict]]:
+        """Get the entities by ids, `None` for the missing ones."""
 
     @abstractmethod
     async def get_list(self, **kwargs) -> list:
@@ -29,3 +45,6 @@ class BaseDataProvider(ABC):
     @abstractmethod
     async def get_search_result(self, **kwargs) -> list:
         """Find the entities according the `kwargs` criteria."""
+
+    def mark_changed(self, entity_ids: list[str]) -> None:
+        """Stop serving the in-process copies of the changed entities, if the provider keeps any."""
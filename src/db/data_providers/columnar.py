@@ -0,0 +1,142 @@
+"""Columnar in-memory index of the films for sorted and filtered lists."""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, Type
+
+import numpy as np
+
+from core.metrics import metrics
+from db.data_providers.films import FilmsDataProvider
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = ('imdb_rating', 'creation_date')
+
+
+@dataclass
+class FilmColumns:
+    """
+    Snapshot of the film columns.
+
+    `orders` keeps a precomputed permutation of the rows for every
+    supported sort, the films without a value go last as in Elasticsearch.
+    `genres` keeps a packed bitmap of the rows for every genre id.
+    """
+
+    ids: np.ndarray
+    imdb_rating: np.ndarray
+    creation_date: np.ndarray
+    genres: dict[str, np.ndarray]
+    orders: dict[str, np.ndarray]
+
+    @classmethod
+    def build(cls: Type['FilmColumns'], films: list[dict]) -> 'FilmColumns':
+        """Build the columns from the film documents."""
+        ids = np.array([film['id'] for film in films], dtype=str)
+        imdb_rating = np.array(
+            [film.get('imdb_rating') if film.get('imdb_rating') is not None else np.nan for film in films],
+            dtype=np.float64,
+        )
+        creation_date = np.array(
+            [str(film['creation_date'])[:10] if film.get('creation_date') else 'NaT' for film in films],
+            dtype='datetime64[D]',
+        )
+        rows: dict[str, list[int]] = {}
+        for row, film in enumerate(films):
+            for genre in film.get('genre') or []:
+                rows.setdefault(genre['id'], []).append(row)
+        genres = {}
+        for genre_id, genre_rows in rows.items():
+            mask = np.zeros(len(films), dtype=bool)
+            mask[genre_rows] = True
+            genres[genre_id] = np.packbits(mask)
+
+        dates = creation_date.astype(np.float64)
+        dates[np.isnat(creation_date)] = np.nan
+        orders = {}
+        for name, values in (('imdb_rating', imdb_rating), ('creation_date', dates)):
+            orders[name] = np.argsort(values, kind='stable')
+            orders[f'-{name}'] = np.argsort(-values, kind='stable')
+        return cls(ids=ids, imdb_rating=imdb_rating, creation_date=creation_date, genres=genres, orders=orders)
+
+    def get_ids(self, sort: str, page_size: int, page_number: int, genre_id: Optional[str] = None) -> list[str]:
+        """Page of film ids in the `sort` order, only the films of the genre if `genre_id` is given."""
+        order = self.orders[sort]
+        if genre_id:
+            bitmap = self.genres.get(genre_id)
+            if bitmap is None:
+                return []
+            mask = np.unpackbits(bitmap, count=len(self.ids)).view(bool)
+            order = order[mask[order]]
+        start = (page_number - 1) * page_size
+        return self.ids[order[start:start + page_size]].tolist()
+
+    def memory_usage(self) -> dict[str, int]:
+        """Size of every column in bytes and the total."""
+        usage = {
+            'ids': self.ids.nbytes,
+            'imdb_rating': self.imdb_rating.nbytes,
+            'creation_date': self.creation_date.nbytes,
+            'genres': sum(bitmap.nbytes for bitmap in self.genres.values()),
+            'orders': sum(order.nbytes for order in self.orders.values()),
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+
+
+@dataclass
+class FilmColumnarIndex:
+    """
+    Answers the film list queries with vectorized operations on a snapshot.
+
+    The snapshot is rebuilt from the movies index every `refresh_interval`
+    seconds and swapped at once. A snapshot larger than `max_bytes` is
+    dropped, and the lists are served by Elasticsearch as before.
+    """
+
+    db: FilmsDataProvider
+    refresh_interval: float = 300.0
+    max_bytes: int = 256 * 1024 * 1024
+    _columns: Optional[FilmColumns] = field(default=None, init=False, repr=False)
+
+    def get_ids(
+            self,
+            page_size: int,
+            page_number: int = 1,
+            sort: Optional[str] = None,
+            genre_id: Optional[str] = None,
+            **kwargs,
+    ) -> Optional[list[str]]:
+        """Page of film ids or `None` if the snapshot is not loaded or the sort is not supported."""
+        if self._columns is None or sort not in self._columns.orders:
+            metrics.incr('columnar.films.misses')
+            return None
+        metrics.incr('columnar.films.hits')
+        return self._columns.get_ids(sort, page_size, page_number, genre_id)
+
+    def memory_usage(self) -> dict[str, int]:
+        """Size of the loaded snapshot columns in bytes."""
+        return self._columns.memory_usage() if self._columns is not None else {'total': 0}
+
+    async def refresh(self) -> None:
+        """Rebuild the snapshot from the movies index."""
+        source = ['id', 'genre.id', *SORT_FIELDS]
+        films = [film async for film in self.db.iter_all(source=source)]
+        columns = FilmColumns.build(films)
+        usage = columns.memory_usage()
+        if usage['total'] > self.max_bytes:
+            logger.warning('Film columns take %d bytes over the budget of %d', usage['total'], self.max_bytes)
+            self._columns = None
+            return
+        self._columns = columns
+        logger.info('Film columns are loaded: %d films, %s', len(films), usage)
+
+    async def run(self) -> None:
+        """Rebuild the snapshot every `refresh_interval` seconds."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Film columns are not refreshed')
+            await asyncio.sleep(self.refresh_interval)
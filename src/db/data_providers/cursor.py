@@ -0,0 +1,35 @@
+"""Opaque cursors for the `search_after` pagination."""
+import base64
+import binascii
+from typing import Any
+
+import orjson
+
+
+class InvalidCursorError(ValueError):
+    """The cursor was not issued by the service, or was issued for another query order."""
+
+
+def encode_cursor(sort_values: list, scope: Any = None) -> str:
+    """
+    Pack the sort values of the last hit into an opaque string.
+
+    `scope` identifies the order the values belong to (the index and the sort),
+    so the cursor can not be replayed against another one.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps({'scope': scope, 'after': sort_values})).decode()
+
+
+def decode_cursor(cursor: str, scope: Any = None) -> list:
+    """Unpack the sort values, an empty cursor means the first page; with `scope` it must match the cursor's."""
+    if not cursor:
+        return []
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursorError(cursor) from exc
+    if not isinstance(payload, dict) or not isinstance(payload.get('after'), list):
+        raise InvalidCursorError(cursor)
+    if scope is not None and payload.get('scope') != orjson.loads(orjson.dumps(scope)):
+        raise InvalidCursorError(cursor)
+    return payload['after']
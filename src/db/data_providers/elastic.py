@@ -1,10 +1,20 @@
 """Загрузка ElasticSearch."""
-from dataclasses import dataclass
-from typing import Optional
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+from typing import AsyncIterator, Optional, Sequence, Union
+from weakref import WeakKeyDictionary
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
+import orjson
+from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
 
+from core.config import settings
+from core.metrics import metrics
 from db.data_providers.base import BaseDataProvider, AsyncDataProvider
+from db.data_providers.cursor import InvalidCursorError, decode_cursor, encode_cursor
+from db.data_providers.loader import BatchLoader
+from db.data_providers.msearch import SearchBatcher
+from db.data_providers.snapshot import SnapshotFile
 
 es: Optional[AsyncElasticsearch] = None
 
@@ -18,17 +28,55 @@ async def get_elastic() -> AsyncElasticsearch:
 class ElasticDataProvider(BaseDataProvider):
     """Provides the data from Elastic for models."""
 
+    # Поле для подсказок по началу слов и сортировка подсказок.
+    suggest_field = None
+    suggest_sort = None
+
     db_client: AsyncDataProvider
     db_index: str
+    batch_gets: bool = settings.ES_BATCH_GET_ENABLED
+    batch_window: float = settings.ES_BATCH_GET_WINDOW_US / 1_000_000
+    batch_searches: bool = settings.ES_MSEARCH_ENABLED
+    tiered_search: bool = settings.ES_TIERED_SEARCH_ENABLED
+    tiered_min_hits: int = settings.ES_TIERED_SEARCH_MIN_HITS
+    snapshot: Optional[SnapshotFile] = None
+    _loaders: WeakKeyDictionary = field(default_factory=WeakKeyDictionary, init=False, repr=False)
+    _batchers: WeakKeyDictionary = field(default_factory=WeakKeyDictionary, init=False, repr=False)
 
-    async def get_by_id(self, entity_id: str) -> Optional[dict]:
-        """Загрузка сущности по id."""
+    async def get_by_id(self, entity_id: str, source: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Загрузка сущности по id, `source` -- загружаемые поля документа."""
+        if self.snapshot is not None:
+            doc = self._get_from_snapshot(entity_id, source)
+            if doc is not None:
+                return doc
+        if self.batch_gets:
+            return await self._get_loader(source).load(entity_id)
         try:
-            doc = await self.db_client.get(self.db_index, entity_id)
+            doc = await self.db_client.get(self.db_index, entity_id, **self._get_source_params(source))
         except NotFoundError:
             return None
         return doc['_source']
 
+    async def get_by_ids(
+            self,
+            entity_ids: list[str],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[Optional[dict]]:
+        """Загрузка сущностей по списку id одним запросом, если есть снимок -- сначала из него."""
+        if self.snapshot is None:
+            return await self._mget(entity_ids, source)
+        docs = [self._get_from_snapshot(entity_id, source) for entity_id in entity_ids]
+        missing = [entity_id for entity_id, doc in zip(entity_ids, docs) if doc is None]
+        if not missing:
+            return docs
+        loaded = dict(zip(missing, await self._mget(missing, source)))
+        return [doc if doc is not None else loaded[entity_id] for entity_id, doc in zip(entity_ids, docs)]
+
+    def mark_changed(self, entity_ids: list[str]) -> None:
+        """Изменённые сущности больше не читаются из снимка, построенного до изменения."""
+        if self.snapshot is not None:
+            self.snapshot.mark_changed(entity_ids)
+
     async def get_list(self, **kwargs) -> list[dict]:
         """Возвращает список сущностей без фильтрации с параметрами."""
         return await self._get_list_from_elastic(
@@ -40,16 +88,75 @@ class ElasticDataProvider(BaseDataProvider):
         """Поиск 'по умолчанию': вернёт результат поиска по всем полям."""
         return await self._search_elastic(fields=['*'], **kwargs)
 
+    async def get_suggestions(
+            self,
+            query: str,
+            page_size: int,
+            source: Optional[Sequence[str]] = None,
+    ) -> list[dict]:
+        """Сущности, в поле `suggest_field` которых есть фраза, начинающаяся с `query`."""
+        return await self._get_list_from_elastic(
+            query={'match_phrase_prefix': {self.suggest_field: query}},
+            page_size=page_size,
+            sort=self.suggest_sort,
+            source=source,
+        )
+
+    async def iter_all(
+            self,
+            source: Optional[Sequence[str]] = None,
+            batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """Обход всех документов индекса пачками по `search_after`."""
+        search_after = None
+        while True:
+            body = {
+                'size': batch_size,
+                'query': {'match_all': {}},
+                'sort': [{'id': {'order': 'asc'}}],
+            }
+            if source:
+                body['_source'] = list(source)
+            if search_after:
+                body['search_after'] = search_after
+            try:
+                doc = await self.db_client.search(index=self.db_index, body=body)
+            except NotFoundError:
+                return
+            hits = doc['hits']['hits']
+            for hit in hits:
+                yield hit['_source']
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]['sort']
+
     async def _get_list_from_elastic(
             self,
             page_size: int,
-            page_number: int,
             query: dict,
+            page_number: int = 1,
             sort: Optional[str] = None,
-    ) -> list[dict]:
+            cursor: Optional[str] = None,
+            source: Optional[Sequence[str]] = None,
+            aggs: Optional[dict] = None,
+            track_total_hits: Optional[int] = None,
+    ) -> Union[list[dict], dict]:
+        """
+        Поиск в индексе с пагинацией.
+
+        Если передан `cursor`, страница выбирается через `search_after`
+        (пустой курсор -- первая страница), а вместо списка возвращается
+        словарь с `items` и курсором следующей страницы `next_cursor`.
+        `source` ограничивает поля возвращаемых документов. С `aggs`
+        агрегации считаются тем же запросом, и возвращается словарь
+        с `items` и `aggregations`. С `track_total_hits` в словаре есть
+        и `total` -- число найденных документов, посчитанное до этого значения.
+
+        Курсор, выданный для другого индекса или другой сортировки, а также
+        курсор, значения которого Elastic отверг, -- InvalidCursorError.
+        """
         body = {
             'size': page_size,
-            'from': (page_number - 1) * page_size,
             'query': query,
         }
         if sort:
@@ -57,28 +164,175 @@ class ElasticDataProvider(BaseDataProvider):
             order = 'desc' if is_desc_sorting else 'asc'
             sort_term = sort[1:] if is_desc_sorting else sort
             body['sort'] = {sort_term: {'order': order}}
+        search_after = None
+        if cursor is not None:
+            body['sort'] = self._get_cursor_sort(body.get('sort'))
+            search_after = decode_cursor(cursor, scope=self._get_cursor_scope(body['sort']))
+            if search_after and len(search_after) != len(body['sort']):
+                raise InvalidCursorError(cursor)
+        if not search_after:
+            body['from'] = (page_number - 1) * page_size
+        if search_after:
+            body['search_after'] = search_after
+        if source:
+            body['_source'] = list(source)
+        if aggs:
+            body['aggs'] = aggs
+        if track_total_hits is not None:
+            body['track_total_hits'] = track_total_hits
         try:
-            doc = await self.db_client.search(index=self.db_index, body=body)
+            doc = await self._search(body)
         except NotFoundError:
-            return []
-        items = [hit['_source'] for hit in doc['hits']['hits']]
-        return items
+            doc = {'hits': {'hits': [], 'total': {'value': 0}}}
+        except RequestError as exc:
+            if search_after:
+                raise InvalidCursorError(cursor) from exc
+            raise
+        hits = doc['hits']['hits']
+        items = [hit['_source'] for hit in hits]
+        if aggs or track_total_hits is not None:
+            result = {'items': items}
+            if aggs:
+                result['aggregations'] = doc.get('aggregations', {})
+            if track_total_hits is not None:
+                result['total'] = doc['hits']['total']['value']
+            return result
+        if cursor is None:
+            return items
+        next_cursor = None
+        if hits and len(hits) == page_size:
+            next_cursor = encode_cursor(hits[-1]['sort'], scope=self._get_cursor_scope(body['sort']))
+        return {'items': items, 'next_cursor': next_cursor}
+
+    def _get_cursor_scope(self, sort: list) -> list:
+        """Порядок, для которого выдан курсор: индекс и сортировка."""
+        return [self.db_index, sort]
+
+    @staticmethod
+    def _get_cursor_sort(sort: Optional[dict]) -> list:
+        """Сортировка с уникальным `id` в конце, чтобы `search_after` был однозначным."""
+        if not sort:
+            return ['_score', {'id': {'order': 'asc'}}]
+        if 'id' in sort:
+            return [sort]
+        return [sort, {'id': {'order': 'asc'}}]
 
     async def _search_elastic(
             self,
             query: str,
             fields: list[str],
+            filter_query: Optional[dict] = None,
             **kwargs,
-    ) -> list[dict]:
-        search_query = {
-            'multi_match': {
-                'query': query,
-                'fields': fields,
-                'operator': 'and',
-                'fuzziness': 'AUTO',
-            },
-        }
+    ) -> Union[list[dict], dict]:
+        """
+        Полнотекстовый поиск по полям `fields` среди документов `filter_query`.
+
+        С `tiered_search` сначала ищутся точные совпадения слов (после анализатора),
+        и нечёткий поиск выполняется, только если всего точных совпадений меньше
+        `tiered_min_hits`. Уровень зависит только от запроса, а не от страницы,
+        поэтому все страницы запроса (и окно результатов) ранжируются одинаково.
+        Страницы по курсору всегда ищутся нечётко, чтобы курсор оставался верным.
+        Агрегации `aggs` считаются тем же запросом, что и страница, -- на том же уровне.
+        """
+        if self.tiered_search and kwargs.get('cursor') is None:
+            exact = await self._get_list_from_elastic(
+                query=self._get_search_query(query, fields, fuzzy=False, filter_query=filter_query),
+                track_total_hits=self.tiered_min_hits,
+                **kwargs,
+            )
+            if exact.pop('total') >= self.tiered_min_hits:
+                metrics.incr(f'es.{self.db_index}.search.exact')
+                return exact if kwargs.get('aggs') else exact['items']
+            metrics.incr(f'es.{self.db_index}.search.fuzzy')
         return await self._get_list_from_elastic(
-            query=search_query,
+            query=self._get_search_query(query, fields, fuzzy=True, filter_query=filter_query),
             **kwargs,
         )
+
+    @staticmethod
+    def _get_search_query(query: str, fields: list[str], fuzzy: bool, filter_query: Optional[dict] = None) -> dict:
+        """Запрос `multi_match` по всем словам, с `fuzzy` -- с опечатками, с `filter_query` -- среди его документов."""
+        search_query = {
+            'query': query,
+            'fields': fields,
+            'operator': 'and',
+        }
+        if fuzzy:
+            search_query['fuzziness'] = 'AUTO'
+        if filter_query is None:
+            return {'multi_match': search_query}
+        return {
+            'bool': {
+                'must': [{'multi_match': search_query}],
+                'filter': [filter_query],
+            },
+        }
+
+    async def _mget(self, entity_ids: list[str], source: Optional[Sequence[str]] = None) -> list[Optional[dict]]:
+        """Загрузка сущностей из Elastic одним `mget`."""
+        if not entity_ids:
+            return []
+        try:
+            response = await self.db_client.mget(
+                index=self.db_index,
+                body={'ids': entity_ids},
+                **self._get_source_params(source),
+            )
+        except NotFoundError:
+            return [None] * len(entity_ids)
+        return [doc['_source'] if doc.get('found') else None for doc in response['docs']]
+
+    def _get_from_snapshot(self, entity_id: str, source: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Документ из снимка индекса, ограниченный полями `source`."""
+        data = self.snapshot.get(entity_id)
+        if data is None:
+            return None
+        doc = orjson.loads(data)
+        if not source:
+            return doc
+        return {name: doc[name] for name in source if name in doc}
+
+    def _get_loader(self, source: Optional[Sequence[str]] = None) -> BatchLoader:
+        """Загрузчик, собирающий запросы по id текущего event loop в один `mget`."""
+        loaders = self._loaders.setdefault(asyncio.get_running_loop(), {})
+        source_key = tuple(source) if source else None
+        loader = loaders.get(source_key)
+        if loader is None:
+            loader = BatchLoader(
+                load_many=partial(self._mget, source=source),
+                name=f'es.{self.db_index}.mget',
+                window=self.batch_window,
+            )
+            loaders[source_key] = loader
+        return loader
+
+    @staticmethod
+    def _get_source_params(source: Optional[Sequence[str]]) -> dict:
+        """Параметры запроса, ограничивающие поля документов."""
+        return {'_source_includes': list(source)} if source else {}
+
+    def search_fill_ratio(self) -> Optional[float]:
+        """Средняя заполненность пачек `_msearch` текущего event loop, `None` без объединения поисков."""
+        if not self.batch_searches:
+            return None
+        return self._get_batcher().fill_ratio()
+
+    def _get_batcher(self) -> SearchBatcher:
+        """Объединитель поисковых запросов текущего event loop в `_msearch`."""
+        loop = asyncio.get_running_loop()
+        batcher = self._batchers.get(loop)
+        if batcher is None:
+            batcher = SearchBatcher(
+                db_client=self.db_client,
+                name=f'es.{self.db_index}.msearch',
+                max_batch_size=settings.ES_MSEARCH_MAX_BATCH_SIZE,
+                max_wait=settings.ES_MSEARCH_MAX_WAIT_MS / 1000,
+            )
+            self._batchers[loop] = batcher
+        return batcher
+
+    async def _search(self, body: dict) -> dict:
+        """Поисковый запрос в индекс, при включённом батчинге -- через `_msearch`."""
+        if self.batch_searches:
+            return await self._get_batcher().search(index=self.db_index, body=body)
+        return await self.db_client.search(index=self.db_index, body=body)
@@ -1,38 +1,147 @@
 """Provides the data for the Film models."""
+from typing import Optional, Type, Union
+
 from db.data_providers.elastic import ElasticDataProvider
 
+# Вложенные поля с персонами, по id которых ищутся фильмы.
+# Режиссёры в индексе пока хранятся только именами, без id.
+PERSON_ROLES = ('actors', 'writers')
+
+# Поля полнотекстового поиска фильмов.
+SEARCH_FIELDS = ['title^3', 'description']
+
+# Фасеты фильмов: число фильмов по жанрам, по целым значениям рейтинга и по годам.
+FACET_AGGREGATIONS = {
+    'genres': {
+        'nested': {'path': 'genre'},
+        'aggs': {'ids': {'terms': {'field': 'genre.id', 'size': 100}}},
+    },
+    'imdb_rating': {'histogram': {'field': 'imdb_rating', 'interval': 1}},
+    'creation_date': {'date_histogram': {'field': 'creation_date', 'calendar_interval': 'year', 'format': 'yyyy'}},
+}
+
 
 class FilmsDataProvider(ElasticDataProvider):
     """Provides the data from Elastic for the Film models."""
 
-    async def get_list(self, genre_id: str, **kwargs) -> list[dict]:
-        """Возвращает список фильмов с опциональной фильтрацией по ID жанра."""
-        if genre_id:
-            genre_nested_query = {
-                'path': 'genre',
-                'query': {
+    suggest_field = 'title'
+    suggest_sort = '-imdb_rating'
+
+    async def get_list(self, genre_id: str, facets: bool = False, **kwargs) -> Union[list[dict], dict]:
+        """
+        Возвращает список фильмов с опциональной фильтрацией по ID жанра.
+
+        С `facets` тем же запросом считаются фасеты списка, и возвращается
+        словарь с `items` и `facets`.
+        """
+        result = await self._get_list_from_elastic(
+            query=self._get_genre_query(genre_id),
+            aggs=FACET_AGGREGATIONS if facets else None,
+            **kwargs,
+        )
+        return self._get_items_with_facets(result) if facets else result
+
+    async def get_by_person_id(self, person_id: str, **kwargs) -> list[dict]:
+        """Возвращает фильмы, где персона с `person_id` -- актёр или сценарист."""
+        query = {
+            'bool': {
+                'filter': [{
                     'bool': {
-                        'filter': [{
-                            'term': {
-                                'genre.id': genre_id,
-                            },
-                        }],
+                        'should': [
+                            {
+                                'nested': {
+                                    'path': role,
+                                    'query': {'term': {f'{role}.id': person_id}},
+                                },
+                            }
+                            for role in PERSON_ROLES
+                        ],
+                        'minimum_should_match': 1,
                     },
-                },
-            }
-            query = {
+                }],
+            },
+        }
+        return await self._get_list_from_elastic(query=query, **kwargs)
+
+    async def get_search_result(self, facets: bool = False, **kwargs) -> Union[list[dict], dict]:
+        """
+        Возвращает список фильмов, соответствующий критериям поиска.
+
+        С `facets` тем же запросом (и на том же уровне поиска) считаются
+        фасеты результатов, и возвращается словарь с `items` и `facets`.
+        """
+        if 'fields' not in kwargs:
+            kwargs['fields'] = SEARCH_FIELDS
+        if facets:
+            kwargs['aggs'] = FACET_AGGREGATIONS
+        result = await self._search_elastic(**kwargs)
+        return self._get_items_with_facets(result) if facets else result
+
+    async def get_facets(self, genre_id: Optional[str] = None, query: Optional[str] = None) -> dict:
+        """
+        Фасеты по фильмам жанра `genre_id` (без жанра -- по всем фильмам).
+
+        С `query` фасеты считаются по результатам поиска среди этих фильмов,
+        на том же уровне поиска, что и сами результаты. Фильмы не загружаются.
+        """
+        if query:
+            result = await self._search_elastic(
+                query=query,
+                fields=SEARCH_FIELDS,
+                filter_query=self._get_genre_query(genre_id) if genre_id else None,
+                page_size=0,
+                aggs=FACET_AGGREGATIONS,
+            )
+        else:
+            result = await self._get_list_from_elastic(
+                query=self._get_genre_query(genre_id),
+                page_size=0,
+                aggs=FACET_AGGREGATIONS,
+            )
+        return self._get_facets(result['aggregations'])
+
+    @classmethod
+    def _get_items_with_facets(cls: Type['FilmsDataProvider'], result: dict) -> dict:
+        """Документы страницы и фасеты из агрегаций того же ответа."""
+        return {'items': result['items'], 'facets': cls._get_facets(result['aggregations'])}
+
+    @staticmethod
+    def _get_facets(aggregations: dict) -> dict:
+        """Корзины агрегаций `FACET_AGGREGATIONS` в виде key/count."""
+        buckets = {
+            'genres': aggregations.get('genres', {}).get('ids', {}).get('buckets', []),
+            'imdb_rating': aggregations.get('imdb_rating', {}).get('buckets', []),
+            'creation_date': aggregations.get('creation_date', {}).get('buckets', []),
+        }
+        return {
+            name: [
+                {'key': str(bucket.get('key_as_string', bucket['key'])), 'count': bucket['doc_count']}
+                for bucket in facet_buckets
+            ]
+            for name, facet_buckets in buckets.items()
+        }
+
+    @staticmethod
+    def _get_genre_query(genre_id: Optional[str]) -> dict:
+        """Запрос фильмов жанра `genre_id`, без жанра -- всех фильмов."""
+        if not genre_id:
+            return {'match_all': {}}
+        genre_nested_query = {
+            'path': 'genre',
+            'query': {
                 'bool': {
                     'filter': [{
-                        'nested': genre_nested_query,
+                        'term': {
+                            'genre.id': genre_id,
+                        },
                     }],
                 },
-            }
-        else:
-            query = {'match_all': {}}
-        return await self._get_list_from_elastic(query=query, **kwargs)
-
-    async def get_search_result(self, **kwargs) -> list[dict]:
-        """Возвращает список фильмов, соответствующий критериям поиска."""
-        if 'fields' not in kwargs:
-            kwargs['fields'] = ['title^3', 'description']
-        return await self._search_elastic(**kwargs)
+            },
+        }
+        return {
+            'bool': {
+                'filter': [{
+                    'nested': genre_nested_query,
+                }],
+            },
+        }
@@ -0,0 +1,66 @@
+"""Batching of single-entity loads (DataLoader pattern)."""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from core.metrics import metrics
+
+
+@dataclass
+class BatchLoader:
+    """
+    Groups single loads into batches.
+
+    Collects `load` calls made within one loop tick (or `window` seconds)
+    and resolves them with a single `load_many` call. Every id is loaded
+    once per batch however many callers asked for it.
+    """
+
+    load_many: Callable[[list[str]], Awaitable[list[Optional[dict]]]]
+    name: str
+    window: float = 0.0
+    max_batch_size: int = 1000
+    _pending: dict[str, asyncio.Future] = field(default_factory=dict, init=False, repr=False)
+    _handle: Optional[asyncio.Handle] = field(default=None, init=False, repr=False)
+
+    async def load(self, entity_id: str) -> Optional[dict]:
+        """Load the entity as a part of the next batch."""
+        future = self._pending.get(entity_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[entity_id] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._handle is None:
+                if self.window > 0:
+                    self._handle = loop.call_later(self.window, self._dispatch)
+                else:
+                    self._handle = loop.call_soon(self._dispatch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        """Send the collected ids as one batch."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch: dict[str, asyncio.Future]) -> None:
+        """Load the batch and hand the results out to the callers."""
+        metrics.incr(f'{self.name}.batches')
+        metrics.incr(f'{self.name}.ids', len(batch))
+        ids = list(batch)
+        try:
+            results = await self.load_many(ids)
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for entity_id, result in zip(ids, results):
+            future = batch[entity_id]
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,89 @@
+"""Batching of concurrent Elasticsearch searches into `_msearch`."""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
+
+from elasticsearch.exceptions import HTTP_EXCEPTIONS, TransportError
+
+from core.metrics import metrics
+from db.data_providers.base import AsyncDataProvider
+
+
+@dataclass
+class SearchBatcher:
+    """
+    Groups searches into one `_msearch` request.
+
+    Searches issued within `max_wait` seconds (or until `max_batch_size`
+    of them are collected) are sent together. Every caller gets its own
+    response or its own error, so one failed query does not affect others.
+    """
+
+    db_client: AsyncDataProvider
+    name: str
+    max_batch_size: int
+    max_wait: float
+    _pending: list = field(default_factory=list, init=False, repr=False)
+    _handle: Optional[asyncio.Handle] = field(default=None, init=False, repr=False)
+
+    async def search(self, index: str, body: dict) -> dict:
+        """Run the search as a part of the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((index, body, future))
+        if len(self._pending) >= self.max_batch_size:
+            metrics.incr(f'{self.name}.full_batches')
+            self._dispatch()
+        elif self._handle is None:
+            if self.max_wait > 0:
+                self._handle = loop.call_later(self.max_wait, self._dispatch)
+            else:
+                self._handle = loop.call_soon(self._dispatch)
+        return await asyncio.shield(future)
+
+    def fill_ratio(self) -> float:
+        """Average share of `max_batch_size` filled by the sent batches."""
+        batches = metrics.get(f'{self.name}.batches')
+        if not batches:
+            return 0.0
+        return metrics.get(f'{self.name}.queries') / (batches * self.max_batch_size)
+
+    def _dispatch(self) -> None:
+        """Send the collected searches as one batch."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch: list) -> None:
+        """Run `_msearch` and hand the responses out to the callers."""
+        metrics.incr(f'{self.name}.batches')
+        metrics.incr(f'{self.name}.queries', len(batch))
+        lines = []
+        for index, body, _ in batch:
+            lines.extend(({'index': index}, body))
+        try:
+            response = await self.db_client.msearch(body=lines)
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, _, future), item in zip(batch, response['responses']):
+            if future.done():
+                continue
+            if 'error' in item:
+                future.set_exception(_get_error(item))
+            else:
+                future.set_result(item)
+
+
+def _get_error(item: dict) -> TransportError:
+    """Build the same exception the single `search` would raise."""
+    status = item.get('status', 500)
+    error = item['error']
+    error_type = error.get('type', '') if isinstance(error, dict) else str(error)
+    return HTTP_EXCEPTIONS.get(status, TransportError)(status, error_type, item)
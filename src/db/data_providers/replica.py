@@ -0,0 +1,165 @@
+"""In-memory replica of a small Elasticsearch index."""
+import asyncio
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from core.metrics import metrics
+from db.data_providers.base import BaseDataProvider
+from db.data_providers.elastic import ElasticDataProvider
+
+# Words as the `standard` tokenizer of the indexes splits the text.
+WORD = re.compile(r'\w+')
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str) -> set[str]:
+    """Lower-cased words of the text, as the index analyzer produces them before stemming."""
+    return set(WORD.findall(unicodedata.normalize('NFKC', text).lower()))
+
+
+@dataclass
+class ReplicaDataProvider(BaseDataProvider):
+    """
+    Serves the whole index from memory.
+
+    The snapshot is loaded from `fallback` with `refresh` and swapped at
+    once, so readers never see a partially loaded index. Until the first
+    snapshot is loaded, and for the queries the replica can not answer
+    (cursor pages, fuzzy search), the calls go to `fallback`.
+    """
+
+    fallback: ElasticDataProvider
+    search_fields: Sequence[str]
+    refresh_interval: float = 60.0
+    _docs: Optional[dict[str, dict]] = field(default=None, init=False, repr=False)
+    _words: dict[str, list[set[str]]] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the snapshot is loaded."""
+        return self._docs is not None
+
+    async def refresh(self) -> None:
+        """Reload the snapshot from Elasticsearch."""
+        docs = {doc['id']: doc async for doc in self.fallback.iter_all()}
+        self._words = {
+            entity_id: [tokenize(str(doc.get(name) or '')) for name in self.search_fields]
+            for entity_id, doc in docs.items()
+        }
+        self._docs = docs
+        metrics.incr(f'{self._name}.refreshes')
+        logger.info('Replica of %s is loaded: %d documents', self.fallback.db_index, len(docs))
+
+    async def run(self) -> None:
+        """Refresh the snapshot every `refresh_interval` seconds."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Replica of %s is not refreshed', self.fallback.db_index)
+            await asyncio.sleep(self.refresh_interval)
+
+    async def get_by_id(self, entity_id: str, source: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Загрузка сущности по id из снимка."""
+        if not self.is_ready:
+            return await self.fallback.get_by_id(entity_id, source=source)
+        metrics.incr(f'{self._name}.hits')
+        doc = self._docs.get(entity_id)
+        return self._project(doc, source) if doc is not None else None
+
+    async def get_by_ids(
+            self,
+            entity_ids: list[str],
+            source: Optional[Sequence[str]] = None,
+    ) -> list[Optional[dict]]:
+        """Загрузка сущностей по списку id из снимка."""
+        if not self.is_ready:
+            return await self.fallback.get_by_ids(entity_ids, source=source)
+        metrics.incr(f'{self._name}.hits')
+        docs = (self._docs.get(entity_id) for entity_id in entity_ids)
+        return [self._project(doc, source) if doc is not None else None for doc in docs]
+
+    def mark_changed(self, entity_ids: list[str]) -> None:
+        """Изменённые сущности не читаются из снимка индекса `fallback`; сама реплика обновится с `refresh`."""
+        self.fallback.mark_changed(entity_ids)
+
+    def search_fill_ratio(self) -> Optional[float]:
+        """Заполненность пачек поисков `fallback`."""
+        return self.fallback.search_fill_ratio()
+
+    async def get_list(self, **kwargs) -> list:
+        """Отсортированная страница всех сущностей из снимка."""
+        if not self.is_ready or kwargs.get('cursor') is not None:
+            return await self.fallback.get_list(**kwargs)
+        metrics.incr(f'{self._name}.hits')
+        docs = self._sort(list(self._docs.values()), kwargs.get('sort'))
+        return self._get_page(docs, **kwargs)
+
+    async def get_search_result(self, **kwargs) -> list:
+        """
+        Поиск по снимку.
+
+        Документ подходит, если все слова запроса есть среди слов одного из
+        полей `search_fields` (как `multi_match` с `operator: and`). Слова
+        сравниваются целиком; если так ничего не нашлось, запрос уходит
+        в Elastic, который учитывает словоформы и умеет нечёткий поиск.
+        """
+        if not self.is_ready or kwargs.get('cursor') is not None:
+            return await self.fallback.get_search_result(**kwargs)
+        docs = self._search(kwargs['query'])
+        if not docs:
+            metrics.incr(f'{self._name}.search_fallbacks')
+            return await self.fallback.get_search_result(**kwargs)
+        metrics.incr(f'{self._name}.hits')
+        return self._get_page(docs, **kwargs)
+
+    def _search(self, query: str) -> list[dict]:
+        """Документы, в одном из полей которых есть все слова запроса; совпадения в первом поле выше."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        found = []
+        for entity_id, doc in self._docs.items():
+            matched = [terms <= words for words in self._words[entity_id]]
+            if any(matched):
+                found.append((matched.index(True), doc))
+        found.sort(key=lambda item: item[0])
+        return [doc for _, doc in found]
+
+    @staticmethod
+    def _sort(docs: list[dict], sort: Optional[str]) -> list[dict]:
+        """Сортировка как в Elastic: документы без значения поля идут в конце."""
+        if not sort:
+            return docs
+        reverse = sort.startswith('-')
+        sort_field = sort[1:] if reverse else sort
+        present = [doc for doc in docs if doc.get(sort_field) is not None]
+        missing = [doc for doc in docs if doc.get(sort_field) is None]
+        return sorted(present, key=lambda doc: doc[sort_field], reverse=reverse) + missing
+
+    def _get_page(
+            self,
+            docs: list[dict],
+            page_size: int,
+            page_number: int = 1,
+            source: Optional[Sequence[str]] = None,
+            **kwargs,
+    ) -> list[dict]:
+        """Страница документов с ограничением полей."""
+        start = (page_number - 1) * page_size
+        return [self._project(doc, source) for doc in docs[start:start + page_size]]
+
+    @staticmethod
+    def _project(doc: dict, source: Optional[Sequence[str]]) -> dict:
+        """Оставляет в документе только поля `source`."""
+        if not source:
+            return doc
+        return {name: doc[name] for name in source if name in doc}
+
+    @property
+    def _name(self) -> str:
+        return f'replica.{self.fallback.db_index}'
@@ -0,0 +1,184 @@
+"""Read-only snapshot files of the indexes shared by the workers through `mmap`."""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+import orjson
+
+from core.config import settings
+from core.metrics import metrics
+
+MAGIC = b'MVSNAP01'
+# magic, version (start time of the build in ms), offset of the index, number of documents.
+HEADER = struct.Struct('!8sQQI')
+# hash of the id, offset and length of the record.
+INDEX_ENTRY = struct.Struct('!QQI')
+# length of the id at the start of the record, followed by the id and the JSON document.
+ID_LENGTH = struct.Struct('!H')
+
+logger = logging.getLogger(__name__)
+
+
+def hash_id(entity_id: str) -> int:
+    """Stable 64-bit hash of the id, the same in every process."""
+    return int.from_bytes(hashlib.blake2b(entity_id.encode(), digest_size=8).digest(), 'big')
+
+
+def get_snapshot_path(index: str) -> str:
+    """Path of the snapshot file of the index."""
+    return os.path.join(settings.SNAPSHOT_DIR, f'{index}.snap')
+
+
+async def write_snapshot(path: str, docs: AsyncIterator[dict]) -> int:
+    """
+    Write the documents into a new snapshot file and return their number.
+
+    The file is written next to `path` and renamed over it, so the readers
+    see either the old or the new snapshot, never a partial one. The version
+    is the time the build started: a document changed after it may be stale.
+    """
+    version = int(time.time() * 1000)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    entries = []
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(b'\0' * HEADER.size)
+        offset = HEADER.size
+        async for doc in docs:
+            entity_id = doc['id'].encode()
+            record = ID_LENGTH.pack(len(entity_id)) + entity_id + orjson.dumps(doc)
+            snapshot_file.write(record)
+            entries.append((hash_id(doc['id']), offset, len(record)))
+            offset += len(record)
+        entries.sort()
+        for entry in entries:
+            snapshot_file.write(INDEX_ENTRY.pack(*entry))
+        snapshot_file.seek(0)
+        snapshot_file.write(HEADER.pack(MAGIC, version, offset, len(entries)))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+@dataclass
+class SnapshotFile:
+    """
+    Memory-mapped snapshot of an index.
+
+    The pages of the file are shared by all the worker processes. Every
+    `check_interval` seconds the file is checked for a replacement, and
+    the new version is mapped instead of the old one.
+
+    The snapshot is not read once it is older than `max_age` seconds, nor
+    for the documents marked as changed after it was built, so the caches
+    refilled after an invalidation get the documents from Elasticsearch.
+    """
+
+    path: str
+    check_interval: float = 5.0
+    max_age: float = 0.0
+    _buffer: Optional[memoryview] = field(default=None, init=False, repr=False)
+    _file_id: Optional[tuple[int, int]] = field(default=None, init=False, repr=False)
+    _index_offset: int = field(default=0, init=False, repr=False)
+    _count: int = field(default=0, init=False, repr=False)
+    _version: int = field(default=0, init=False, repr=False)
+    _checked_at: float = field(default=float('-inf'), init=False, repr=False)
+    _changed: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def version(self) -> int:
+        """Build time of the mapped snapshot in ms, 0 if there is none."""
+        return self._version
+
+    @property
+    def is_expired(self) -> bool:
+        """Whether the mapped snapshot is older than `max_age`."""
+        return self.max_age > 0 and time.time() * 1000 - self._version > self.max_age * 1000
+
+    def mark_changed(self, entity_ids: list[str]) -> None:
+        """Stop reading the documents from the snapshots built before now."""
+        now = int(time.time() * 1000)
+        self._changed.update((entity_id, now) for entity_id in entity_ids)
+
+    def get(self, entity_id: str) -> Optional[memoryview]:
+        """Return the serialized document without copying it out of the mapping, `None` if it is missing."""
+        self._reload_if_replaced()
+        buffer = self._buffer
+        if buffer is None:
+            return None
+        if self.is_expired:
+            metrics.incr('snapshot.expired')
+            return None
+        if self._changed.get(entity_id, -1) >= self._version:
+            metrics.incr('snapshot.changed')
+            return None
+        entity_hash = hash_id(entity_id)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            middle_hash, = struct.unpack_from('!Q', buffer, self._index_offset + middle * INDEX_ENTRY.size)
+            if middle_hash < entity_hash:
+                low = middle + 1
+            else:
+                high = middle
+        key = entity_id.encode()
+        for position in range(low, self._count):
+            entry_offset = self._index_offset + position * INDEX_ENTRY.size
+            entry_hash, offset, length = INDEX_ENTRY.unpack_from(buffer, entry_offset)
+            if entry_hash != entity_hash:
+                break
+            id_length, = ID_LENGTH.unpack_from(buffer, offset)
+            start = offset + ID_LENGTH.size
+            if buffer[start:start + id_length] == key:
+                metrics.incr('snapshot.hits')
+                return buffer[start + id_length:offset + length]
+        metrics.incr('snapshot.misses')
+        return None
+
+    def _reload_if_replaced(self) -> None:
+        """Map the file again if it was replaced since the last check."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._buffer = None
+            self._file_id = None
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id == self._file_id:
+            return
+        try:
+            with open(self.path, 'rb') as snapshot_file:
+                mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = memoryview(mapping)
+            magic, version, index_offset, count = HEADER.unpack_from(buffer)
+        except (OSError, ValueError, struct.error):
+            logger.exception('Snapshot %s is not mapped', self.path)
+            return
+        if magic != MAGIC:
+            logger.error('%s is not a snapshot file', self.path)
+            return
+        # The old mapping is unmapped when the last view into it is released.
+        self._buffer, self._file_id = buffer, file_id
+        self._version, self._index_offset, self._count = version, index_offset, count
+        self._changed = {entity_id: changed for entity_id, changed in self._changed.items() if changed >= version}
+        metrics.incr('snapshot.reloads')
+
+
+def get_snapshot(index: str) -> Optional[SnapshotFile]:
+    """Snapshot of the index, `None` if snapshots are disabled."""
+    if not settings.SNAPSHOT_DIR:
+        return None
+    return SnapshotFile(
+        path=get_snapshot_path(index),
+        check_interval=settings.SNAPSHOT_CHECK_INTERVAL,
+        max_age=settings.SNAPSHOT_MAX_AGE,
+    )
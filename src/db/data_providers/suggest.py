@@ -0,0 +1,131 @@
+"""In-memory prefix index for the autocomplete."""
+import asyncio
+import bisect
+import heapq
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Type
+
+from pydantic import BaseModel
+
+from core.metrics import metrics
+from db.data_providers.elastic import ElasticDataProvider
+
+# Sorts after any character, so `prefix + PREFIX_END` bounds the keys starting with the prefix.
+PREFIX_END = '\U0010ffff'
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefixIndex:
+    """
+    Sorted array of the normalized texts for prefix lookups.
+
+    Every text is indexed from the start of each of its words, so `wars`
+    finds `Star Wars`. `rows[i]` is the item of `keys[i]`; the items are
+    numbered from the best one, so the best matches of a prefix are the
+    smallest rows in its range. The top rows of the prefixes up to
+    `precomputed_length` characters, whose ranges are long, are kept in `top`.
+    """
+
+    keys: list[str]
+    rows: list[int]
+    items: list[BaseModel]
+    top: dict[str, list[int]]
+    limit: int
+    precomputed_length: int
+
+    @classmethod
+    def build(
+            cls: Type['PrefixIndex'],
+            texts: list[str],
+            items: list[BaseModel],
+            limit: int = 10,
+            precomputed_length: int = 3,
+    ) -> 'PrefixIndex':
+        """Build the index of the normalized `texts` of the `items`, given from the best one."""
+        entries = []
+        top: dict[str, list[int]] = {}
+        for row, text in enumerate(texts):
+            words = text.split(' ')
+            starts = {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+            entries.extend((start, row) for start in starts)
+            for prefix in {start[:length] for start in starts for length in range(1, precomputed_length + 1)}:
+                rows = top.setdefault(prefix, [])
+                if len(rows) < limit:
+                    rows.append(row)
+        entries.sort()
+        return cls(
+            keys=[key for key, _ in entries],
+            rows=[row for _, row in entries],
+            items=items,
+            top=top,
+            limit=limit,
+            precomputed_length=precomputed_length,
+        )
+
+    def search(self, prefix: str, size: int) -> list[BaseModel]:
+        """Return the best `size` items with a word starting with `prefix`, at most `limit`."""
+        size = min(size, self.limit)
+        if len(prefix) <= self.precomputed_length:
+            rows = self.top.get(prefix, [])[:size]
+        else:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + PREFIX_END, start)
+            rows = heapq.nsmallest(size, set(self.rows[start:end]))
+        return [self.items[row] for row in rows]
+
+
+@dataclass
+class SuggestIndex:
+    """
+    Answers the autocomplete queries from a prefix index in process memory.
+
+    The index is built from the `suggest_field` of every document of the
+    `db` index, ranked by its `suggest_sort`, and rebuilt every
+    `refresh_interval` seconds.
+    """
+
+    db: ElasticDataProvider
+    model_class: Type[BaseModel]
+    normalize: Callable[[str], str]
+    limit: int = 10
+    refresh_interval: float = 300.0
+    _index: Optional[PrefixIndex] = field(default=None, init=False, repr=False)
+
+    def suggest(self, prefix: str, size: int) -> Optional[list[BaseModel]]:
+        """Suggestions for the normalized prefix or `None` if the index is not loaded."""
+        if self._index is None:
+            metrics.incr(f'suggest.{self.db.db_index}.misses')
+            return None
+        metrics.incr(f'suggest.{self.db.db_index}.hits')
+        return self._index.search(prefix, size)
+
+    async def refresh(self) -> None:
+        """Rebuild the index from the documents of the `db` index."""
+        text_field = self.db.suggest_field
+        sort = self.db.suggest_sort
+        score_field = sort.lstrip('-') if sort else None
+        source = ['id', text_field] + ([score_field] if score_field else [])
+        docs = [doc async for doc in self.db.iter_all(source=source) if doc.get(text_field)]
+        docs = [(self.normalize(doc[text_field]), doc) for doc in docs]
+        docs.sort(key=lambda text_doc: text_doc[0])
+        if score_field:
+            # Stable, so the documents with equal scores stay in the order of their texts.
+            docs.sort(key=lambda text_doc: text_doc[1].get(score_field) or 0, reverse=sort.startswith('-'))
+        self._index = PrefixIndex.build(
+            texts=[text for text, _ in docs],
+            items=[self.model_class(**doc) for _, doc in docs],
+            limit=self.limit,
+        )
+        logger.info('Suggestions of %s are loaded: %d documents', self.db.db_index, len(docs))
+
+    async def run(self) -> None:
+        """Rebuild the index every `refresh_interval` seconds."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Suggestions of %s are not refreshed', self.db.db_index)
+            await asyncio.sleep(self.refresh_interval)
@@ -47,3 +47,14 @@ class MissedQueryParameterException(HTTPException):
             detail=f'Query parameter is required: {parameter}.',
             headers=headers,
         )
+
+
+class InvalidCursorException(HTTPException):
+    """Page cursor is malformed."""
+
+    def __init__(self, headers: Optional[dict[str, Any]] = None) -> None:
+        super(InvalidCursorException, self).__init__(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Invalid page cursor.',
+            headers=headers,
+        )
@@ -0,0 +1,38 @@
+"""Сброс всего кеша моделей, например после переиндексации.
+
+Пример: python flush_cache.py film person
+"""
+import argparse
+import asyncio
+
+import aioredis
+
+from core.config import settings
+from db.cache.redis import Cache
+from models.film import Film
+from models.genre import Genre
+from models.person import Person
+
+MODELS = {'film': Film, 'person': Person, 'genre': Genre}
+
+
+async def main() -> None:
+    """Сбрасывает кеш моделей из аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('models', nargs='+', choices=list(MODELS))
+    args = parser.parse_args()
+
+    redis = await aioredis.create_redis((settings.REDIS_HOST, settings.REDIS_PORT))
+    try:
+        for model in args.models:
+            cache = Cache(cache_client=redis, model_class=MODELS[model])
+            await cache.flush()
+        # Даём фоновой очистке старого поколения закончиться до выхода.
+        await asyncio.gather(*(task for task in asyncio.all_tasks() if task is not asyncio.current_task()))
+    finally:
+        redis.close()
+        await redis.wait_closed()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
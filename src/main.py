@@ -1,14 +1,24 @@
 """Конфигурация FastAPI сервиса."""
+import asyncio
+
 import aioredis
 import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
+from api import metrics
 from api.v1 import films, genres, persons
 from core.config import settings
 from db.cache import redis
+from db.cache.invalidation import InvalidationConsumer
+from db.cache.resilience import get_write_queue
+from db.cache.sharded import create_sharded_storage
+from db.cache.tracking import TrackingCacheStorage
 from db.data_providers import elastic
+from services.film import get_film_service
+from services.genre import get_genres_service
+from services.person import get_persons_service
 
 app = FastAPI(
     title="Read-only API для онлайн-кинотеатра",
@@ -23,17 +33,70 @@ app = FastAPI(
 @app.on_event('startup')
 async def startup() -> None:
     """Запуск сервиса."""
-    redis.redis = await aioredis.create_redis_pool(
-        (settings.REDIS_HOST, settings.REDIS_PORT), minsize=10, maxsize=20,
-    )
+    if settings.REDIS_CACHE_NODES:
+        redis.redis = await create_sharded_storage(
+            addresses=settings.REDIS_CACHE_NODES.split(','),
+            virtual_nodes=settings.REDIS_CACHE_VIRTUAL_NODES,
+        )
+    else:
+        redis.redis = await aioredis.create_redis_pool(
+            (settings.REDIS_HOST, settings.REDIS_PORT), minsize=10, maxsize=20,
+        )
+    if settings.CACHE_TRACKING_MODELS and not settings.REDIS_CACHE_NODES:
+        storage = TrackingCacheStorage(
+            redis=redis.redis,
+            address=(settings.REDIS_HOST, settings.REDIS_PORT),
+            prefixes=[f'{model.strip()}:' for model in settings.CACHE_TRACKING_MODELS.split(',')],
+            max_entries=settings.CACHE_TRACKING_MAX_ENTRIES,
+            ping_interval=settings.CACHE_TRACKING_PING_INTERVAL,
+        )
+        await storage.start()
+        redis.redis = storage
     elastic.es = AsyncElasticsearch(
         hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}'],
     )
+    film_service = get_film_service(cache=redis.redis, db=elastic.es)
+    if film_service.person_films is not None:
+        app.state.person_films = asyncio.ensure_future(film_service.person_films.run())
+    if settings.FILM_COLUMNAR_INDEX_ENABLED:
+        app.state.film_columns = asyncio.ensure_future(film_service.columns.run())
+    if settings.SUGGEST_INDEX_ENABLED:
+        app.state.film_suggestions = asyncio.ensure_future(film_service.suggestions.run())
+        persons_service = get_persons_service(cache=redis.redis, db=elastic.es)
+        app.state.person_suggestions = asyncio.ensure_future(persons_service.suggestions.run())
+    if settings.GENRES_REPLICA_ENABLED:
+        genres_service = get_genres_service(cache=redis.redis, db=elastic.es)
+        app.state.genres_replica = asyncio.ensure_future(genres_service.db.run())
+    if settings.CACHE_INVALIDATION_ENABLED:
+        consumer = InvalidationConsumer(
+            cache_client=redis.redis,
+            stream=settings.CACHE_INVALIDATION_STREAM,
+            handlers={
+                'film': [film_service.invalidate],
+                'person': [get_persons_service(cache=redis.redis, db=elastic.es).invalidate],
+                'genre': [get_genres_service(cache=redis.redis, db=elastic.es).invalidate],
+            },
+        )
+        app.state.invalidation = asyncio.ensure_future(consumer.run())
 
 
 @app.on_event('shutdown')
 async def shutdown() -> None:
     """Завершение работы сервиса."""
+    if settings.GENRES_REPLICA_ENABLED:
+        app.state.genres_replica.cancel()
+    if settings.CACHE_INVALIDATION_ENABLED:
+        app.state.invalidation.cancel()
+        if settings.PERSON_FILMS_INDEX_ENABLED:
+            app.state.person_films.cancel()
+    if settings.FILM_COLUMNAR_INDEX_ENABLED:
+        app.state.film_columns.cancel()
+    if settings.SUGGEST_INDEX_ENABLED:
+        app.state.film_suggestions.cancel()
+        app.state.person_suggestions.cancel()
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        write_queue.close()
     redis.redis.close()
     await redis.redis.wait_closed()
     await elastic.es.close()
@@ -42,6 +105,7 @@ async def shutdown() -> None:
 app.include_router(films.router, prefix='/api/v1/films')
 app.include_router(genres.router, prefix='/api/v1/genres')
 app.include_router(persons.router, prefix='/api/v1/persons')
+app.include_router(metrics.router, prefix='/metrics')
 
 if __name__ == '__main__':
     uvicorn.run(
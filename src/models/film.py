@@ -53,3 +53,33 @@ def map_film_response(f: Film) -> FilmAPIResponse:
         writers=f.writers,
         genre=f.genre,
     )
+
+
+class FacetBucketAPIResponse(BaseModel, ConfigOverrideMixin):
+    """Значение фасета и число фильмов с ним."""
+
+    key: str
+    count: int
+
+
+class FilmFacetsAPIResponse(BaseModel, ConfigOverrideMixin):
+    """Фасеты фильмов: по id жанров, целым значениям рейтинга и годам создания."""
+
+    genres: list[FacetBucketAPIResponse]
+    imdb_rating: list[FacetBucketAPIResponse]
+    creation_date: list[FacetBucketAPIResponse]
+
+
+class FilmSuggestAPIResponse(BaseModel, ConfigOverrideMixin):
+    """Подсказка с фильмом для автодополнения."""
+
+    id: str
+    title: str
+    imdb_rating: float
+
+
+def map_film_suggest_response(f: Film) -> FilmSuggestAPIResponse:
+    """
+    Возвращает подсказку с фильмом для выдачи по API.
+    """
+    return FilmSuggestAPIResponse(id=f.id, title=f.title, imdb_rating=f.imdb_rating)
@@ -20,3 +20,10 @@ class GenreAPIResponse(BaseModel, ConfigOverrideMixin):
     id: str
     name: str = Field(title='Название жанра')
     description: Optional[str] = Field(title='Описание жанра')
+
+
+def map_genre_response(g: Genre) -> GenreAPIResponse:
+    """
+    Возвращает модель жанра для выдачи по API.
+    """
+    return GenreAPIResponse(**g.dict())
@@ -18,6 +18,13 @@ class PersonAPIResponse(BaseModel, ConfigOverrideMixin):
     name: str
 
 
+def map_person_response(p: Person) -> PersonAPIResponse:
+    """
+    Возвращает модель персоны для выдачи по API.
+    """
+    return PersonAPIResponse(**p.dict())
+
+
 class Actor(Person):
     """Модель актёра."""
 
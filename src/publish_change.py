@@ -0,0 +1,31 @@
+"""Публикация события об изменении сущности в поток сброса кеша (замена ETL для локальной разработки).
+
+Пример: python publish_change.py film 3d825f60-9fff-4dfe-b294-1a45fa1e115d upsert
+"""
+import argparse
+import asyncio
+
+import aioredis
+
+from core.config import settings
+from db.cache.invalidation import DELETE, UPSERT, publish_change
+
+
+async def main() -> None:
+    """Публикует событие из аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('entity', choices=['film', 'person', 'genre'])
+    parser.add_argument('entity_id')
+    parser.add_argument('op', choices=[UPSERT, DELETE], nargs='?', default=UPSERT)
+    args = parser.parse_args()
+
+    redis = await aioredis.create_redis((settings.REDIS_HOST, settings.REDIS_PORT))
+    try:
+        await publish_change(redis, settings.CACHE_INVALIDATION_STREAM, args.entity, args.entity_id, args.op)
+    finally:
+        redis.close()
+        await redis.wait_closed()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,11 +1,14 @@
 """Base abstraction for a service."""
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Optional, Sequence
 
 from pydantic import BaseModel
 
+from core.config import settings
 from db.cache.base import BaseCache
 from db.data_providers.base import BaseDataProvider
+from db.data_providers.suggest import SuggestIndex
+from services.query import normalize_query
 
 
 @dataclass
@@ -14,24 +17,150 @@ class BaseService:
 
     db: BaseDataProvider
     cache: BaseCache
+    search_window: int = settings.SEARCH_WINDOW_SIZE
+    list_block_size: int = settings.LIST_BLOCK_SIZE
+    suggestions: Optional[SuggestIndex] = None
 
-    async def get_by_id(self, film_id: str) -> Optional[BaseModel]:
+    async def get_by_id(self, film_id: str, source: Optional[Sequence[str]] = None) -> Optional[BaseModel]:
         """Загрузка сущности по id."""
         return await self.cache.get_from_cache_or_db(
             get_from_db=self.db.get_by_id,
             entity_id=film_id,
+            source=source,
+        )
+
+    async def get_by_ids(self, entity_ids: list[str], source: Optional[Sequence[str]] = None) -> list[BaseModel]:
+        """Загрузка сущностей по списку id с сохранением порядка."""
+        return await self.cache.get_many_from_cache_or_db(
+            get_by_id=self.db.get_by_id,
+            get_by_ids=self.db.get_by_ids,
+            entity_ids=entity_ids,
+            source=source,
         )
 
     async def get_list(self, **kwargs) -> list[BaseModel]:
         """Загрузка списка сущностей по заданным параметрам."""
-        return await self.cache.get_from_cache_or_db(
+        return await self._get_list_entities(self.db.get_list, **kwargs)
+
+    async def get_search_result(self, **kwargs) -> list[BaseModel]:
+        """Возвращает список фильмов, соответствующий критериям поиска."""
+        return await self._get_search_entities(self.db.get_search_result, **self._normalize_search(kwargs))
+
+    async def get_list_page(self, **kwargs) -> tuple[list[BaseModel], Optional[str]]:
+        """Страница списка сущностей по курсору и курсор следующей страницы."""
+        return await self.cache.get_page_from_cache_or_db(
             get_from_db=self.db.get_list,
             **kwargs,
         )
 
-    async def get_search_result(self, **kwargs) -> list[BaseModel]:
-        """Возвращает список фильмов, соответствующий критериям поиска."""
-        return await self.cache.get_from_cache_or_db(
+    async def get_search_result_page(self, **kwargs) -> tuple[list[BaseModel], Optional[str]]:
+        """Страница результатов поиска по курсору и курсор следующей страницы."""
+        return await self.cache.get_page_from_cache_or_db(
+            get_from_db=self.db.get_search_result,
+            **self._normalize_search(kwargs),
+        )
+
+    async def get_by_id_response(
+            self,
+            to_response: Callable,
+            entity_id: str,
+            source: Optional[Sequence[str]] = None,
+    ) -> Optional[bytes]:
+        """Готовый JSON ответа API для сущности по id."""
+        return await self.cache.get_response_from_cache_or_db(
+            get_from_db=self.db.get_by_id,
+            to_response=to_response,
+            entity_id=entity_id,
+            source=source,
+        )
+
+    async def get_list_response(self, to_response: Callable, **kwargs) -> bytes:
+        """Готовый JSON ответа API для списка сущностей."""
+        return await self.cache.get_response_from_cache_or_db(
+            get_from_db=self.db.get_list,
+            to_response=to_response,
+            get_entities=self._get_list_entities,
+            **kwargs,
+        )
+
+    async def get_search_result_response(self, to_response: Callable, **kwargs) -> bytes:
+        """Готовый JSON ответа API для результатов поиска."""
+        return await self.cache.get_response_from_cache_or_db(
             get_from_db=self.db.get_search_result,
+            to_response=to_response,
+            get_entities=self._get_search_entities,
+            **self._normalize_search(kwargs),
+        )
+
+    async def suggest(self, query: str, size: int, source: Optional[Sequence[str]] = None) -> list[BaseModel]:
+        """
+        Подсказки по началу слов для автодополнения.
+
+        Берутся из индекса в памяти воркера, а пока он не загружен
+        (или выключен) -- из Elastic через кэш.
+        """
+        query = normalize_query(query)
+        if self.suggestions is not None:
+            suggestions = self.suggestions.suggest(query, size)
+            if suggestions is not None:
+                return suggestions
+        return await self.cache.get_from_cache_or_db(
+            get_from_db=self.db.get_suggestions,
+            query=query,
+            page_size=size,
+            source=source,
+        )
+
+    async def invalidate(self, entity_ids: list[str], deleted: bool = False) -> None:
+        """Сбрасывает кэш после изменения или удаления сущностей; кэш заполнится уже не из снимка индекса."""
+        self.db.mark_changed(entity_ids)
+        lists = [] if deleted else await self._get_changed_lists(entity_ids)
+        await self.cache.invalidate(entity_ids, lists=lists)
+
+    async def _get_changed_lists(self, entity_ids: list[str]) -> list[dict]:
+        """
+        Фильтры списков, в которых изменённые сущности могли появиться или сдвинуться.
+
+        Списки, где сущности уже есть, сбрасываются по их тегам; по умолчанию
+        сбрасываются только списки без фильтров.
+        """
+        return [{}]
+
+    async def _get_entities(self, get_from_db: Callable, **kwargs) -> list[BaseModel]:
+        """Загрузка списка сущностей через кэш."""
+        return await self.cache.get_list_from_cache_or_db(
+            get_from_db=get_from_db,
+            get_by_id=self.db.get_by_id,
+            get_by_ids=self.db.get_by_ids,
+            **kwargs,
+        )
+
+    async def _get_search_entities(self, get_from_db: Callable, **kwargs) -> list[BaseModel]:
+        """Загрузка результатов поиска через кэш, с `search_window` -- срезом из окна первых id."""
+        if not self.search_window:
+            return await self._get_entities(get_from_db, **kwargs)
+        return await self.cache.get_blocks_from_cache_or_db(
+            get_from_db=get_from_db,
+            get_by_id=self.db.get_by_id,
+            get_by_ids=self.db.get_by_ids,
+            block_size=self.search_window,
+            max_blocks=1,
             **kwargs,
         )
+
+    async def _get_list_entities(self, get_from_db: Callable, **kwargs) -> list[BaseModel]:
+        """Загрузка списка через кэш, с `list_block_size` -- из выровненных блоков id, общих для любых страниц."""
+        if not self.list_block_size:
+            return await self._get_entities(get_from_db, **kwargs)
+        return await self.cache.get_blocks_from_cache_or_db(
+            get_from_db=get_from_db,
+            get_by_id=self.db.get_by_id,
+            get_by_ids=self.db.get_by_ids,
+            block_size=self.list_block_size,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _normalize_search(kwargs: dict) -> dict:
+        """Параметры поиска с нормализованным запросом: он же попадает в ключ кэша и в запрос к Elastic."""
+        return {**kwargs, 'query': normalize_query(kwargs['query'])}
@@ -1,18 +1,25 @@
 """Сервис загрузки кинопроизведений."""
 from dataclasses import dataclass
-from functools import lru_cache
+from functools import lru_cache, wraps
+from typing import Callable, Optional, Sequence
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
 from core.config import settings
 from db.cache.base import AsyncCacheStorage
-from db.cache.redis import Cache, get_redis
+from db.cache.local import get_local_cache
+from db.cache.person_films import PersonFilmsIndex
+from db.cache.redis import Cache, get_cache_ttl, get_redis
 from db.data_providers.base import AsyncDataProvider
+from db.data_providers.columnar import FilmColumnarIndex
 from db.data_providers.elastic import get_elastic
-from db.data_providers.films import FilmsDataProvider
+from db.data_providers.films import PERSON_ROLES, FilmsDataProvider
+from db.data_providers.snapshot import get_snapshot
+from db.data_providers.suggest import SuggestIndex
 from models.film import Film
 from services.base_service import BaseService
+from services.query import normalize_query
 
 FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5
 
@@ -23,6 +30,142 @@ class FilmService(BaseService):
 
     db: FilmsDataProvider
     cache: Cache
+    person_films: Optional[PersonFilmsIndex] = None
+    columns: Optional[FilmColumnarIndex] = None
+
+    async def get_list(self, **kwargs) -> list[Film]:
+        """
+        Список фильмов с сортировкой и фильтром по жанру.
+
+        Если загружен колоночный индекс, страница id берётся из него,
+        а фильмы -- из кэша; иначе список запрашивается у Elastic.
+        """
+        if self.columns is not None:
+            film_ids = self.columns.get_ids(**kwargs)
+            if film_ids is not None:
+                return await self.get_by_ids(film_ids, source=kwargs.get('source'))
+        get_from_db = self._fill_facets(self.db.get_list, genre_id=kwargs.get('genre_id'))
+        return await self._get_list_entities(get_from_db, **kwargs)
+
+    async def get_search_result(self, **kwargs) -> list[Film]:
+        """Результаты поиска фильмов; пока фасетов поиска нет в кэше, они считаются тем же запросом."""
+        kwargs = self._normalize_search(kwargs)
+        get_from_db = self._fill_facets(self.db.get_search_result, genre_id=None, query=kwargs['query'])
+        return await self._get_search_entities(get_from_db, **kwargs)
+
+    async def get_list_response(self, to_response: Callable, **kwargs) -> bytes:
+        """Готовый JSON ответа API для списка фильмов."""
+        async def get_entities(_: Callable, **entities_kwargs) -> list[Film]:
+            return await self.get_list(**entities_kwargs)
+
+        return await self.cache.get_response_from_cache_or_db(
+            get_from_db=self.db.get_list,
+            to_response=to_response,
+            get_entities=get_entities,
+            **kwargs,
+        )
+
+    async def get_search_result_response(self, to_response: Callable, **kwargs) -> bytes:
+        """Готовый JSON ответа API для результатов поиска фильмов."""
+        async def get_entities(_: Callable, **entities_kwargs) -> list[Film]:
+            return await self.get_search_result(**entities_kwargs)
+
+        return await self.cache.get_response_from_cache_or_db(
+            get_from_db=self.db.get_search_result,
+            to_response=to_response,
+            get_entities=get_entities,
+            **self._normalize_search(kwargs),
+        )
+
+    async def get_facets(self, genre_id: Optional[str] = None, query: Optional[str] = None) -> dict:
+        """
+        Фасеты по фильмам жанра или по результатам поиска.
+
+        Обычно они уже в кэше: их заполняет первая загруженная страница того
+        же списка или поиска. Иначе фасеты считаются отдельным запросом.
+        """
+        params = {'genre_id': genre_id}
+        if query:
+            params = self._normalize_search({**params, 'query': query})
+        return await self.cache.get_facets_from_cache_or_db(get_from_db=self.db.get_facets, **params)
+
+    def _fill_facets(self, get_from_db: Callable, **facets_params) -> Callable:
+        """
+        Обёртка `get_from_db`, которая, пока фасетов с `facets_params` нет в кэше, считает их тем же запросом.
+
+        Посчитанные фасеты кладутся в кэш, так что запросу фасетов не нужен
+        отдельный поиск. Имя функции сохраняется, ключи кэша страниц не меняются.
+        """
+        @wraps(get_from_db)
+        async def get_with_facets(**kwargs) -> list[dict]:
+            if await self.cache.get_cached_facets(self.db.get_facets, **facets_params) is not None:
+                return await get_from_db(**kwargs)
+            result = await get_from_db(facets=True, **kwargs)
+            await self.cache.set_facets(self.db.get_facets, result['facets'], **facets_params)
+            return result['items']
+
+        return get_with_facets
+
+    async def invalidate(self, entity_ids: list[str], deleted: bool = False) -> None:
+        """Сбрасывает кэш фильмов и обновляет по ним обратный индекс персона -> фильмы."""
+        await super().invalidate(entity_ids, deleted=deleted)
+        if self.person_films is None:
+            return
+        if deleted:
+            for film_id in entity_ids:
+                await self.person_films.remove_film(film_id)
+            return
+        for film in await self.db.get_by_ids(entity_ids):
+            if film is not None:
+                await self.person_films.update_film(film)
+
+    async def _get_changed_lists(self, entity_ids: list[str]) -> list[dict]:
+        """Все фильмы, а также фильмы жанров и персон изменённых фильмов."""
+        lists = [{}]
+        for film in await self.db.get_by_ids(entity_ids):
+            if film is None:
+                continue
+            lists.extend({'genre_id': genre['id']} for genre in film.get('genre', []))
+            lists.extend({'person_id': person['id']} for role in PERSON_ROLES for person in film.get(role, []))
+        return lists
+
+    async def get_by_person_id(
+            self,
+            person_id: str,
+            page_size: int,
+            page_number: int,
+            source: Optional[Sequence[str]] = None,
+    ) -> list[Film]:
+        """
+        Фильмы, где участвовала персона, по убыванию рейтинга.
+
+        Если построен обратный индекс персона -> фильмы, берём из него
+        страницу id и достаём фильмы из кэша; иначе ищем точным запросом по id.
+        """
+        if self.person_films is not None:
+            film_ids = await self.person_films.get_film_ids(person_id, page_size, page_number)
+            if film_ids is not None:
+                return await self.get_by_ids(film_ids, source=source)
+        return await self._get_entities(
+            self.db.get_by_person_id,
+            person_id=person_id,
+            sort='-imdb_rating',
+            page_size=page_size,
+            page_number=page_number,
+            source=source,
+        )
+
+    async def get_by_person_id_response(self, to_response: Callable, **kwargs) -> bytes:
+        """Готовый JSON ответа API со списком фильмов персоны."""
+        async def get_entities(_: Callable, **entities_kwargs) -> list[Film]:
+            return await self.get_by_person_id(**entities_kwargs)
+
+        return await self.cache.get_response_from_cache_or_db(
+            get_from_db=self.db.get_by_person_id,
+            to_response=to_response,
+            get_entities=get_entities,
+            **kwargs,
+        )
 
 
 @lru_cache()
@@ -40,14 +183,48 @@ def get_film_service(
     Returns:
         FilmService:
     """
+    films_data_provider = FilmsDataProvider(
+        db_client=db,
+        db_index=settings.MOVIES_ES_INDEX,
+        snapshot=get_snapshot(settings.MOVIES_ES_INDEX),
+    )
+    person_films = None
+    if settings.PERSON_FILMS_INDEX_ENABLED and settings.CACHE_INVALIDATION_ENABLED:
+        person_films = PersonFilmsIndex(
+            cache_client=cache,
+            db=films_data_provider,
+            rebuild_interval=settings.PERSON_FILMS_REBUILD_INTERVAL,
+            read_timeout=settings.CACHE_READ_TIMEOUT_MS / 1000,
+        )
+    columns = None
+    if settings.FILM_COLUMNAR_INDEX_ENABLED:
+        columns = FilmColumnarIndex(
+            db=films_data_provider,
+            refresh_interval=settings.FILM_COLUMNAR_REFRESH_INTERVAL,
+            max_bytes=settings.FILM_COLUMNAR_MAX_BYTES,
+        )
+    suggestions = None
+    if settings.SUGGEST_INDEX_ENABLED:
+        suggestions = SuggestIndex(
+            db=films_data_provider,
+            model_class=Film,
+            normalize=normalize_query,
+            limit=settings.SUGGEST_MAX_SIZE,
+            refresh_interval=settings.SUGGEST_INDEX_REFRESH_INTERVAL,
+        )
     return FilmService(
-        db=FilmsDataProvider(
-            db_client=db,
-            db_index=settings.MOVIES_ES_INDEX,
-        ),
+        db=films_data_provider,
         cache=Cache(
             cache_client=cache,
             model_class=Film,
-            ttl=FILM_CACHE_EXPIRE_IN_SECONDS,
+            ttl=get_cache_ttl(FILM_CACHE_EXPIRE_IN_SECONDS),
+            local_cache=get_local_cache(
+                max_entries=settings.FILM_LOCAL_CACHE_MAX_ENTRIES,
+                max_bytes=settings.FILM_LOCAL_CACHE_MAX_BYTES,
+                ttl=settings.FILM_LOCAL_CACHE_TTL,
+            ),
         ),
+        person_films=person_films,
+        columns=columns,
+        suggestions=suggestions,
     )
@@ -1,16 +1,21 @@
 """Сервис загрузки жанров."""
 from dataclasses import dataclass
 from functools import lru_cache
+from typing import Union
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
 from core.config import settings
 from db.cache.base import AsyncCacheStorage
-from db.cache.redis import Cache, get_redis
+from db.cache.direct import DirectCache
+from db.cache.local import get_local_cache
+from db.cache.redis import Cache, get_cache_ttl, get_redis
 from db.data_providers.base import AsyncDataProvider
 from db.data_providers.elastic import get_elastic
 from db.data_providers.genres import GenresDataProvider
+from db.data_providers.replica import ReplicaDataProvider
+from db.data_providers.snapshot import get_snapshot
 from models.genre import Genre
 from services.base_service import BaseService
 
@@ -21,8 +26,14 @@ GENRE_CACHE_EXPIRE_IN_SECONDS = 60 * 5
 class GenresService(BaseService):
     """Сервис загрузки жанров."""
 
-    db: GenresDataProvider
-    cache: Cache
+    db: Union[GenresDataProvider, ReplicaDataProvider]
+    cache: Union[Cache, DirectCache]
+
+    async def invalidate(self, entity_ids: list[str], deleted: bool = False) -> None:
+        """Сбрасывает кэш жанров, а реплику индекса в памяти загружает заново."""
+        await super().invalidate(entity_ids, deleted=deleted)
+        if isinstance(self.db, ReplicaDataProvider):
+            await self.db.refresh()
 
 
 @lru_cache()
@@ -40,14 +51,30 @@ def get_genres_service(
     Returns:
         GenresService:
     """
+    genres_data_provider = GenresDataProvider(
+        db_client=db,
+        db_index=settings.GENRES_ES_INDEX,
+        snapshot=get_snapshot(settings.GENRES_ES_INDEX),
+    )
+    if settings.GENRES_REPLICA_ENABLED:
+        return GenresService(
+            db=ReplicaDataProvider(
+                fallback=genres_data_provider,
+                search_fields=GenresDataProvider.search_fields,
+                refresh_interval=settings.GENRES_REPLICA_REFRESH_INTERVAL,
+            ),
+            cache=DirectCache(model_class=Genre),
+        )
     return GenresService(
-        db=GenresDataProvider(
-            db_client=db,
-            db_index=settings.GENRES_ES_INDEX,
-        ),
+        db=genres_data_provider,
         cache=Cache(
             cache_client=cache,
             model_class=Genre,
-            ttl=GENRE_CACHE_EXPIRE_IN_SECONDS,
+            ttl=get_cache_ttl(GENRE_CACHE_EXPIRE_IN_SECONDS),
+            local_cache=get_local_cache(
+                max_entries=settings.GENRE_LOCAL_CACHE_MAX_ENTRIES,
+                max_bytes=settings.GENRE_LOCAL_CACHE_MAX_BYTES,
+                ttl=settings.GENRE_LOCAL_CACHE_TTL,
+            ),
         ),
     )
@@ -7,12 +7,16 @@ from fastapi import Depends
 
 from core.config import settings
 from db.cache.base import AsyncCacheStorage
-from db.cache.redis import Cache, get_redis
+from db.cache.local import get_local_cache
+from db.cache.redis import Cache, get_cache_ttl, get_redis
 from db.data_providers.base import AsyncDataProvider
 from db.data_providers.elastic import get_elastic
 from db.data_providers.persons import PersonsDataProvider
+from db.data_providers.snapshot import get_snapshot
+from db.data_providers.suggest import SuggestIndex
 from models.person import Person
 from services.base_service import BaseService
+from services.query import normalize_query
 
 PERSON_CACHE_EXPIRE_IN_SECONDS = 60 * 5
 
@@ -40,14 +44,31 @@ def get_persons_service(
     Returns:
         PersonsService:
     """
+    persons_data_provider = PersonsDataProvider(
+        db_client=db,
+        db_index=settings.PERSONS_ES_INDEX,
+        snapshot=get_snapshot(settings.PERSONS_ES_INDEX),
+    )
+    suggestions = None
+    if settings.SUGGEST_INDEX_ENABLED:
+        suggestions = SuggestIndex(
+            db=persons_data_provider,
+            model_class=Person,
+            normalize=normalize_query,
+            limit=settings.SUGGEST_MAX_SIZE,
+            refresh_interval=settings.SUGGEST_INDEX_REFRESH_INTERVAL,
+        )
     return PersonsService(
-        db=PersonsDataProvider(
-            db_client=db,
-            db_index=settings.PERSONS_ES_INDEX,
-        ),
+        db=persons_data_provider,
         cache=Cache(
             cache_client=cache,
             model_class=Person,
-            ttl=PERSON_CACHE_EXPIRE_IN_SECONDS,
+            ttl=get_cache_ttl(PERSON_CACHE_EXPIRE_IN_SECONDS),
+            local_cache=get_local_cache(
+                max_entries=settings.PERSON_LOCAL_CACHE_MAX_ENTRIES,
+                max_bytes=settings.PERSON_LOCAL_CACHE_MAX_BYTES,
+                ttl=settings.PERSON_LOCAL_CACHE_TTL,
+            ),
         ),
+        suggestions=suggestions,
     )
@@ -0,0 +1,39 @@
+"""Нормализация поисковых запросов."""
+import re
+import unicodedata
+
+from core.config import settings
+
+# Стоп-слова фильтров `_english_` и `_russian_` анализатора `ru_en` индексов.
+ENGLISH_STOP_WORDS = frozenset((
+    'a an and are as at be but by for if in into is it no not of on or such '
+    'that the their then there these they this to was will with'
+).split())
+RUSSIAN_STOP_WORDS = frozenset((
+    'и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот '
+    'от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до вас нибудь опять '
+    'уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без '
+    'будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один '
+    'почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два об другой хоть после '
+    'над больше тот через эти нас про всего них какая много разве три эту моя впрочем хорошо свою этой перед '
+    'иногда лучше чуть том нельзя такой им более всегда конечно всю между'
+).split())
+STOP_WORDS = ENGLISH_STOP_WORDS | RUSSIAN_STOP_WORDS
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query: str, strip_stop_words: bool = settings.SEARCH_STRIP_STOP_WORDS) -> str:
+    """
+    Приводит запрос к виду, одинаковому для всех написаний, которые анализатор индекса не различает.
+
+    Символы приводятся к форме NFKC и нижнему регистру (как фильтр `lowercase`),
+    пробелы схлопываются. С `strip_stop_words` убираются стоп-слова анализатора;
+    запрос только из стоп-слов остаётся как есть.
+    """
+    normalized = WHITESPACE.sub(' ', unicodedata.normalize('NFKC', query).lower()).strip()
+    if strip_stop_words:
+        words = [word for word in normalized.split(' ') if word not in STOP_WORDS]
+        if words:
+            normalized = ' '.join(words)
+    return normalized
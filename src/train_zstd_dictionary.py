@@ -0,0 +1,55 @@
+"""Обучение словаря zstd для сжатия кеша на документах фильмов, персон и жанров.
+
+Пример: python train_zstd_dictionary.py /data/cache.zdict --size 112640
+"""
+import argparse
+import asyncio
+import logging
+
+import orjson
+import zstandard
+from elasticsearch import AsyncElasticsearch
+
+from core.config import settings
+from db.data_providers.elastic import ElasticDataProvider
+
+logger = logging.getLogger(__name__)
+
+INDEXES = (settings.MOVIES_ES_INDEX, settings.PERSONS_ES_INDEX, settings.GENRES_ES_INDEX)
+
+
+async def collect_samples(limit: int) -> list[bytes]:
+    """Берёт до `limit` документов из каждого индекса в том виде, в каком они попадают в кеш."""
+    es = AsyncElasticsearch(hosts=[f'{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}'])
+    samples = []
+    try:
+        for index in INDEXES:
+            provider = ElasticDataProvider(db_client=es, db_index=index)
+            count = 0
+            async for doc in provider.iter_all():
+                samples.append(orjson.dumps(doc))
+                count += 1
+                if count >= limit:
+                    break
+    finally:
+        await es.close()
+    return samples
+
+
+async def main() -> None:
+    """Обучает словарь и сохраняет его в файл из аргументов командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path')
+    parser.add_argument('--size', type=int, default=112640, help='размер словаря в байтах')
+    parser.add_argument('--samples', type=int, default=5000, help='документов из каждого индекса')
+    args = parser.parse_args()
+
+    dictionary = zstandard.train_dictionary(args.size, await collect_samples(args.samples))
+    with open(args.path, 'wb') as dictionary_file:
+        dictionary_file.write(dictionary.as_bytes())
+    logger.info('Dictionary %d is written to %s', dictionary.dict_id(), args.path)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -223,3 +223,127 @@ async def test_films_list_pagination(
     # ==== Asserts 3 ====
     assert response.status == http.HTTPStatus.OK
     assert len(response.body) == 0
+
+
+@pytest.mark.asyncio
+async def test_films_list_cursor_pagination(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест на вызов ручки /films/ с пагинацией по курсору.
+
+    Данных в базе 5 элементов, пагинируемся по 3: пустой курсор -- первая страница,
+    курсор следующей страницы приходит в заголовке X-Next-Cursor.
+    """
+    # ==== Fake ===
+    faked_films_in_es_index = await fake_es_films_index(es_client=es_client, limit=5)
+
+    # ==== Run 1 ====
+    response_1 = await make_get_request(
+        base_url=BASE_URL,
+        method='/',
+        params={'page[cursor]': '', 'page[size]': 3},
+    )
+
+    # ==== Asserts 1 ====
+    assert response_1.status == http.HTTPStatus.OK
+    assert len(response_1.body) == 3
+    assert 'X-Next-Cursor' in response_1.headers
+
+    # ==== Run 2 ====
+    response_2 = await make_get_request(
+        base_url=BASE_URL,
+        method='/',
+        params={'page[cursor]': response_1.headers['X-Next-Cursor'], 'page[size]': 3},
+    )
+
+    # ==== Asserts 2 ====
+    assert response_2.status == http.HTTPStatus.OK
+    assert len(response_2.body) == 2
+    assert 'X-Next-Cursor' not in response_2.headers
+    returned_ids = [item['id'] for item in response_1.body + response_2.body]
+    assert sorted(returned_ids) == sorted(item['id'] for item in faked_films_in_es_index)
+
+    # ==== Run 3 ====
+    response_3 = await make_get_request(
+        base_url=BASE_URL,
+        method='/',
+        params={'page[cursor]': 'not a cursor'},
+    )
+
+    # ==== Asserts 3 ====
+    assert response_3.status == http.HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_films_facets(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест на вызов ручки /films/facets.
+
+    Данных в базе 5 элементов с рейтингом от 9.2 до 9.6, без жанров и дат.
+    Фасеты считаются по всем фильмам, повторный запрос отдаётся из кеша,
+    а список фильмов остаётся списком.
+    """
+    # ==== Fake ===
+    faked_films_in_es_index = await fake_es_films_index(es_client=es_client, limit=5)
+    expected_facets = {
+        'genres': [],
+        'imdb_rating': [{'key': '9.0', 'count': 5}],
+        'creation_date': [],
+    }
+
+    for _ in range(2):
+        # ==== Run ====
+        response = await make_get_request(base_url=BASE_URL, method='/facets')
+
+        # ==== Asserts ====
+        assert response.status == http.HTTPStatus.OK
+        assert response.body == expected_facets
+
+    # ==== Run ====
+    response = await make_get_request(base_url=BASE_URL, method='/', params={'facets': 'true'})
+
+    # ==== Asserts ====
+    assert response.status == http.HTTPStatus.OK
+    assert len(response.body) == len(faked_films_in_es_index)
+
+
+@pytest.mark.asyncio
+async def test_films_facets_by_genre(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест на вызов ручки /films/facets с фильтром по жанру, которого нет ни у одного фильма.
+
+    ОП: пустые фасеты.
+    """
+    # ==== Fake ===
+    await fake_es_films_index(es_client=es_client, limit=5)
+
+    # ==== Run ====
+    response = await make_get_request(
+        base_url=BASE_URL,
+        method='/facets',
+        params={'filter[genre]': 'a1b2c3d4-0000-0000-0000-000000000000'},
+    )
+
+    # ==== Asserts ====
+    assert response.status == http.HTTPStatus.OK
+    assert response.body == {'genres': [], 'imdb_rating': [], 'creation_date': []}
@@ -0,0 +1,94 @@
+"""Тесты для API подсказок по названиям фильмов.
+
+Используемая ручка: API v1 /api/v1/films/suggest?query='начало слова'.
+"""
+
+import http
+from asyncio.unix_events import _UnixSelectorEventLoop
+from typing import Callable
+
+import pytest
+from aiohttp import ClientSession
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+from fakedata.films import fake_es_films_index, fake_films
+from films.fixtures import BASE_URL, setup
+from fixtures import es_client, event_loop, make_get_request, redis_client, session
+
+
+@pytest.mark.asyncio
+async def test_films_suggest_no_params(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест на вызов ручки /films/suggest без запроса.
+
+    ОП: ошибка запроса.
+    """
+    # ==== Run ====
+    response = await make_get_request(base_url=BASE_URL, method='/suggest')
+
+    # ==== Asserts ====
+    assert response.status == http.HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_films_suggest_prefix(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест подсказки по началу слов названия.
+
+    ОП: один фильм, название которого начинается с набранной строки.
+    """
+    # ==== Fake ====
+    await fake_es_films_index(es_client=es_client)
+
+    # ==== Run ====
+    response = await make_get_request(base_url=BASE_URL, method='/suggest', params={'query': 'Kirby Sup'})
+
+    # ==== Asserts ====
+    assert response.status == http.HTTPStatus.OK
+    assert response.body == [{
+        'id': fake_films[4]['id'],
+        'title': fake_films[4]['title'],
+        'imdb_rating': fake_films[4]['imdb_rating'],
+    }]
+
+
+@pytest.mark.asyncio
+async def test_films_suggest_rating_order(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест порядка и количества подсказок.
+
+    ОП: фильмы со словом на `sta` по убыванию рейтинга, не больше `size`.
+    """
+    # ==== Fake ====
+    await fake_es_films_index(es_client=es_client)
+
+    # ==== Run ====
+    response = await make_get_request(base_url=BASE_URL, method='/suggest', params={'query': 'sta', 'size': 3})
+
+    # ==== Asserts ====
+    assert response.status == http.HTTPStatus.OK
+    assert len(response.body) == 3
+    assert response.body[0]['id'] == fake_films[0]['id']
+    ratings = [item['imdb_rating'] for item in response.body]
+    assert ratings == sorted(ratings, reverse=True)
@@ -58,9 +58,9 @@ async def test_persons_films_with_cache(
     """
     def _asserts() -> None:
         assert response.status == http.HTTPStatus.OK
-        assert len(response.body) == 5
+        assert len(response.body) == 4
         for item in response.body:
-            assert item.get('id') in ['11', '12', '14', '15', '16']
+            assert item.get('id') in ['11', '12', '14', '15']
 
     # ==== Fake ====
     await fake_es_persons_index(es_client=es_client)
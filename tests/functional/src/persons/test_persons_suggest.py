@@ -0,0 +1,62 @@
+"""Тесты для API подсказок по именам персон.
+
+Используемая ручка: API v1 /api/v1/persons/suggest?query='начало слова'.
+"""
+import http
+from asyncio.unix_events import _UnixSelectorEventLoop
+from typing import Callable
+
+import pytest
+from aiohttp import ClientSession
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+from fakedata.persons import fake_es_persons_index
+from fixtures import es_client, event_loop, make_get_request, redis_client, session
+from persons.fixtures import BASE_URL, setup
+
+
+@pytest.mark.asyncio
+async def test_persons_suggest_no_params(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест на вызов ручки /persons/suggest без запроса.
+
+    ОП: ошибка запроса.
+    """
+    # ==== Run ====
+    response = await make_get_request(base_url=BASE_URL, method='/suggest')
+
+    # ==== Asserts ====
+    assert response.status == http.HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_persons_suggest_prefix(
+        setup: None,
+        session: ClientSession,
+        es_client: AsyncElasticsearch,
+        make_get_request: Callable,
+        redis_client: Redis,
+        event_loop: _UnixSelectorEventLoop,
+) -> None:
+    """
+    Тест подсказок по началу имени и фамилии.
+    """
+    # ==== Fake ====
+    await fake_es_persons_index(es_client=es_client)
+
+    # ==== Run ====
+    response_name = await make_get_request(base_url=BASE_URL, method='/suggest', params={'query': 'Vital'})
+    response_surname = await make_get_request(base_url=BASE_URL, method='/suggest', params={'query': 'mcg'})
+
+    # ==== Asserts ====
+    assert response_name.status == http.HTTPStatus.OK
+    assert sorted(item['id'] for item in response_name.body) == ['1', '10', '5', '8']
+    assert response_surname.status == http.HTTPStatus.OK
+    assert response_surname.body == [{'id': '5', 'name': 'Vitaliy Mcgee'}]
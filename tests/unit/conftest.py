@@ -0,0 +1,12 @@
+"""
+Общие настройки модульных тестов.
+
+Тесты импортируют модули сервиса из `src`, как при запуске `uvicorn --app-dir src`.
+"""
+import pathlib
+import sys
+
+SRC_DIR = pathlib.Path(__file__).parents[2] / 'src'
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
@@ -0,0 +1,289 @@
+"""Подделки Redis и Elasticsearch в памяти для модульных тестов."""
+import fnmatch
+from typing import Optional
+
+from pydantic import BaseModel
+
+from db.cache.base import AsyncCacheStorage
+from db.cache.codec import Compressor
+from db.cache.lock import RELEASE_SCRIPT
+from db.cache.redis import DETACH_TAG_SCRIPT, Cache
+from db.data_providers.elastic import ElasticDataProvider
+from services.base_service import BaseService
+
+
+class Item(BaseModel):
+    """Модель кешируемой сущности."""
+
+    id: str
+    title: str = ''
+
+
+def make_cache(cache_client: AsyncCacheStorage, **kwargs) -> Cache:
+    """Кеш без блокировок, сжатия, тегов и фоновой записи, если они не заданы в `kwargs`."""
+    options = {
+        'model_class': Item,
+        'use_lock': False,
+        'stale_ttl': 0,
+        'xfetch_beta': 0.0,
+        'ttl_jitter': 0.0,
+        'normalize_lists': False,
+        'tag_entries': False,
+        'use_generations': False,
+        'compressor': Compressor(),
+        'read_timeout': 0.0,
+        'breaker': None,
+        'write_queue': None,
+    }
+    options.update(kwargs)
+    return Cache(cache_client=cache_client, **options)
+
+
+def make_provider(db_client: 'FakeElastic', **kwargs) -> ElasticDataProvider:
+    """Загрузка из индекса `movies` без объединения запросов и поиска по уровням, если они не заданы в `kwargs`."""
+    options = {
+        'db_index': 'movies',
+        'batch_gets': False,
+        'batch_searches': False,
+        'tiered_search': False,
+    }
+    options.update(kwargs)
+    return ElasticDataProvider(db_client=db_client, **options)
+
+
+def make_service(cache_client: AsyncCacheStorage, db: ElasticDataProvider, **kwargs) -> BaseService:
+    """Сервис без окна поиска и блоков списков, если они не заданы в `kwargs`."""
+    options = {
+        'search_window': 0,
+        'list_block_size': 0,
+    }
+    options.update(kwargs)
+    return BaseService(db=db, cache=make_cache(cache_client), **options)
+
+
+class FakeRedis(AsyncCacheStorage):
+    """Хранилище кеша в словаре с командами, которые использует сервис."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.sets: dict[str, set] = {}
+        self.sorted_sets: dict[str, dict[str, float]] = {}
+        self.ttls: dict[str, int] = {}
+        self.commands: list[str] = []
+        self.error: Optional[Exception] = None
+
+    async def get(self, key: str, encoding: Optional[str] = None, **kwargs):
+        self._call('get')
+        value = self.values.get(key)
+        return value.decode(encoding) if value is not None and encoding else value
+
+    async def set(self, key: str, value, expire: int = 0, pexpire: int = 0, exist=None, **kwargs):
+        self._call('set')
+        if exist is not None and key in self.values:
+            return False
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = expire or pexpire
+        return True
+
+    async def mget(self, key: str, *keys: str, **kwargs):
+        self._call('mget')
+        return [self.values.get(k) for k in (key, *keys)]
+
+    async def incr(self, key: str):
+        self._call('incr')
+        value = int(self.values.get(key, 0)) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    async def sadd(self, key: str, *members: str):
+        self._call('sadd')
+        self.sets.setdefault(key, set()).update(members)
+
+    async def expire(self, key: str, ttl: int):
+        self._call('expire')
+        self.ttls[key] = ttl
+
+    async def smembers(self, key: str, encoding: Optional[str] = None):
+        self._call('smembers')
+        members = list(self.sets.get(key, ()))
+        return members if encoding else [member.encode() for member in members]
+
+    async def zadd(self, key: str, score: float, member: str):
+        self._call('zadd')
+        self.sorted_sets.setdefault(key, {})[member] = score
+
+    async def zremrangebyscore(self, key: str, min: float = float('-inf'), max: float = float('inf')):
+        self._call('zremrangebyscore')
+        members = self.sorted_sets.get(key, {})
+        removed = [member for member, score in members.items() if min <= score <= max]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    async def zrange(self, key: str, start: int = 0, stop: int = -1, encoding: Optional[str] = None):
+        self._call('zrange')
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        stop = len(members) if stop == -1 else stop + 1
+        return [member if encoding else member.encode() for member, _ in members[start:stop]]
+
+    async def zrem(self, key: str, member: str):
+        self._call('zrem')
+        self.sorted_sets.get(key, {}).pop(member, None)
+
+    async def zrevrange(self, key: str, start: int, stop: int, encoding: Optional[str] = None):
+        self._call('zrevrange')
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return [member if encoding else member.encode() for member, _ in members[start:stop + 1]]
+
+    async def exists(self, key: str):
+        self._call('exists')
+        return int(key in self.values or key in self.sets or key in self.sorted_sets)
+
+    async def delete(self, key: str, *keys: str):
+        self._call('delete')
+        return sum(self._delete(k) for k in (key, *keys))
+
+    async def unlink(self, key: str, *keys: str):
+        self._call('unlink')
+        return sum(self._delete(k) for k in (key, *keys))
+
+    async def scan(self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None):
+        self._call('scan')
+        keys = [k for k in [*self.values, *self.sets] if match is None or fnmatch.fnmatchcase(k, match)]
+        return 0, [k.encode() for k in keys]
+
+    async def eval(self, script: str, keys: list, args: list):
+        self._call('eval')
+        if script == RELEASE_SCRIPT:
+            if self.values.get(keys[0]) == args[0].encode():
+                return self._delete(keys[0])
+            return 0
+        if script == DETACH_TAG_SCRIPT:
+            if keys[0] not in self.sorted_sets:
+                return 0
+            self.sorted_sets[keys[1]] = self.sorted_sets.pop(keys[0])
+            return 1
+        raise NotImplementedError(script)
+
+    def pipeline(self) -> 'FakePipeline':
+        return FakePipeline(self)
+
+    def close(self) -> None:
+        pass
+
+    async def wait_closed(self) -> None:
+        pass
+
+    def _call(self, name: str) -> None:
+        self.commands.append(name)
+        if self.error is not None:
+            raise self.error
+
+    def _delete(self, key) -> int:
+        key = key.decode() if isinstance(key, bytes) else key
+        found = key in self.values or key in self.sets or key in self.sorted_sets
+        self.values.pop(key, None)
+        self.sets.pop(key, None)
+        self.sorted_sets.pop(key, None)
+        return int(found)
+
+
+class FakePipeline:
+    """Откладывает команды до `execute`, как конвейер aioredis."""
+
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list = []
+
+    def __getattr__(self, name: str):
+        def command(*args, **kwargs) -> None:
+            self.commands.append((name, args, kwargs))
+        return command
+
+    async def execute(self, return_exceptions: bool = False) -> list:
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.commands = []
+        return results
+
+
+class FakeElastic:
+    """Индекс Elasticsearch из списка документов: `get`, `mget` и `search` по всем документам."""
+
+    def __init__(self, docs: list[dict]) -> None:
+        self.docs = {doc['id']: doc for doc in docs}
+        self.calls: list[str] = []
+        self.error: Optional[Exception] = None
+
+    async def get(self, index: str, entity_id: str, **kwargs) -> dict:
+        from elasticsearch import NotFoundError
+
+        self._call('get')
+        if entity_id not in self.docs:
+            raise NotFoundError(404, 'not_found', {})
+        return {'_id': entity_id, '_source': self.docs[entity_id]}
+
+    async def mget(self, body: dict, index: str, **kwargs) -> dict:
+        self._call('mget')
+        return {'docs': [
+            {'_id': entity_id, 'found': entity_id in self.docs, '_source': self.docs.get(entity_id)}
+            for entity_id in body['ids']
+        ]}
+
+    async def search(self, index: str, body: dict, **kwargs) -> dict:
+        self._call('search')
+        docs = sorted(self.docs.values(), key=lambda doc: doc['id'])
+        search_after = body.get('search_after')
+        if search_after:
+            docs = [doc for doc in docs if doc['id'] > search_after[-1]]
+        start = body.get('from', 0)
+        hits = [
+            {'_source': doc, 'sort': self._get_sort_values(doc, body.get('sort'))}
+            for doc in docs[start:start + body.get('size', 10)]
+        ]
+        return {'hits': {'hits': hits, 'total': self._get_total(body.get('track_total_hits', 10_000))}}
+
+    async def msearch(self, body: list[dict], **kwargs) -> dict:
+        self._call('msearch')
+        return {'responses': [
+            await self.search(index=header['index'], body=search_body)
+            for header, search_body in zip(body[::2], body[1::2])
+        ]}
+
+    def _call(self, name: str) -> None:
+        self.calls.append(name)
+        if self.error is not None:
+            raise self.error
+
+    def _get_total(self, track_total_hits: int) -> dict:
+        if len(self.docs) > track_total_hits:
+            return {'value': track_total_hits, 'relation': 'gte'}
+        return {'value': len(self.docs), 'relation': 'eq'}
+
+    @staticmethod
+    def _get_sort_values(doc: dict, sort) -> list:
+        if not isinstance(sort, list):
+            return [doc['id']]
+        return [1.0 if spec == '_score' else doc.get(next(iter(spec))) for spec in sort]
+
+
+class RecordingElastic(FakeElastic):
+    """Индекс Elasticsearch, запоминающий параметры `get`/`mget` и тела поисковых запросов."""
+
+    def __init__(self, docs: list[dict]) -> None:
+        super().__init__(docs)
+        self.params: list[dict] = []
+        self.bodies: list[dict] = []
+
+    async def get(self, index: str, entity_id: str, **kwargs) -> dict:
+        self.params.append(kwargs)
+        return await super().get(index, entity_id, **kwargs)
+
+    async def mget(self, body: dict, index: str, **kwargs) -> dict:
+        self.params.append(kwargs)
+        return await super().mget(body, index, **kwargs)
+
+    async def search(self, index: str, body: dict, **kwargs) -> dict:
+        self.bodies.append(body)
+        return await super().search(index, body, **kwargs)
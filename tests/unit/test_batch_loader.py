@@ -0,0 +1,122 @@
+"""Тесты объединения загрузок по id в пачки."""
+import asyncio
+
+import pytest
+
+from db.data_providers.elastic import ElasticDataProvider
+from db.data_providers.loader import BatchLoader
+from tests.unit.fakes import FakeElastic
+
+
+class BatchSource:
+    """Источник, загружающий сущности пачками и запоминающий пачки."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.error = None
+
+    async def load_many(self, entity_ids: list[str]) -> list:
+        self.batches.append(entity_ids)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return [{'id': entity_id} if entity_id != 'missing' else None for entity_id in entity_ids]
+
+
+@pytest.mark.asyncio
+async def test_loads_of_one_tick_go_in_one_batch() -> None:
+    """
+    Тест на объединение загрузок.
+
+    ОП: загрузки одного тика цикла событий уходят одной пачкой, повторные id загружаются один раз.
+    """
+    # ==== Init ====
+    source = BatchSource()
+    loader = BatchLoader(load_many=source.load_many, name='test')
+
+    # ==== Run ====
+    results = await asyncio.gather(*(loader.load(entity_id) for entity_id in ['1', '2', '1', 'missing']))
+    after = await loader.load('3')
+
+    # ==== Asserts ====
+    assert results == [{'id': '1'}, {'id': '2'}, {'id': '1'}, None]
+    assert after == {'id': '3'}
+    assert source.batches == [['1', '2', 'missing'], ['3']]
+
+
+@pytest.mark.asyncio
+async def test_window_collects_loads_of_several_ticks() -> None:
+    """
+    Тест на окно сбора пачки.
+
+    ОП: загрузки, пришедшие в пределах window, попадают в одну пачку.
+    """
+    # ==== Init ====
+    source = BatchSource()
+    loader = BatchLoader(load_many=source.load_many, name='test', window=0.01)
+
+    async def load_later(entity_id: str, delay: float) -> dict:
+        await asyncio.sleep(delay)
+        return await loader.load(entity_id)
+
+    # ==== Run ====
+    await asyncio.gather(load_later('1', 0), load_later('2', 0.002))
+
+    # ==== Asserts ====
+    assert source.batches == [['1', '2']]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_at_once() -> None:
+    """
+    Тест на ограничение размера пачки.
+
+    ОП: пачка из max_batch_size id отправляется сразу, остальные id идут следующей пачкой.
+    """
+    # ==== Init ====
+    source = BatchSource()
+    loader = BatchLoader(load_many=source.load_many, name='test', max_batch_size=2)
+
+    # ==== Run ====
+    await asyncio.gather(*(loader.load(str(index)) for index in range(5)))
+
+    # ==== Asserts ====
+    assert source.batches == [['0', '1'], ['2', '3'], ['4']]
+
+
+@pytest.mark.asyncio
+async def test_batch_error_reaches_every_caller() -> None:
+    """
+    Тест на ошибку загрузки пачки.
+
+    ОП: ошибку получают все ожидающие пачку.
+    """
+    # ==== Init ====
+    source = BatchSource()
+    source.error = ConnectionError()
+    loader = BatchLoader(load_many=source.load_many, name='test')
+
+    # ==== Run ====
+    results = await asyncio.gather(loader.load('1'), loader.load('2'), return_exceptions=True)
+
+    # ==== Asserts ====
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_provider_batches_get_by_id_into_mget() -> None:
+    """
+    Тест на загрузку по id через Elastic.
+
+    ОП: одновременные get_by_id уходят одним mget, отсутствующий документ -- None.
+    """
+    # ==== Init ====
+    es = FakeElastic([{'id': '1'}, {'id': '2'}])
+    provider = ElasticDataProvider(db_client=es, db_index='movies', batch_gets=True, batch_window=0.0)
+
+    # ==== Run ====
+    docs = await asyncio.gather(provider.get_by_id('1'), provider.get_by_id('2'), provider.get_by_id('3'))
+
+    # ==== Asserts ====
+    assert docs == [{'id': '1'}, {'id': '2'}, None]
+    assert es.calls == ['mget']
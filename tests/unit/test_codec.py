@@ -0,0 +1,182 @@
+"""Тесты сжатия значений кеша и конверта записи."""
+
+import orjson
+import pytest
+import zstandard
+
+from db.cache.codec import (
+    LZ4,
+    NONE,
+    ZSTD,
+    ZSTD_DICT_MARKER,
+    Compressor,
+    DecodeError,
+    UnknownDictionaryError,
+    decompress,
+)
+from db.cache.entry import CacheEntry
+from tests.unit.fakes import FakeRedis, Item, make_cache
+
+VALUE = orjson.dumps([{'id': str(index), 'title': f'Star Wars: Episode {index}'} for index in range(100)])
+
+
+def train_dictionary() -> zstandard.ZstdCompressionDict:
+    samples = [
+        orjson.dumps({'id': str(index), 'title': f'Film number {index}', 'rating': index / 10})
+        for index in range(1000)
+    ]
+    return zstandard.train_dictionary(4096, samples)
+
+
+@pytest.mark.parametrize('codec', [LZ4, ZSTD])
+def test_compressor_round_trip(codec: str) -> None:
+    """
+    Тест на сжатие и восстановление значения.
+
+    ОП: значение меньше исходного и восстанавливается без изменений.
+    """
+    # ==== Run ====
+    compressed = Compressor(codec=codec, threshold=0).compress(VALUE)
+
+    # ==== Asserts ====
+    assert len(compressed) < len(VALUE)
+    assert decompress(compressed) == VALUE
+
+
+def test_compressor_keeps_small_and_incompressible_values() -> None:
+    """
+    Тест на значения меньше порога и несжимаемые значения.
+
+    ОП: значения хранятся как есть.
+    """
+    # ==== Init ====
+    compressor = Compressor(codec=ZSTD, threshold=1024)
+    noise = bytes(range(256)) * 5
+
+    # ==== Run & Asserts ====
+    assert compressor.compress(b'{"id":"1"}') == b'{"id":"1"}'
+    assert Compressor(codec=NONE).compress(VALUE) == VALUE
+    assert decompress(compressor.compress(noise)) == noise
+
+
+def test_compressor_with_dictionary() -> None:
+    """
+    Тест на сжатие со словарём.
+
+    ОП: значение помечено маркером словаря и восстанавливается, пока словарь загружен.
+    """
+    # ==== Init ====
+    compressor = Compressor(codec=ZSTD, threshold=0, dictionary=train_dictionary())
+
+    # ==== Run ====
+    compressed = compressor.compress(VALUE)
+
+    # ==== Asserts ====
+    assert compressed.startswith(ZSTD_DICT_MARKER)
+    assert decompress(compressed) == VALUE
+
+
+def test_decompress_unknown_dictionary() -> None:
+    """
+    Тест на значение, сжатое словарём, который не загружен.
+
+    ОП: ошибка UnknownDictionaryError, она же DecodeError.
+    """
+    # ==== Init ====
+    compressed = Compressor(codec=ZSTD, threshold=0, dictionary=train_dictionary()).compress(VALUE)
+    unknown = ZSTD_DICT_MARKER + (2 ** 32 - 1).to_bytes(4, 'big') + compressed[5:]
+
+    # ==== Run & Asserts ====
+    with pytest.raises(UnknownDictionaryError):
+        decompress(unknown)
+    assert issubclass(UnknownDictionaryError, DecodeError)
+
+
+@pytest.mark.parametrize('codec', [LZ4, ZSTD])
+def test_decompress_truncated_value(codec: str) -> None:
+    """
+    Тест на обрезанное сжатое значение.
+
+    ОП: ошибка DecodeError.
+    """
+    # ==== Init ====
+    compressed = Compressor(codec=codec, threshold=0).compress(VALUE)
+
+    # ==== Run & Asserts ====
+    with pytest.raises(DecodeError):
+        decompress(compressed[:len(compressed) // 2])
+
+
+def test_cache_entry_round_trip() -> None:
+    """
+    Тест на конверт записи кеша.
+
+    ОП: данные и метаданные восстанавливаются, значения без конверта читаются как есть, обрезанный конверт -- ошибка.
+    """
+    # ==== Init ====
+    entry = CacheEntry(data=Compressor(codec=ZSTD, threshold=0).compress(VALUE), delta=0.5, expiry=100.0)
+
+    # ==== Run ====
+    unpacked = CacheEntry.unpack(entry.pack())
+
+    # ==== Asserts ====
+    assert unpacked == CacheEntry(data=VALUE, delta=0.5, expiry=100.0)
+    assert CacheEntry.unpack(VALUE) == CacheEntry(data=VALUE)
+    with pytest.raises(DecodeError):
+        CacheEntry.unpack(entry.pack()[:5])
+
+
+@pytest.mark.asyncio
+async def test_cache_treats_undecodable_value_as_miss() -> None:
+    """
+    Тест на значение в Redis, которое не удаётся восстановить.
+
+    ОП: данные загружаются из источника, испорченное значение заменяется новым.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis)
+
+    async def get_by_id(entity_id: str) -> dict:
+        return {'id': entity_id, 'title': 'Star Wars'}
+
+    key = cache._get_caching_key(get_by_id, entity_id='1')
+    await redis.set(key, Compressor(codec=LZ4, threshold=0).compress(VALUE)[:20])
+
+    # ==== Run ====
+    item = await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert item == Item(id='1', title='Star Wars')
+    assert 'unlink' in redis.commands
+    assert orjson.loads(redis.values[key]) == {'id': '1', 'title': 'Star Wars'}
+
+
+@pytest.mark.asyncio
+async def test_cache_hydrate_skips_undecodable_entities() -> None:
+    """
+    Тест на сборку списка из записей сущностей, одна из которых испорчена.
+
+    ОП: испорченная сущность загружается из источника.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, normalize_lists=True)
+    loaded = []
+
+    async def get_by_id(entity_id: str) -> dict:
+        return {'id': entity_id}
+
+    async def get_by_ids(entity_ids: list[str], source=None) -> list[dict]:
+        loaded.extend(entity_ids)
+        return [{'id': entity_id, 'title': 'db'} for entity_id in entity_ids]
+
+    await redis.set(cache._get_caching_key(get_by_id, entity_id='1'), b'{"id":"1","title":"cache"}')
+    await redis.set(cache._get_caching_key(get_by_id, entity_id='2'), b'\x04broken')
+
+    # ==== Run ====
+    entities = await cache._hydrate(['1', '2'], get_by_id, get_by_ids, {})
+
+    # ==== Asserts ====
+    assert entities == [{'id': '1', 'title': 'cache'}, {'id': '2', 'title': 'db'}]
+    assert loaded == ['2']
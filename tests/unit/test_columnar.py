@@ -0,0 +1,92 @@
+"""Тесты колоночного индекса фильмов в памяти."""
+import pytest
+
+from db.data_providers.columnar import FilmColumnarIndex, FilmColumns
+from db.data_providers.films import FilmsDataProvider
+from tests.unit.fakes import FakeElastic
+
+FILMS = [
+    {'id': 'a', 'imdb_rating': 7.0, 'creation_date': '2001-05-01', 'genre': [{'id': 'drama'}]},
+    {'id': 'b', 'imdb_rating': None, 'creation_date': '1999-01-01', 'genre': [{'id': 'comedy'}]},
+    {'id': 'c', 'imdb_rating': 9.0, 'creation_date': None, 'genre': [{'id': 'drama'}, {'id': 'comedy'}]},
+    {'id': 'd', 'imdb_rating': 8.0, 'creation_date': '2010-12-31', 'genre': []},
+]
+
+
+def make_index(es: FakeElastic, max_bytes: int = 1024 * 1024) -> FilmColumnarIndex:
+    provider = FilmsDataProvider(db_client=es, db_index='movies', batch_searches=False)
+    return FilmColumnarIndex(db=provider, max_bytes=max_bytes)
+
+
+@pytest.mark.parametrize('sort, expected', [
+    ('-imdb_rating', ['c', 'd', 'a', 'b']),
+    ('imdb_rating', ['a', 'd', 'c', 'b']),
+    ('-creation_date', ['d', 'a', 'b', 'c']),
+    ('creation_date', ['b', 'a', 'd', 'c']),
+])
+def test_films_without_value_go_last(sort: str, expected: list[str]) -> None:
+    """
+    Тест на сортировку колонок.
+
+    ОП: порядок как в Elasticsearch, фильмы без значения -- в конце при любом направлении.
+    """
+    # ==== Init ====
+    columns = FilmColumns.build(FILMS)
+
+    # ==== Run & Asserts ====
+    assert columns.get_ids(sort, page_size=10, page_number=1) == expected
+
+
+def test_genre_filter_and_pages() -> None:
+    """
+    Тест на фильтр по жанру и пагинацию.
+
+    ОП: в выдаче только фильмы жанра в порядке сортировки, по неизвестному жанру -- пусто.
+    """
+    # ==== Init ====
+    columns = FilmColumns.build(FILMS)
+
+    # ==== Run & Asserts ====
+    assert columns.get_ids('-imdb_rating', page_size=10, page_number=1, genre_id='drama') == ['c', 'a']
+    assert columns.get_ids('-imdb_rating', page_size=1, page_number=2, genre_id='comedy') == ['b']
+    assert columns.get_ids('-imdb_rating', page_size=2, page_number=2) == ['a', 'b']
+    assert columns.get_ids('-imdb_rating', page_size=10, page_number=1, genre_id='horror') == []
+
+
+@pytest.mark.asyncio
+async def test_index_is_loaded_from_elastic() -> None:
+    """
+    Тест на загрузку индекса.
+
+    ОП: до загрузки и для неподдерживаемой сортировки индекс не отвечает, после загрузки -- отвечает.
+    """
+    # ==== Init ====
+    index = make_index(FakeElastic(FILMS))
+
+    # ==== Run ====
+    before = index.get_ids(page_size=10, sort='-imdb_rating')
+    await index.refresh()
+
+    # ==== Asserts ====
+    assert before is None
+    assert index.get_ids(page_size=2, sort='-imdb_rating', genre_id='drama') == ['c', 'a']
+    assert index.get_ids(page_size=2, sort='title') is None
+    assert index.memory_usage()['total'] > 0
+
+
+@pytest.mark.asyncio
+async def test_index_over_budget_is_dropped() -> None:
+    """
+    Тест на ограничение памяти индекса.
+
+    ОП: индекс больше max_bytes не загружается, списки идут в Elastic.
+    """
+    # ==== Init ====
+    index = make_index(FakeElastic(FILMS), max_bytes=1)
+
+    # ==== Run ====
+    await index.refresh()
+
+    # ==== Asserts ====
+    assert index.get_ids(page_size=10, sort='-imdb_rating') is None
+    assert index.memory_usage() == {'total': 0}
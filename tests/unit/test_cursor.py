@@ -0,0 +1,147 @@
+"""Тесты пагинации по курсору через `search_after`."""
+import pytest
+from elasticsearch import RequestError
+from fastapi import Response
+
+from api.v1.paging_params import NEXT_CURSOR_HEADER, PagingParams, get_cursor_page, set_next_cursor
+from db.data_providers.cursor import InvalidCursorError, decode_cursor, encode_cursor
+from db.data_providers.elastic import ElasticDataProvider
+from errors import InvalidCursorException
+from tests.unit.fakes import FakeElastic, FakeRedis, make_cache, make_provider
+
+DOCS = [{'id': str(index), 'title': f'Film {index}'} for index in range(5)]
+
+
+def test_cursor_round_trip() -> None:
+    """
+    Тест на кодирование курсора.
+
+    ОП: значения сортировки восстанавливаются без изменений, пустой курсор -- первая страница.
+    """
+    # ==== Init ====
+    sort_values = [8.5, 'Star Wars', 'a1b2']
+
+    # ==== Run ====
+    cursor = encode_cursor(sort_values)
+
+    # ==== Asserts ====
+    assert decode_cursor(cursor) == sort_values
+    assert decode_cursor('') == []
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor!', encode_cursor([])[:-1] + '*', 'eyJpZCI6IDF9'])
+def test_foreign_cursor_is_rejected(cursor: str) -> None:
+    """
+    Тест на курсор, выданный не сервисом.
+
+    ОП: декодирование падает с InvalidCursorError, параметры пагинации -- с InvalidCursorException.
+    """
+    # ==== Run & Asserts ====
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+    with pytest.raises(InvalidCursorException):
+        PagingParams(cursor=cursor)
+
+
+@pytest.mark.asyncio
+async def test_pages_follow_cursor_to_the_end() -> None:
+    """
+    Тест на обход списка по курсору.
+
+    ОП: страницы идут без пропусков и повторов, у последней страницы нет курсора.
+    """
+    # ==== Init ====
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    cursor = ''
+    pages = []
+
+    # ==== Run ====
+    while cursor is not None:
+        page = await provider.get_list(page_size=2, cursor=cursor)
+        pages.append([doc['id'] for doc in page['items']])
+        cursor = page['next_cursor']
+
+    # ==== Asserts ====
+    assert pages == [['0', '1'], ['2', '3'], ['4']]
+
+
+def test_cursor_sort_ends_with_id() -> None:
+    """
+    Тест на сортировку при пагинации по курсору.
+
+    ОП: сортировка заканчивается уникальным id, чтобы search_after был однозначным.
+    """
+    # ==== Run & Asserts ====
+    assert ElasticDataProvider._get_cursor_sort(None) == ['_score', {'id': {'order': 'asc'}}]
+    assert ElasticDataProvider._get_cursor_sort({'imdb_rating': {'order': 'desc'}}) == [
+        {'imdb_rating': {'order': 'desc'}},
+        {'id': {'order': 'asc'}},
+    ]
+    assert ElasticDataProvider._get_cursor_sort({'id': {'order': 'desc'}}) == [{'id': {'order': 'desc'}}]
+
+
+@pytest.mark.asyncio
+async def test_pages_are_cached_with_cursor() -> None:
+    """
+    Тест на кеширование страницы по курсору.
+
+    ОП: страница и курсор следующей страницы берутся из кеша, а курсор отдаётся в заголовке ответа.
+    """
+    # ==== Init ====
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    cache = make_cache(FakeRedis())
+    response = Response()
+
+    # ==== Run ====
+    items, next_cursor = await cache.get_page_from_cache_or_db(provider.get_list, page_size=2, cursor='')
+    cached = await cache.get_page_from_cache_or_db(provider.get_list, page_size=2, cursor='')
+    set_next_cursor(response, next_cursor)
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['0', '1']
+    assert cached == (items, next_cursor)
+    assert decode_cursor(next_cursor) == [1.0, '1']
+    assert response.headers[NEXT_CURSOR_HEADER] == next_cursor
+    assert es.calls == ['search']
+
+
+@pytest.mark.asyncio
+async def test_cursor_of_another_sort_is_rejected() -> None:
+    """
+    Тест на курсор, выданный для другой сортировки.
+
+    ОП: провайдер не отправляет запрос и падает с InvalidCursorError, API отвечает InvalidCursorException.
+    """
+    # ==== Init ====
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    page = await provider.get_list(page_size=2, cursor='', sort='title')
+
+    # ==== Run & Asserts ====
+    with pytest.raises(InvalidCursorError):
+        await provider.get_list(page_size=2, cursor=page['next_cursor'], sort='-title')
+    with pytest.raises(InvalidCursorException):
+        await get_cursor_page(provider.get_list, page_size=2, cursor=page['next_cursor'])
+    assert es.calls == ['search']
+
+
+@pytest.mark.asyncio
+async def test_cursor_rejected_by_elastic_is_invalid() -> None:
+    """
+    Тест на курсор со значениями, которые Elastic не принял.
+
+    ОП: ошибка 400 на странице по курсору -- InvalidCursorError, на обычной странице -- исходная ошибка.
+    """
+    # ==== Init ====
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    cursor = (await provider.get_list(page_size=2, cursor=''))['next_cursor']
+    es.error = RequestError(400, 'parse_exception', {})
+
+    # ==== Run & Asserts ====
+    with pytest.raises(InvalidCursorError):
+        await provider.get_list(page_size=2, cursor=cursor)
+    with pytest.raises(RequestError):
+        await provider.get_list(page_size=2, cursor='')
@@ -0,0 +1,166 @@
+"""Тесты фасетов фильмов."""
+
+import pytest
+
+from db.data_providers.films import FACET_AGGREGATIONS, FilmsDataProvider
+from models.film import Film
+from services.film import FilmService
+from tests.unit.fakes import FakeRedis, RecordingElastic, make_cache
+
+AGGREGATIONS = {
+    'genres': {'ids': {'buckets': [{'key': 'drama', 'doc_count': 2}]}},
+    'imdb_rating': {'buckets': [{'key': 7.0, 'doc_count': 1}, {'key': 8.0, 'doc_count': 1}]},
+    'creation_date': {'buckets': [{'key': 946684800000, 'key_as_string': '2000', 'doc_count': 2}]},
+}
+
+
+FILMS = [{'id': str(index), 'title': f'Star Wars {index}', 'imdb_rating': 7.0} for index in range(3)]
+FACETS = {
+    'genres': [{'key': 'drama', 'count': 2}],
+    'imdb_rating': [{'key': '7.0', 'count': 1}, {'key': '8.0', 'count': 1}],
+    'creation_date': [{'key': '2000', 'count': 2}],
+}
+
+
+class AggregationsElastic(RecordingElastic):
+    """Elasticsearch, отвечающий на запросы с `aggs` агрегациями."""
+
+    def __init__(self, docs: list[dict] = ()) -> None:
+        super().__init__(list(docs))
+
+    async def search(self, index: str, body: dict, **kwargs) -> dict:
+        response = await super().search(index, body, **kwargs)
+        if 'aggs' in body:
+            response['aggregations'] = AGGREGATIONS
+        return response
+
+
+def make_provider(es: AggregationsElastic, **kwargs) -> FilmsDataProvider:
+    """Провайдер фильмов без объединения запросов."""
+    return FilmsDataProvider(db_client=es, db_index='movies', batch_gets=False, batch_searches=False, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_provider_counts_facets_without_documents() -> None:
+    """
+    Тест на запрос фасетов к Elastic.
+
+    ОП: документы не загружаются (size 0), поиск фильтруется по жанру, корзины приводятся к key/count.
+    """
+    # ==== Init ====
+    es = AggregationsElastic()
+    provider = make_provider(es)
+
+    # ==== Run ====
+    facets = await provider.get_facets(genre_id='drama', query='star')
+
+    # ==== Asserts ====
+    body, = es.bodies
+    assert body['size'] == 0
+    assert body['aggs'] == FACET_AGGREGATIONS
+    assert body['query']['bool']['must'][0]['multi_match']['query'] == 'star'
+    assert body['query']['bool']['filter'][0]['bool']['filter'][0]['nested']['path'] == 'genre'
+    assert facets == FACETS
+
+
+@pytest.mark.asyncio
+async def test_cache_keeps_facets_for_facets_ttl() -> None:
+    """
+    Тест на кеширование фасетов.
+
+    ОП: фасеты считаются один раз на набор параметров и хранятся facets_ttl секунд.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, ttl=60, facets_ttl=900)
+    calls = []
+
+    async def get_facets(genre_id: str = None, query: str = None) -> dict:
+        calls.append((genre_id, query))
+        return {'genres': [], 'imdb_rating': [{'key': '7.0', 'count': len(calls)}], 'creation_date': []}
+
+    # ==== Run ====
+    first = await cache.get_facets_from_cache_or_db(get_from_db=get_facets, genre_id='drama')
+    second = await cache.get_facets_from_cache_or_db(get_from_db=get_facets, genre_id='drama')
+    other = await cache.get_facets_from_cache_or_db(get_from_db=get_facets, genre_id=None, query='star')
+
+    # ==== Asserts ====
+    assert first == second
+    assert other['imdb_rating'][0]['count'] == 2
+    assert calls == [('drama', None), (None, 'star')]
+    assert set(redis.ttls.values()) == {900}
+
+
+@pytest.mark.asyncio
+async def test_page_query_counts_facets() -> None:
+    """
+    Тест на фасеты, посчитанные вместе со страницей списка.
+
+    ОП: один запрос к Elastic с `aggs` возвращает и фильмы страницы, и фасеты.
+    """
+    # ==== Init ====
+    es = AggregationsElastic(FILMS)
+
+    # ==== Run ====
+    result = await make_provider(es).get_list(genre_id=None, facets=True, page_size=2)
+
+    # ==== Asserts ====
+    body, = es.bodies
+    assert body['aggs'] == FACET_AGGREGATIONS
+    assert [film['id'] for film in result['items']] == ['0', '1']
+    assert result['facets'] == FACETS
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('min_hits, fuzzy', [(3, [False]), (10, [False, True])])
+async def test_search_facets_follow_search_tier(min_hits: int, fuzzy: list[bool]) -> None:
+    """
+    Тест на фасеты результатов поиска по уровням.
+
+    ОП: фасеты считаются тем же запросом, что и страница: точным, если точных совпадений достаточно,
+    иначе нечётким, и отдельный запрос фасетов выбирает тот же уровень.
+    """
+    # ==== Init ====
+    es = AggregationsElastic(FILMS)
+    provider = make_provider(es, tiered_search=True, tiered_min_hits=min_hits)
+
+    # ==== Run ====
+    result = await provider.get_search_result(query='star wars', page_size=2, facets=True)
+    page_bodies, es.bodies = es.bodies, []
+    facets = await provider.get_facets(query='star wars')
+
+    # ==== Asserts ====
+    assert ['fuzziness' in body['query']['multi_match'] for body in page_bodies] == fuzzy
+    assert all(body['aggs'] == FACET_AGGREGATIONS for body in page_bodies)
+    assert result['facets'] == facets == FACETS
+    assert ['fuzziness' in body['query']['multi_match'] for body in es.bodies] == fuzzy
+
+
+@pytest.mark.asyncio
+async def test_service_fills_facets_from_page() -> None:
+    """
+    Тест на заполнение кеша фасетов страницей списка.
+
+    ОП: первая страница считает фасеты тем же запросом и кладёт их в кеш, следующие страницы и запрос
+    фасетов в Elastic за ними не ходят; ключи страниц не меняются.
+    """
+    # ==== Init ====
+    es = AggregationsElastic(FILMS)
+    redis = FakeRedis()
+    service = FilmService(
+        db=make_provider(es),
+        cache=make_cache(redis, model_class=Film),
+        search_window=0,
+        list_block_size=0,
+    )
+
+    # ==== Run ====
+    first = await service.get_list(genre_id='drama', page_size=2, page_number=1)
+    second = await service.get_list(genre_id='drama', page_size=2, page_number=2)
+    facets = await service.get_facets(genre_id='drama')
+
+    # ==== Asserts ====
+    assert [film.id for film in first + second] == ['0', '1', '2']
+    assert ['aggs' in body for body in es.bodies] == [True, False]
+    assert facets == FACETS
+    assert 'Film:get_list:genre_id=drama:page_size=2:page_number=1' in redis.values
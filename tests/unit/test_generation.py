@@ -0,0 +1,121 @@
+"""Тесты поколений ключей кеша."""
+import asyncio
+
+import pytest
+
+from db.cache.generation import Generation, get_namespace, sweep
+from tests.unit.fakes import FakeRedis, make_cache
+
+
+async def get_by_id(entity_id: str) -> dict:
+    return {'id': entity_id}
+
+
+@pytest.mark.asyncio
+async def test_generation_is_cached_for_check_interval() -> None:
+    """
+    Тест на чтение номера поколения.
+
+    ОП: номер читается из Redis не чаще check_interval, своё увеличение видно сразу.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    generation = Generation(cache_client=redis, name='Item', check_interval=60)
+    other = Generation(cache_client=redis, name='Item', check_interval=60)
+
+    # ==== Run ====
+    first = await generation.get()
+    bumped = await other.bump()
+    cached = await generation.get()
+
+    # ==== Asserts ====
+    assert (first, bumped, cached) == (0, 1, 0)
+    assert await other.get() == 1
+    assert redis.commands == ['get', 'incr']
+
+
+@pytest.mark.asyncio
+async def test_sweep_unlinks_matching_keys() -> None:
+    """
+    Тест на удаление ключей по шаблону.
+
+    ОП: удаляются только подходящие ключи, возвращается их число.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    redis.values.update({'Item:g0:a': b'1', 'Item:g0:b': b'2', 'Item:g1:a': b'3'})
+
+    # ==== Run ====
+    removed = await sweep(redis, 'Item:g0:*')
+
+    # ==== Asserts ====
+    assert removed == 2
+    assert set(redis.values) == {'Item:g1:a'}
+
+
+@pytest.mark.asyncio
+async def test_flush_switches_to_new_generation() -> None:
+    """
+    Тест на сброс кеша модели сменой поколения.
+
+    ОП: ключи пишутся с префиксом поколения, после сброса старые ключи недоступны и удаляются в фоне.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, use_generations=True)
+    await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+    old_keys = set(redis.values) - {'Generation:Item'}
+
+    # ==== Run ====
+    await cache.flush()
+    await asyncio.sleep(0.01)
+    await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert old_keys == {f'{get_namespace("Item", 0)}:get_by_id:entity_id=1'}
+    assert set(redis.values) == {'Generation:Item', f'{get_namespace("Item", 1)}:get_by_id:entity_id=1'}
+
+
+@pytest.mark.asyncio
+async def test_other_worker_follows_generation() -> None:
+    """
+    Тест на смену поколения в другом воркере.
+
+    ОП: после check_interval второй воркер читает ключи нового поколения.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    worker, other = make_cache(redis, use_generations=True), make_cache(redis, use_generations=True)
+    other._generation.check_interval = 0
+    await other.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+
+    # ==== Run ====
+    await worker.flush()
+    await asyncio.sleep(0.01)
+    redis.commands.clear()
+    await other.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert redis.commands == ['get', 'get', 'set']
+    assert f'{get_namespace("Item", 1)}:get_by_id:entity_id=1' in redis.values
+
+
+@pytest.mark.asyncio
+async def test_flush_without_generations_unlinks_keys() -> None:
+    """
+    Тест на сброс кеша модели без поколений.
+
+    ОП: ключи и теги модели удаляются сразу, ключи других моделей остаются.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, tag_entries=True)
+    await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+    redis.values['Film:get_by_id:entity_id=1'] = b'{}'
+
+    # ==== Run ====
+    await cache.flush()
+
+    # ==== Asserts ====
+    assert set(redis.values) == {'Film:get_by_id:entity_id=1'}
+    assert redis.sets == {}
@@ -0,0 +1,235 @@
+"""Тесты сброса кеша по ленте изменений."""
+import asyncio
+
+import pytest
+
+from db.cache.invalidation import DELETE, UPSERT, InvalidationConsumer, publish_change
+from db.cache.local import LocalCache
+from db.data_providers.films import FilmsDataProvider
+from services.film import FilmService
+from tests.unit.fakes import FakeElastic, FakeRedis, make_cache
+
+
+class StreamRedis:
+    """Redis Stream в памяти: `xadd` и `xread`, ждущий новых событий."""
+
+    def __init__(self) -> None:
+        self.events: list[tuple[bytes, dict]] = []
+
+    async def xadd(self, stream: str, fields: dict, **kwargs) -> bytes:
+        message_id = f'{len(self.events) + 1}-0'.encode()
+        self.events.append((message_id, {name.encode(): value.encode() for name, value in fields.items()}))
+        return message_id
+
+    async def xread(self, streams: list[str], latest_ids: list, **kwargs) -> list:
+        latest_id = latest_ids[0]
+        start = len(self.events) if latest_id == '$' else int(latest_id.split(b'-')[0])
+        while len(self.events) <= start:
+            await asyncio.sleep(0)
+        return [(streams[0].encode(), message_id, fields) for message_id, fields in self.events[start:]]
+
+
+class Handler:
+    """Обработчик событий, запоминающий вызовы."""
+
+    def __init__(self, error: Exception = None) -> None:
+        self.calls: list[tuple[list[str], bool]] = []
+        self.error = error
+
+    async def __call__(self, entity_ids: list[str], deleted: bool) -> None:
+        self.calls.append((entity_ids, deleted))
+        if self.error is not None:
+            raise self.error
+
+
+async def get_by_id(entity_id: str) -> dict:
+    return {'id': entity_id}
+
+
+async def get_list(page_size: int, genre_id: str = None, query: str = None) -> list[dict]:
+    return [{'id': str(index)} for index in range(page_size)]
+
+
+async def get_filtered(page_size: int, **filters: str) -> list[dict]:
+    return [{'id': '3'}]
+
+
+async def get_page(page_size: int, page_number: int) -> list[dict]:
+    return [{'id': str(page_number)}]
+
+
+@pytest.mark.asyncio
+async def test_upsert_drops_entity_and_lists_with_filters() -> None:
+    """
+    Тест на сброс кеша после изменения сущности.
+
+    ОП: сбрасываются записи сущности и списки с переданными фильтрами, записи других сущностей
+    и списки с другими фильтрами остаются.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    local_cache = LocalCache(max_entries=100, max_bytes=1024 * 1024, ttl=60)
+    cache = make_cache(redis, tag_entries=True, local_cache=local_cache)
+    await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+    await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='5')
+    await cache.get_from_cache_or_db(get_from_db=get_list, page_size=1)
+    await cache.get_from_cache_or_db(get_from_db=get_list, page_size=1, genre_id='a')
+    await cache.get_from_cache_or_db(get_from_db=get_list, page_size=1, genre_id='b')
+
+    # ==== Run ====
+    dropped = await cache.invalidate(['1'], lists=[{}, {'genre_id': 'a'}])
+
+    # ==== Asserts ====
+    assert dropped == 3
+    assert set(redis.values) == {'Item:get_by_id:entity_id=5', 'Item:get_list:page_size=1:genre_id=b'}
+    assert local_cache.get('Item:get_by_id:entity_id=5') is None
+
+
+@pytest.mark.asyncio
+async def test_delete_drops_only_entries_with_entity() -> None:
+    """
+    Тест на сброс кеша после удаления сущности.
+
+    ОП: сбрасываются записи, где есть сущность; списки без неё остаются.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, tag_entries=True)
+    await cache.get_from_cache_or_db(get_from_db=get_list, page_size=1)
+    await cache.get_from_cache_or_db(get_from_db=get_list, page_size=3)
+
+    # ==== Run ====
+    dropped = await cache.invalidate(['2'])
+
+    # ==== Asserts ====
+    assert dropped == 1
+    assert set(redis.values) == {'Item:get_list:page_size=1'}
+
+
+@pytest.mark.asyncio
+async def test_search_results_are_not_tagged_as_lists() -> None:
+    """
+    Тест на кеширование результатов поиска со сбросом по тегам.
+
+    ОП: результат поиска не попадает в теги списков и живёт не дольше `search_ttl`.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, tag_entries=True, ttl=600, search_ttl=30)
+
+    # ==== Run ====
+    await cache.get_from_cache_or_db(get_from_db=get_list, page_size=1, query='star')
+
+    # ==== Asserts ====
+    assert not [key for key in redis.sorted_sets if ':lists' in key]
+    assert redis.ttls['Item:get_list:page_size=1:query=star'] == 30
+
+
+@pytest.mark.asyncio
+async def test_tags_are_trimmed_and_drained_in_batches() -> None:
+    """
+    Тест на тег с большим числом записей.
+
+    ОП: истёкшие записи убираются из тега при записи, тег живёт не меньше записей,
+    а при сбросе ключи удаляются пачками.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, tag_entries=True, ttl=60, search_ttl=30)
+    tag_key = 'Tag:Item:lists'
+    redis.sorted_sets[tag_key] = {'Item:get_list:expired': 1.0}
+    for page_number in range(1, 1201):
+        await cache.get_from_cache_or_db(get_from_db=get_page, page_size=1, page_number=page_number)
+
+    # ==== Run ====
+    live = len(redis.sorted_sets[tag_key])
+    dropped = await cache.invalidate([], lists=[{}])
+
+    # ==== Asserts ====
+    assert live == 1200
+    assert redis.ttls[tag_key] >= 60
+    assert dropped == 1200
+    assert redis.commands.count('zrange') == 3
+    assert not redis.values
+    assert tag_key not in redis.sorted_sets
+
+
+@pytest.mark.asyncio
+async def test_film_upsert_drops_lists_of_its_genres_and_persons() -> None:
+    """
+    Тест на сброс списков после изменения фильма.
+
+    ОП: сбрасываются все фильмы и списки жанров и персон фильма, списки других жанров остаются.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    film = {'id': '1', 'title': 'Star', 'imdb_rating': 7.0, 'genre': [{'id': 'drama'}], 'actors': [{'id': 'ford'}]}
+    service = FilmService(
+        db=FilmsDataProvider(db_client=FakeElastic([film]), db_index='movies'),
+        cache=make_cache(redis, tag_entries=True),
+    )
+    for filters in ({}, {'genre_id': 'drama'}, {'genre_id': 'comedy'}, {'person_id': 'ford'}):
+        await service.cache.get_from_cache_or_db(get_from_db=get_filtered, page_size=1, **filters)
+
+    # ==== Run ====
+    await service.invalidate(['1'])
+
+    # ==== Asserts ====
+    assert set(redis.values) == {'Item:get_filtered:page_size=1:genre_id=comedy'}
+
+
+@pytest.mark.asyncio
+async def test_events_are_grouped_by_entity_and_operation() -> None:
+    """
+    Тест на обработку пачки событий.
+
+    ОП: обработчики вызываются один раз на тип сущности и операцию, ошибка одного не мешает другим.
+    """
+    # ==== Init ====
+    failing, film_handler, person_handler = Handler(error=ConnectionError()), Handler(), Handler()
+    consumer = InvalidationConsumer(
+        cache_client=StreamRedis(),
+        stream='changes',
+        handlers={'film': [failing, film_handler], 'person': [person_handler]},
+    )
+
+    # ==== Run ====
+    await consumer.handle([
+        {b'entity': b'film', b'id': b'1', b'op': UPSERT.encode()},
+        {b'entity': b'film', b'id': b'2', b'op': UPSERT.encode()},
+        {b'entity': b'film', b'id': b'3', b'op': DELETE.encode()},
+        {b'entity': b'person', b'id': b'4', b'op': UPSERT.encode()},
+        {b'entity': b'genre', b'id': b'5', b'op': UPSERT.encode()},
+    ])
+
+    # ==== Asserts ====
+    assert film_handler.calls == [(['1', '2'], False), (['3'], True)]
+    assert failing.calls == film_handler.calls
+    assert person_handler.calls == [(['4'], False)]
+
+
+@pytest.mark.asyncio
+async def test_consumer_reads_published_changes() -> None:
+    """
+    Тест на чтение ленты изменений.
+
+    ОП: до обработчика доходят события, опубликованные после запуска; неизвестная операция не публикуется.
+    """
+    # ==== Init ====
+    redis = StreamRedis()
+    handler = Handler()
+    consumer = InvalidationConsumer(cache_client=redis, stream='changes', handlers={'film': [handler]})
+    await publish_change(redis, 'changes', 'film', '1')
+
+    # ==== Run ====
+    task = asyncio.ensure_future(consumer.run())
+    await asyncio.sleep(0.01)
+    await publish_change(redis, 'changes', 'film', '2', op=DELETE)
+    await publish_change(redis, 'changes', 'film', '3')
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    # ==== Asserts ====
+    assert handler.calls == [(['2'], True), (['3'], False)]
+    with pytest.raises(ValueError):
+        await publish_change(redis, 'changes', 'film', '1', op='merge')
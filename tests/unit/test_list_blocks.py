@@ -0,0 +1,73 @@
+"""Тесты страниц списков из выровненных блоков id."""
+import orjson
+import pytest
+
+from tests.unit.fakes import FakeRedis, RecordingElastic, make_provider, make_service
+
+DOCS = [{'id': str(index), 'title': f'Film {index}'} for index in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_page_is_sliced_from_two_blocks() -> None:
+    """
+    Тест на страницу на границе блоков.
+
+    ОП: страница собирается из двух блоков, блоки загружаются только с полем id.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = RecordingElastic(DOCS)
+    service = make_service(redis, make_provider(es), list_block_size=4)
+
+    # ==== Run ====
+    items = await service.get_list(page_size=3, page_number=2)
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['3', '4', '5']
+    assert orjson.loads(redis.values['Item:get_list:block=4:0']) == ['0', '1', '2', '3']
+    assert orjson.loads(redis.values['Item:get_list:block=4:1']) == ['4', '5', '6', '7']
+    assert sorted((body['from'], body['size']) for body in es.bodies) == [(0, 4), (4, 4)]
+    assert all(body['_source'] == ['id'] for body in es.bodies)
+
+
+@pytest.mark.asyncio
+async def test_page_sizes_share_blocks() -> None:
+    """
+    Тест на страницы разного размера.
+
+    ОП: страницы любого размера берутся из тех же блоков без новых поисков.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = RecordingElastic(DOCS)
+    service = make_service(redis, make_provider(es), list_block_size=4)
+    await service.get_list(page_size=8, page_number=1)
+    es.calls.clear()
+
+    # ==== Run ====
+    small = await service.get_list(page_size=2, page_number=3)
+    odd = await service.get_list(page_size=3, page_number=1)
+
+    # ==== Asserts ====
+    assert [item.id for item in small] == ['4', '5']
+    assert [item.id for item in odd] == ['0', '1', '2']
+    assert es.calls == []
+
+
+@pytest.mark.asyncio
+async def test_last_block_is_short() -> None:
+    """
+    Тест на последнюю страницу списка.
+
+    ОП: страница за концом списка пустая, неполный блок отдаёт оставшиеся id.
+    """
+    # ==== Init ====
+    service = make_service(FakeRedis(), make_provider(RecordingElastic(DOCS)), list_block_size=4)
+
+    # ==== Run ====
+    last = await service.get_list(page_size=3, page_number=4)
+    empty = await service.get_list(page_size=5, page_number=3)
+
+    # ==== Asserts ====
+    assert [item.id for item in last] == ['9']
+    assert empty == []
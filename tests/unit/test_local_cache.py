@@ -0,0 +1,91 @@
+"""Тесты локального LRU-кеша воркера."""
+import time
+
+import pytest
+
+from db.cache.local import LocalCache, get_local_cache
+from tests.unit.fakes import FakeRedis, make_cache
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    """
+    Тест на вытеснение записей.
+
+    ОП: при превышении числа записей или их размера вытесняются давно не читанные.
+    """
+    # ==== Init ====
+    cache = LocalCache(max_entries=2, max_bytes=10, ttl=60)
+
+    # ==== Run ====
+    cache.set('a', b'1')
+    cache.set('b', b'2')
+    cache.get('a')
+    cache.set('c', b'3')
+    by_count = (cache.get('a'), cache.get('b'), cache.get('c'))
+    cache.set('d', b'12345678')
+    cache.set('e', b'12345')
+    cache.set('huge', b'12345678901')
+
+    # ==== Asserts ====
+    assert by_count == (b'1', None, b'3')
+    assert (cache.get('c'), cache.get('d'), cache.get('e')) == (None, None, b'12345')
+    assert cache.get('huge') is None
+
+
+def test_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Тест на срок жизни записей.
+
+    ОП: запись живёт не дольше ttl кеша и не дольше своего ttl.
+    """
+    # ==== Init ====
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=10)
+    cache.set('long', b'1', ttl=60)
+    cache.set('short', b'2', ttl=5)
+
+    # ==== Run ====
+    now[0] = 106.0
+    after_short = (cache.get('long'), cache.get('short'))
+    now[0] = 111.0
+
+    # ==== Asserts ====
+    assert after_short == (b'1', None)
+    assert cache.get('long') is None
+
+
+def test_disabled_local_cache() -> None:
+    """
+    Тест на выключенный локальный кеш.
+
+    ОП: при нулевом ограничении кеш не создаётся.
+    """
+    # ==== Run & Asserts ====
+    assert get_local_cache(max_entries=0, max_bytes=100, ttl=10) is None
+    assert get_local_cache(max_entries=10, max_bytes=100, ttl=0) is None
+    assert isinstance(get_local_cache(max_entries=10, max_bytes=100, ttl=10), LocalCache)
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_read_before_redis() -> None:
+    """
+    Тест на чтение через локальный кеш.
+
+    ОП: повторное чтение не обращается к Redis.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, local_cache=LocalCache(max_entries=10, max_bytes=1024, ttl=60))
+
+    async def get_by_id(entity_id: str) -> dict:
+        return {'id': entity_id}
+
+    # ==== Run ====
+    await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+    redis.commands.clear()
+    item = await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert item.id == '1'
+    assert redis.commands == []
@@ -0,0 +1,97 @@
+"""Тесты метрик воркера, которые отдаёт /metrics."""
+import asyncio
+
+import pytest
+
+from api.metrics import service_metrics
+from db.cache.resilience import get_circuit_breaker
+from services.film import get_film_service
+from services.genre import get_genres_service
+from services.person import get_persons_service
+from tests.unit.fakes import FakeElastic, FakeRedis
+
+FILMS = [{'id': str(index), 'title': f'Film {index}', 'imdb_rating': 5.0} for index in range(20)]
+
+
+def make_services(redis: FakeRedis, es: FakeElastic) -> dict:
+    for get_service in (get_film_service, get_genres_service, get_persons_service):
+        get_service.cache_clear()
+    return {
+        'film_service': get_film_service(cache=redis, db=es),
+        'genre_service': get_genres_service(cache=redis, db=es),
+        'person_service': get_persons_service(cache=redis, db=es),
+    }
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_cache_hit_ratios() -> None:
+    """
+    Тест на доли попаданий в кэш.
+
+    ОП: после повторного чтения фильма доля попаданий в Redis растёт.
+    """
+    # ==== Init ====
+    services = make_services(FakeRedis(), FakeElastic(FILMS))
+    film_service = services['film_service']
+    await film_service.get_by_id('1')
+    before = (await service_metrics(**services))['cache_hit_ratios']['films']['redis']
+
+    # ==== Run ====
+    for _ in range(5):
+        await film_service.get_by_id('1')
+    report = await service_metrics(**services)
+
+    # ==== Asserts ====
+    assert report['cache_hit_ratios']['films']['redis'] > before
+    assert set(report['cache_hit_ratios']) == {'films', 'genres', 'persons'}
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_degraded_cache() -> None:
+    """
+    Тест на счётчики работы в обход недоступного Redis.
+
+    ОП: ошибки Redis видны в cache_degraded, автомат защиты размыкается, фильм загружается из Elastic.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    services = make_services(redis, FakeElastic(FILMS))
+    before = (await service_metrics(**services))['cache_degraded'].get('cache.Film.degraded.errors', 0)
+    redis.error = ConnectionError()
+
+    # ==== Run ====
+    for _ in range(5):
+        film = await services['film_service'].get_by_id('2')
+    report = await service_metrics(**services)
+    get_circuit_breaker().record_success()
+
+    # ==== Asserts ====
+    assert film.id == '2'
+    assert report['cache_degraded']['cache.Film.degraded.errors'] > before
+    assert report['cache_breaker_open'] is True
+
+
+@pytest.mark.asyncio
+async def test_metrics_report_search_batch_fill_ratio() -> None:
+    """
+    Тест на заполненность пачек `_msearch`.
+
+    ОП: без объединения поисков -- None, после пачки одновременных поисков -- доля заполнения пачки.
+    """
+    # ==== Init ====
+    services = make_services(FakeRedis(), FakeElastic(FILMS))
+    films_db = services['film_service'].db
+    disabled = (await service_metrics(**services))['search_batch_fill_ratios']['films']
+    films_db.batch_searches = True
+    batcher = films_db._get_batcher()
+    batcher.max_batch_size = 4
+    before = batcher.fill_ratio()
+
+    # ==== Run ====
+    await asyncio.gather(*(films_db.get_list(genre_id=None, page_size=2) for _ in range(4)))
+    report = await service_metrics(**services)
+
+    # ==== Asserts ====
+    assert disabled is None
+    assert report['search_batch_fill_ratios']['films'] > before
+    assert report['search_batch_fill_ratios']['genres'] is None
@@ -0,0 +1,110 @@
+"""Тесты объединения поисковых запросов в `_msearch`."""
+import asyncio
+
+import pytest
+from elasticsearch import NotFoundError
+
+from db.data_providers.msearch import SearchBatcher
+from tests.unit.fakes import FakeElastic
+
+
+class PartlyFailingElastic(FakeElastic):
+    """Elasticsearch, отвечающий ошибкой на поиск в индексе `missing`."""
+
+    async def msearch(self, body: list[dict], **kwargs) -> dict:
+        response = await super().msearch(body, **kwargs)
+        for index, header in enumerate(body[::2]):
+            if header['index'] == 'missing':
+                response['responses'][index] = {'status': 404, 'error': {'type': 'index_not_found_exception'}}
+        return response
+
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_go_in_one_msearch() -> None:
+    """
+    Тест на объединение поисков.
+
+    ОП: одновременные поиски уходят одним _msearch, каждый получает свой ответ.
+    """
+    # ==== Init ====
+    es = FakeElastic([{'id': str(index)} for index in range(5)])
+    batcher = SearchBatcher(db_client=es, name='test.msearch.one', max_batch_size=10, max_wait=0.0)
+
+    # ==== Run ====
+    responses = await asyncio.gather(*(
+        batcher.search(index='movies', body={'size': size}) for size in (1, 2, 3)
+    ))
+
+    # ==== Asserts ====
+    assert [len(response['hits']['hits']) for response in responses] == [1, 2, 3]
+    assert es.calls == ['msearch', 'search', 'search', 'search']
+    assert batcher.fill_ratio() == pytest.approx(0.3)
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_at_once() -> None:
+    """
+    Тест на ограничение размера пачки.
+
+    ОП: набранная пачка отправляется сразу, не дожидаясь max_wait.
+    """
+    # ==== Init ====
+    es = FakeElastic([{'id': '1'}])
+    batcher = SearchBatcher(db_client=es, name='test.msearch.full', max_batch_size=2, max_wait=10.0)
+
+    # ==== Run ====
+    responses = await asyncio.wait_for(asyncio.gather(
+        batcher.search(index='movies', body={}),
+        batcher.search(index='movies', body={}),
+    ), 1)
+
+    # ==== Asserts ====
+    assert len(responses) == 2
+    assert es.calls.count('msearch') == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_search_does_not_affect_others() -> None:
+    """
+    Тест на ошибку одного из поисков пачки.
+
+    ОП: упавший поиск получает то же исключение, что и одиночный search, остальные -- свои ответы.
+    """
+    # ==== Init ====
+    es = PartlyFailingElastic([{'id': '1'}])
+    batcher = SearchBatcher(db_client=es, name='test.msearch.error', max_batch_size=10, max_wait=0.0)
+
+    # ==== Run ====
+    found, missing = await asyncio.gather(
+        batcher.search(index='movies', body={}),
+        batcher.search(index='missing', body={}),
+        return_exceptions=True,
+    )
+
+    # ==== Asserts ====
+    assert found['hits']['hits'][0]['_source'] == {'id': '1'}
+    assert isinstance(missing, NotFoundError)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_msearch_error_reaches_every_caller() -> None:
+    """
+    Тест на ошибку всего _msearch.
+
+    ОП: ошибку получают все поиски пачки.
+    """
+    # ==== Init ====
+    es = FakeElastic([])
+    es.error = ConnectionError()
+    batcher = SearchBatcher(db_client=es, name='test.msearch.down', max_batch_size=10, max_wait=0.0)
+
+    # ==== Run ====
+    results = await asyncio.gather(
+        batcher.search(index='movies', body={}),
+        batcher.search(index='movies', body={}),
+        return_exceptions=True,
+    )
+
+    # ==== Asserts ====
+    assert all(isinstance(result, ConnectionError) for result in results)
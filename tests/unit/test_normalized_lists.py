@@ -0,0 +1,111 @@
+"""Тесты кеширования списков как списков id с догрузкой сущностей."""
+import orjson
+import pytest
+
+from db.data_providers.elastic import ElasticDataProvider
+from tests.unit.fakes import FakeElastic, FakeRedis, make_cache, make_provider
+
+DOCS = [{'id': str(index), 'title': f'Film {index}'} for index in range(5)]
+
+
+async def get_list(cache, provider: ElasticDataProvider, **kwargs) -> list:
+    return await cache.get_list_from_cache_or_db(
+        get_from_db=provider.get_list,
+        get_by_id=provider.get_by_id,
+        get_by_ids=provider.get_by_ids,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_is_cached_as_ids() -> None:
+    """
+    Тест на кеширование списка.
+
+    ОП: под ключом списка хранятся только id, сущности -- под ключами get_by_id.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    cache = make_cache(redis, normalize_lists=True)
+
+    # ==== Run ====
+    items = await get_list(cache, provider, page_size=3)
+    cached = await get_list(cache, provider, page_size=3)
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['0', '1', '2']
+    assert cached == items
+    assert orjson.loads(redis.values['Item:get_list:page_size=3:ids']) == ['0', '1', '2']
+    assert orjson.loads(redis.values['Item:get_by_id:entity_id=1']) == DOCS[1]
+    assert es.calls == ['search']
+
+
+@pytest.mark.asyncio
+async def test_missing_entities_are_loaded_at_once() -> None:
+    """
+    Тест на догрузку сущностей списка.
+
+    ОП: найденные в кеше сущности берутся одним MGET, остальные -- одним запросом к источнику.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    cache = make_cache(redis, normalize_lists=True)
+    await get_list(cache, provider, page_size=2)
+    redis.values['Item:get_list:page_size=4:ids'] = orjson.dumps(['3', '1', '0', '2'])
+    es.calls.clear()
+    redis.commands.clear()
+
+    # ==== Run ====
+    items = await get_list(cache, provider, page_size=4)
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['3', '1', '0', '2']
+    assert es.calls == ['mget']
+    assert redis.commands.count('mget') == 1
+    assert 'Item:get_by_id:entity_id=3' in redis.values
+
+
+@pytest.mark.asyncio
+async def test_deleted_entities_are_skipped() -> None:
+    """
+    Тест на список со ссылкой на удалённую сущность.
+
+    ОП: сущность, которой нет ни в кеше, ни в источнике, пропускается без ошибки.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = FakeElastic(DOCS)
+    cache = make_cache(redis, normalize_lists=True)
+    redis.values['Item:get_list:page_size=2:ids'] = orjson.dumps(['1', 'deleted'])
+
+    # ==== Run ====
+    items = await get_list(cache, make_provider(es), page_size=2)
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['1']
+
+
+@pytest.mark.asyncio
+async def test_get_many_keeps_order() -> None:
+    """
+    Тест на загрузку сущностей по списку id.
+
+    ОП: сущности возвращаются в порядке id, повторная загрузка идёт из кеша.
+    """
+    # ==== Init ====
+    es = FakeElastic(DOCS)
+    provider = make_provider(es)
+    cache = make_cache(FakeRedis())
+
+    # ==== Run ====
+    items = await cache.get_many_from_cache_or_db(provider.get_by_id, provider.get_by_ids, ['4', '0', '2'])
+    again = await cache.get_many_from_cache_or_db(provider.get_by_id, provider.get_by_ids, ['2', '4'])
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['4', '0', '2']
+    assert [item.id for item in again] == ['2', '4']
+    assert es.calls == ['mget']
@@ -0,0 +1,128 @@
+"""Тесты обратного индекса персона -> фильмы в Redis."""
+
+import pytest
+
+from core.config import settings
+from db.cache.person_films import PersonFilmsIndex
+from db.data_providers.films import FilmsDataProvider
+from services.film import get_film_service
+from tests.unit.fakes import FakeElastic, FakeRedis
+
+FILMS = [
+    {'id': '1', 'imdb_rating': 7.0, 'actors': [{'id': 'ford'}], 'writers': [{'id': 'lucas'}]},
+    {'id': '2', 'imdb_rating': 9.0, 'actors': [{'id': 'ford'}]},
+    {'id': '3', 'imdb_rating': 8.0, 'actors': [{'id': 'ford'}, {'id': 'hamill'}]},
+]
+
+
+def make_index(redis: FakeRedis, films: list[dict] = FILMS) -> PersonFilmsIndex:
+    db = FilmsDataProvider(db_client=FakeElastic(films), db_index='movies')
+    return PersonFilmsIndex(cache_client=redis, db=db, breaker=None)
+
+
+@pytest.mark.asyncio
+async def test_person_films_pages_by_rating() -> None:
+    """
+    Тест на страницы фильмов персоны из построенного индекса.
+
+    ОП: фильмы по убыванию рейтинга, до построения индекса -- None.
+    """
+    # ==== Init ====
+    index = make_index(FakeRedis())
+
+    # ==== Run ====
+    before = await index.get_film_ids('ford', page_size=2, page_number=1)
+    await index.build_once()
+
+    # ==== Asserts ====
+    assert before is None
+    assert await index.get_film_ids('ford', page_size=2, page_number=1) == ['2', '3']
+    assert await index.get_film_ids('ford', page_size=2, page_number=2) == ['1']
+    assert await index.get_film_ids('lucas', page_size=2, page_number=1) == ['1']
+
+
+@pytest.mark.asyncio
+async def test_person_films_updates_incrementally() -> None:
+    """
+    Тест на изменение и удаление фильма.
+
+    ОП: фильм переезжает к новым персонам и пропадает из индекса после удаления.
+    """
+    # ==== Init ====
+    index = make_index(FakeRedis())
+    await index.build_once()
+
+    # ==== Run ====
+    await index.update_film({'id': '3', 'imdb_rating': 8.0, 'actors': [{'id': 'hamill'}]})
+    await index.remove_film('2')
+
+    # ==== Asserts ====
+    assert await index.get_film_ids('ford', page_size=10, page_number=1) == ['1']
+    assert await index.get_film_ids('hamill', page_size=10, page_number=1) == ['3']
+
+
+@pytest.mark.asyncio
+async def test_person_films_rebuilds_expired_version() -> None:
+    """
+    Тест на повторную сборку индекса после истечения его версии.
+
+    ОП: пока версия действует, индекс не пересобирается; новая версия строится с нуля.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    index = make_index(redis)
+    await index.build_once()
+    version = await redis.get('PersonFilms:built')
+    index.db = make_index(redis, films=FILMS[:1]).db
+
+    # ==== Run ====
+    await index.build_once()
+    unchanged = await index.get_film_ids('ford', page_size=10, page_number=1)
+    await redis.delete('PersonFilms:built')
+    await index.build_once()
+
+    # ==== Asserts ====
+    assert unchanged == ['2', '3', '1']
+    assert await redis.get('PersonFilms:built') != version
+    assert redis.ttls['PersonFilms:built'] == index.rebuild_interval
+    assert await index.get_film_ids('ford', page_size=10, page_number=1) == ['1']
+
+
+@pytest.mark.asyncio
+async def test_person_films_fails_open() -> None:
+    """
+    Тест на недоступный Redis.
+
+    ОП: индекс отвечает None, сервис ищет фильмы персоны в Elastic.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    index = make_index(redis)
+    await index.build_once()
+    redis.error = ConnectionError()
+
+    # ==== Run & Asserts ====
+    assert await index.get_film_ids('ford', page_size=10, page_number=1) is None
+    await index.update_film(FILMS[0])
+
+
+def test_person_films_needs_invalidation(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Тест на включение индекса без сброса кеша по тегам.
+
+    ОП: индекс не создаётся, потому что без событий об изменениях он устаревает.
+    """
+    # ==== Init ====
+    monkeypatch.setattr(settings, 'PERSON_FILMS_INDEX_ENABLED', True)
+    get_film_service.cache_clear()
+
+    # ==== Run ====
+    monkeypatch.setattr(settings, 'CACHE_INVALIDATION_ENABLED', False)
+    without_invalidation = get_film_service(cache=FakeRedis(), db=FakeElastic([]))
+    monkeypatch.setattr(settings, 'CACHE_INVALIDATION_ENABLED', True)
+    with_invalidation = get_film_service(cache=FakeRedis(), db=FakeElastic([]))
+    get_film_service.cache_clear()
+
+    # ==== Asserts ====
+    assert without_invalidation.person_films is None
+    assert isinstance(with_invalidation.person_films, PersonFilmsIndex)
@@ -0,0 +1,55 @@
+"""Тесты нормализации поисковых запросов."""
+import pytest
+
+from services.query import normalize_query
+from tests.unit.fakes import FakeElastic, FakeRedis, make_provider, make_service
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('  Star   WARS\t', 'star wars'),
+    ('ＳＴＡＲ Wars', 'star wars'),
+    ('Ёлки', 'ёлки'),
+])
+def test_query_is_folded(query: str, expected: str) -> None:
+    """
+    Тест на приведение запроса к одному виду.
+
+    ОП: регистр, полноширинные символы и пробелы не различаются.
+    """
+    # ==== Run & Asserts ====
+    assert normalize_query(query, strip_stop_words=False) == expected
+
+
+def test_stop_words_are_stripped() -> None:
+    """
+    Тест на удаление стоп-слов.
+
+    ОП: стоп-слова английского и русского удаляются, запрос только из стоп-слов остаётся.
+    """
+    # ==== Run & Asserts ====
+    assert normalize_query('The Lord of the Rings', strip_stop_words=True) == 'lord rings'
+    assert normalize_query('Война и мир', strip_stop_words=True) == 'война мир'
+    assert normalize_query('To Be or Not to Be', strip_stop_words=True) == 'to be or not to be'
+    assert normalize_query('The Lord of the Rings', strip_stop_words=False) == 'the lord of the rings'
+
+
+@pytest.mark.asyncio
+async def test_spellings_share_cache_entry() -> None:
+    """
+    Тест на кеширование поиска с разным написанием запроса.
+
+    ОП: запросы, различающиеся только написанием, попадают в одну запись кеша с нормализованным запросом.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = FakeElastic([{'id': '1', 'title': 'Star Wars'}])
+    service = make_service(redis, make_provider(es))
+
+    # ==== Run ====
+    first = await service.get_search_result(query='Star  Wars', page_size=10)
+    second = await service.get_search_result(query='star wars ', page_size=10)
+
+    # ==== Asserts ====
+    assert first == second
+    assert es.calls == ['search']
+    assert [key for key in redis.values if 'query=' in key] == ['Item:get_search_result:query=star wars:page_size=10']
@@ -0,0 +1,83 @@
+"""Тесты поиска по реплике индекса жанров в памяти."""
+
+import pytest
+
+from db.data_providers.genres import GenresDataProvider
+from db.data_providers.replica import ReplicaDataProvider, tokenize
+from tests.unit.fakes import FakeElastic
+
+GENRES = [
+    {'id': '1', 'name': 'Drama', 'description': 'Serious stories.'},
+    {'id': '2', 'name': 'Sci-Fi', 'description': 'Space, drama and robots.'},
+    {'id': '3', 'name': 'Comedy', 'description': 'Funny dramatic stories.'},
+    {'id': '4', 'name': 'Documentary', 'description': 'Real stories. Драма жизни.'},
+]
+
+
+async def make_replica(es: FakeElastic) -> ReplicaDataProvider:
+    replica = ReplicaDataProvider(
+        fallback=GenresDataProvider(db_client=es, db_index='genres', tiered_search=False),
+        search_fields=GenresDataProvider.search_fields,
+    )
+    await replica.refresh()
+    return replica
+
+
+def test_tokenize_as_standard_analyzer() -> None:
+    """
+    Тест на разбиение текста на слова.
+
+    ОП: слова в нижнем регистре без знаков препинания, как у токенизатора standard.
+    """
+    # ==== Run & Asserts ====
+    assert tokenize('Sci-Fi, DRAMA!') == {'sci', 'fi', 'drama'}
+    assert tokenize('Ｄｒａｍａ жизни') == {'drama', 'жизни'}
+
+
+@pytest.mark.parametrize('query, expected_ids', [
+    # Ответы Elastic с анализатором индекса (multi_match, operator: and) на те же документы.
+    ('drama', ['1', '2']),
+    ('DRAMA', ['1', '2']),
+    ('sci fi', ['2']),
+    ('sci-fi', ['2']),
+    ('space robots', ['2']),
+    ('драма', ['4']),
+    ('stories', ['1', '3', '4']),
+])
+@pytest.mark.asyncio
+async def test_replica_matches_whole_words(query: str, expected_ids: list[str]) -> None:
+    """
+    Тест на поиск по словам.
+
+    ОП: документы, в одном поле которых есть все слова запроса, сначала совпадения в названии.
+    """
+    # ==== Init ====
+    es = FakeElastic(GENRES)
+    replica = await make_replica(es)
+
+    # ==== Run ====
+    found = await replica.get_search_result(query=query, page_size=10)
+
+    # ==== Asserts ====
+    assert [genre['id'] for genre in found] == expected_ids
+    assert es.calls == ['search']
+
+
+@pytest.mark.parametrize('query', ['rama', 'dram', 'drama robots comedy', 'sci stories'])
+@pytest.mark.asyncio
+async def test_replica_leaves_partial_words_to_elastic(query: str) -> None:
+    """
+    Тест на запросы с частями слов и словами из разных полей.
+
+    ОП: реплика не находит документы по подстроке ("rama" не находит "Drama"), запрос уходит в Elastic.
+    """
+    # ==== Init ====
+    es = FakeElastic(GENRES)
+    replica = await make_replica(es)
+
+    # ==== Run ====
+    assert replica._search(query) == []
+    await replica.get_search_result(query=query, page_size=10)
+
+    # ==== Asserts ====
+    assert es.calls == ['search', 'search']
@@ -0,0 +1,183 @@
+"""Тесты работы кеша при медленном или недоступном Redis."""
+import asyncio
+
+import pytest
+
+from db.cache.resilience import CircuitBreaker, WriteQueue
+from tests.unit.fakes import FakeRedis, make_cache
+
+
+def test_breaker_opens_after_failures_in_a_row() -> None:
+    """
+    Тест на размыкание автомата защиты.
+
+    ОП: автомат размыкается только после failure_threshold ошибок подряд, успех сбрасывает счёт.
+    """
+    # ==== Init ====
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    # ==== Run ====
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    closed = not breaker.is_open and breaker.allow()
+    breaker.record_failure()
+
+    # ==== Asserts ====
+    assert closed
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_breaker_lets_one_probe_through() -> None:
+    """
+    Тест на пробный вызов после reset_timeout.
+
+    ОП: пропускается один вызов; его ошибка оставляет автомат разомкнутым, успех замыкает.
+    """
+    # ==== Init ====
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+
+    # ==== Run & Asserts ====
+    await asyncio.sleep(0.02)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    await asyncio.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_write_queue_runs_writes_in_order() -> None:
+    """
+    Тест на фоновую запись.
+
+    ОП: записи выполняются по одной в порядке очереди, исход записи передаётся автомату защиты.
+    """
+    # ==== Init ====
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    queue = WriteQueue(max_size=10, breaker=breaker)
+    done = []
+
+    async def write(name: str) -> None:
+        await asyncio.sleep(0)
+        done.append(name)
+
+    async def fail() -> None:
+        raise ConnectionError()
+
+    # ==== Run ====
+    submitted = [queue.submit(lambda name=name: write(name)) for name in 'abc']
+    await asyncio.sleep(0.01)
+    queue.submit(fail)
+    await asyncio.sleep(0.01)
+    queue.close()
+
+    # ==== Asserts ====
+    assert submitted == [True, True, True]
+    assert done == ['a', 'b', 'c']
+    assert breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_write_queue_drops_writes_when_full() -> None:
+    """
+    Тест на переполнение очереди записи.
+
+    ОП: записи сверх max_size отбрасываются, не задерживая запрос.
+    """
+    # ==== Init ====
+    queue = WriteQueue(max_size=2)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def blocked() -> None:
+        started.set()
+        await release.wait()
+
+    async def noop() -> None:
+        pass
+
+    # ==== Run ====
+    queue.submit(blocked)
+    await started.wait()
+    submitted = [queue.submit(noop) for _ in range(3)]
+    release.set()
+    queue.close()
+
+    # ==== Asserts ====
+    assert submitted == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_data_while_redis_is_down() -> None:
+    """
+    Тест на чтение через кеш при недоступном Redis.
+
+    ОП: данные загружаются из источника, после failure_threshold ошибок Redis не вызывается.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    redis.error = ConnectionError()
+    cache = make_cache(redis, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    async def get_by_id(entity_id: str) -> dict:
+        return {'id': entity_id}
+
+    # ==== Run ====
+    items = [await cache.get_from_cache_or_db(get_from_db=get_by_id, entity_id=str(index)) for index in range(5)]
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['0', '1', '2', '3', '4']
+    assert len(redis.commands) == 2
+
+
+@pytest.mark.asyncio
+async def test_lock_is_released_after_queued_write() -> None:
+    """
+    Тест на блокировку заполнения ключа при фоновой записи.
+
+    ОП: блокировка снимается после записи значения, и ожидающий воркер берёт его из Redis, а не из источника.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    set_value = redis.set
+
+    async def slow_set(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await set_value(*args, **kwargs)
+
+    redis.set = slow_set
+    loads = []
+
+    async def get_by_id(entity_id: str) -> dict:
+        loads.append(entity_id)
+        await asyncio.sleep(0.02)
+        return {'id': entity_id}
+
+    # Два воркера с общим Redis, у каждого своя очередь записи.
+    workers = [
+        make_cache(redis, use_lock=True, lock_poll_interval=0.01, write_queue=WriteQueue())
+        for _ in range(2)
+    ]
+
+    # ==== Run ====
+    first = asyncio.ensure_future(workers[0].get_from_cache_or_db(get_from_db=get_by_id, entity_id='1'))
+    await asyncio.sleep(0.01)
+    second = await workers[1].get_from_cache_or_db(get_from_db=get_by_id, entity_id='1')
+    await first
+    for worker in workers:
+        worker.write_queue.close()
+
+    # ==== Asserts ====
+    assert second.id == '1'
+    assert loads == ['1']
@@ -0,0 +1,111 @@
+"""Тесты кеширования готовых ответов API."""
+import orjson
+import pytest
+from pydantic import BaseModel
+
+from api.v1.responses import json_bytes_response
+from tests.unit.fakes import FakeElastic, FakeRedis, Item, make_cache
+
+KEY = 'Item:get_by_id:entity_id=1:response'
+
+
+class ItemResponse(BaseModel):
+    """Модель ответа API без части полей сущности."""
+
+    id: str
+
+
+class Renderer:
+    """Отображение сущности в модель ответа, считающее вызовы."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, item: Item) -> ItemResponse:
+        self.calls += 1
+        return ItemResponse(id=item.id)
+
+
+async def get_by_id(entity_id: str) -> dict:
+    return {'id': entity_id, 'title': 'Star Wars'} if entity_id == '1' else None
+
+
+@pytest.mark.asyncio
+async def test_response_is_rendered_once() -> None:
+    """
+    Тест на кеширование ответа по id.
+
+    ОП: ответ строится один раз и далее отдаётся из кеша теми же байтами.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis)
+    render = Renderer()
+
+    # ==== Run ====
+    first = await cache.get_response_from_cache_or_db(get_from_db=get_by_id, to_response=render, entity_id='1')
+    second = await cache.get_response_from_cache_or_db(get_from_db=get_by_id, to_response=render, entity_id='1')
+
+    # ==== Asserts ====
+    assert orjson.loads(first) == {'id': '1'}
+    assert second == first
+    assert render.calls == 1
+    assert redis.values[KEY] == first
+
+
+@pytest.mark.asyncio
+async def test_missing_entity_has_no_response() -> None:
+    """
+    Тест на ответ по несуществующему id.
+
+    ОП: возвращается None, чтобы API ответил 404.
+    """
+    # ==== Init ====
+    cache = make_cache(FakeRedis())
+    render = Renderer()
+
+    # ==== Run ====
+    content = await cache.get_response_from_cache_or_db(get_from_db=get_by_id, to_response=render, entity_id='2')
+
+    # ==== Asserts ====
+    assert content is None
+    assert render.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_list_response_is_built_from_entities() -> None:
+    """
+    Тест на кеширование ответа со списком.
+
+    ОП: список строится через get_entities и отображается поэлементно, порядок сохраняется.
+    """
+    # ==== Init ====
+    es = FakeElastic([{'id': str(index), 'title': f'Film {index}'} for index in range(3)])
+    cache = make_cache(FakeRedis())
+
+    async def get_list(page_size: int) -> list[dict]:
+        response = await es.search(index='movies', body={'size': page_size})
+        return [hit['_source'] for hit in response['hits']['hits']]
+
+    # ==== Run ====
+    content = await cache.get_response_from_cache_or_db(get_from_db=get_list, to_response=Renderer(), page_size=2)
+    cached = await cache.get_response_from_cache_or_db(get_from_db=get_list, to_response=Renderer(), page_size=2)
+
+    # ==== Asserts ====
+    assert orjson.loads(content) == [{'id': '0'}, {'id': '1'}]
+    assert cached == content
+    assert es.calls == ['search']
+
+
+def test_json_bytes_response_keeps_content() -> None:
+    """
+    Тест на ответ из готового JSON.
+
+    ОП: байты отдаются без изменений с типом application/json.
+    """
+    # ==== Run ====
+    response = json_bytes_response(b'{"id":"1"}')
+
+    # ==== Asserts ====
+    assert response.body == b'{"id":"1"}'
+    assert response.media_type == 'application/json'
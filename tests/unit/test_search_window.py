@@ -0,0 +1,76 @@
+"""Тесты страниц поиска из закешированного окна первых id."""
+import orjson
+import pytest
+
+from tests.unit.fakes import FakeElastic, FakeRedis, RecordingElastic, make_provider, make_service
+
+DOCS = [{'id': str(index), 'title': f'Star Wars {index}'} for index in range(10)]
+WINDOW_KEY = 'Item:get_search_result:query=star wars:block=4:0'
+
+
+@pytest.mark.asyncio
+async def test_pages_are_sliced_from_window() -> None:
+    """
+    Тест на страницы поиска внутри окна.
+
+    ОП: окно id ищется один раз, страницы любого размера внутри окна берутся из него.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = FakeElastic(DOCS)
+    service = make_service(redis, make_provider(es), search_window=4)
+
+    # ==== Run ====
+    first = await service.get_search_result(query='Star Wars', page_size=2, page_number=1)
+    second = await service.get_search_result(query='star wars', page_size=2, page_number=2)
+    third = await service.get_search_result(query='star wars', page_size=3, page_number=1)
+
+    # ==== Asserts ====
+    assert [item.id for item in first + second] == ['0', '1', '2', '3']
+    assert [item.id for item in third] == ['0', '1', '2']
+    assert orjson.loads(redis.values[WINDOW_KEY]) == ['0', '1', '2', '3']
+    assert es.calls == ['search', 'mget', 'mget']
+
+
+@pytest.mark.asyncio
+async def test_pages_past_window_are_searched() -> None:
+    """
+    Тест на страницы поиска за пределами окна.
+
+    ОП: страница, выходящая за окно, ищется как обычно и окно не заполняет.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = FakeElastic(DOCS)
+    service = make_service(redis, make_provider(es), search_window=4)
+
+    # ==== Run ====
+    items = await service.get_search_result(query='star wars', page_size=3, page_number=2)
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['3', '4', '5']
+    assert WINDOW_KEY not in redis.values
+    assert es.calls == ['search']
+
+
+@pytest.mark.asyncio
+async def test_window_is_filled_by_one_tier() -> None:
+    """
+    Тест на окно поиска вместе с поиском по уровням.
+
+    ОП: окно больше числа точных совпадений, но их достаточно для точного уровня -- нечёткий поиск не выполняется,
+    и все страницы окна ранжированы точным поиском.
+    """
+    # ==== Init ====
+    es = RecordingElastic(DOCS)
+    service = make_service(FakeRedis(), make_provider(es, tiered_search=True, tiered_min_hits=2), search_window=20)
+
+    # ==== Run ====
+    first = await service.get_search_result(query='star wars', page_size=2, page_number=1)
+    second = await service.get_search_result(query='star wars', page_size=5, page_number=2)
+
+    # ==== Asserts ====
+    assert [item.id for item in first + second] == ['0', '1', '5', '6', '7', '8', '9']
+    body, = es.bodies
+    assert body['size'] == 20
+    assert 'fuzziness' not in body['query']['multi_match']
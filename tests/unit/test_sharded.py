@@ -0,0 +1,185 @@
+"""Тесты хранилища кеша, разнесённого по нескольким узлам Redis."""
+
+import pytest
+from pydantic import ValidationError
+
+from core.config import Settings
+from db.cache.sharded import CrossNodeError, ShardedCacheStorage
+from services.film import FilmService, get_film_service
+from tests.unit.fakes import FakeElastic, FakeRedis
+
+
+def make_storage(count: int = 3) -> ShardedCacheStorage:
+    """Хранилище из `count` узлов в памяти."""
+    return ShardedCacheStorage(
+        nodes=[FakeRedis() for _ in range(count)],
+        names=[f'redis-{index}:6379' for index in range(count)],
+    )
+
+
+def test_sharded_storage_builds_film_service() -> None:
+    """
+    Тест на создание сервиса с хранилищем из нескольких узлов.
+
+    ОП: фабрика сервисов кеширует сервис по хранилищу, хранилище хешируется по идентичности.
+    """
+    # ==== Init ====
+    storage = make_storage()
+    db = FakeElastic([])
+    get_film_service.cache_clear()
+
+    # ==== Run ====
+    service = get_film_service(cache=storage, db=db)
+
+    # ==== Asserts ====
+    assert isinstance(service, FilmService)
+    assert service.cache.cache_client is storage
+    assert get_film_service(cache=storage, db=db) is service
+    assert storage != make_storage()
+    get_film_service.cache_clear()
+
+
+def test_sharded_storage_spreads_keys() -> None:
+    """
+    Тест на распределение ключей по узлам.
+
+    ОП: каждый узел получает ключи, ключи с одним тегом попадают на один узел.
+    """
+    # ==== Init ====
+    storage = make_storage()
+    keys = [f'film:{index}' for index in range(300)]
+
+    # ==== Run ====
+    by_node = storage._group(keys)
+    tagged_nodes = {storage._get_node(f'{{tag}}:{index}') for index in range(50)}
+
+    # ==== Asserts ====
+    assert set(by_node) == {0, 1, 2}
+    assert all(len(node_keys) > 30 for node_keys in by_node.values())
+    assert len(tagged_nodes) == 1
+
+
+def test_sharded_storage_moves_few_keys_on_new_node() -> None:
+    """
+    Тест на добавление узла.
+
+    ОП: на новый узел переезжает только его доля ключей, остальные остаются на месте.
+    """
+    # ==== Init ====
+    storage = make_storage(3)
+    bigger = make_storage(4)
+    keys = [f'film:{index}' for index in range(1000)]
+
+    # ==== Run ====
+    moved = [key for key in keys if storage._get_node(key) != bigger._get_node(key)]
+
+    # ==== Asserts ====
+    assert all(bigger._get_node(key) == 3 for key in moved)
+    assert len(moved) < 400
+
+
+@pytest.mark.asyncio
+async def test_sharded_storage_mget_over_nodes() -> None:
+    """
+    Тест на чтение ключей с разных узлов.
+
+    ОП: одно MGET на узел, значения в порядке ключей, ключи недоступного узла читаются как промахи.
+    """
+    # ==== Init ====
+    storage = make_storage()
+    keys = [f'film:{index}' for index in range(30)]
+    pipeline = storage.pipeline()
+    for key in keys:
+        pipeline.set(key, key.encode(), expire=60)
+    await pipeline.execute()
+    down = storage._get_node(keys[0])
+    storage.nodes[down].error = ConnectionError()
+
+    # ==== Run ====
+    values = await storage.mget(*keys)
+
+    # ==== Asserts ====
+    for key, value in zip(keys, values):
+        assert value == (None if storage._get_node(key) == down else key.encode())
+    assert all(node.commands.count('mget') == 1 for node in storage.nodes)
+
+
+@pytest.mark.asyncio
+async def test_sharded_storage_refuses_cross_node_script() -> None:
+    """
+    Тест на Lua-скрипт с ключами на разных узлах.
+
+    ОП: ошибка CrossNodeError.
+    """
+    # ==== Init ====
+    storage = make_storage()
+    keys = [f'film:{index}' for index in range(30)]
+
+    # ==== Run & Asserts ====
+    with pytest.raises(CrossNodeError):
+        await storage.eval('return 1', keys=keys, args=[])
+
+
+@pytest.mark.asyncio
+async def test_sharded_storage_skips_down_node() -> None:
+    """
+    Тест на недоступный узел.
+
+    ОП: после `failure_threshold` ошибок подряд узел пропускается без обращения к нему,
+    ключи остальных узлов читаются и пишутся как обычно.
+    """
+    # ==== Init ====
+    storage = ShardedCacheStorage(
+        nodes=[FakeRedis() for _ in range(3)],
+        names=[f'redis-{index}:6379' for index in range(3)],
+        failure_threshold=2,
+        reset_timeout=60.0,
+    )
+    keys = [f'film:{index}' for index in range(30)]
+    down = storage._get_node(keys[0])
+    storage.nodes[down].error = ConnectionError('down')
+    down_keys = [key for key in keys if storage._get_node(key) == down]
+    up_key = next(key for key in keys if storage._get_node(key) != down)
+
+    # ==== Run ====
+    for key in down_keys[:2]:
+        await storage.get(key)
+    commands = len(storage.nodes[down].commands)
+    values = [await storage.get(key) for key in down_keys]
+    pipeline = storage.pipeline()
+    for key in keys:
+        pipeline.set(key, b'value')
+    await pipeline.execute()
+
+    # ==== Asserts ====
+    assert values == [None] * len(down_keys)
+    assert len(storage.nodes[down].commands) == commands
+    assert storage._breakers[down].is_open
+    assert await storage.get(up_key) == b'value'
+
+
+def test_sharded_storage_delegates_only_known_commands() -> None:
+    """
+    Тест на команды, которые хранилище передаёт узлам.
+
+    ОП: известные команды есть у хранилища и конвейера, остальных нет.
+    """
+    # ==== Init ====
+    storage = make_storage()
+
+    # ==== Run & Asserts ====
+    assert hasattr(storage, 'zrevrange')
+    assert not hasattr(storage, 'flushall')
+    assert hasattr(storage.pipeline(), 'zadd')
+    assert not hasattr(storage.pipeline(), 'get')
+
+
+def test_settings_refuse_tag_invalidation_with_nodes() -> None:
+    """
+    Тест на настройки со сбросом кеша по тегам и несколькими узлами.
+
+    ОП: сервис не запускается с такими настройками.
+    """
+    # ==== Run & Asserts ====
+    with pytest.raises(ValidationError):
+        Settings(REDIS_CACHE_NODES='redis-0:6379,redis-1:6379', CACHE_INVALIDATION_ENABLED=True)
@@ -0,0 +1,193 @@
+"""Тесты объединения одновременных промахов кеша и блокировки заполнения ключа."""
+import asyncio
+
+import pytest
+
+from db.cache.lock import RedisLock
+from tests.unit.fakes import FakeRedis, make_cache
+
+
+class SlowSource:
+    """Источник данных, отвечающий с задержкой и считающий вызовы."""
+
+    def __init__(self, delay: float = 0.01) -> None:
+        self.delay = delay
+        self.calls: list[str] = []
+        self.error = None
+
+    async def get_by_id(self, entity_id: str) -> dict:
+        self.calls.append(entity_id)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {'id': entity_id}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once() -> None:
+    """
+    Тест на объединение одновременных промахов по одному ключу.
+
+    ОП: источник вызывается один раз на ключ, все вызывающие получают результат.
+    """
+    # ==== Init ====
+    cache = make_cache(FakeRedis())
+    source = SlowSource()
+
+    # ==== Run ====
+    items = await asyncio.gather(*(
+        cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id=str(index % 2))
+        for index in range(10)
+    ))
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['0', '1'] * 5
+    assert sorted(source.calls) == ['0', '1']
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_remembered() -> None:
+    """
+    Тест на ошибку загрузки при объединении промахов.
+
+    ОП: ошибку получают все ожидающие, следующий запрос загружает данные заново.
+    """
+    # ==== Init ====
+    cache = make_cache(FakeRedis())
+    source = SlowSource()
+    source.error = ConnectionError()
+
+    # ==== Run ====
+    results = await asyncio.gather(
+        *(cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1') for _ in range(3)),
+        return_exceptions=True,
+    )
+    source.error = None
+    item = await cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert item.id == '1'
+    assert source.calls == ['1', '1']
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_load() -> None:
+    """
+    Тест на отмену одного из ожидающих загрузку.
+
+    ОП: загрузка продолжается для остальных вызывающих и попадает в кеш.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis)
+    source = SlowSource(delay=0.02)
+
+    # ==== Run ====
+    first = asyncio.ensure_future(cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1'))
+    second = asyncio.ensure_future(cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1'))
+    await asyncio.sleep(0.005)
+    first.cancel()
+    item = await second
+
+    # ==== Asserts ====
+    assert first.cancelled()
+    assert item.id == '1'
+    assert source.calls == ['1']
+    assert 'Item:get_by_id:entity_id=1' in redis.values
+
+
+@pytest.mark.asyncio
+async def test_lock_is_owned_by_its_token() -> None:
+    """
+    Тест на блокировку в Redis.
+
+    ОП: блокировку берёт только один, и снять её может только владелец.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    owner = RedisLock(cache_client=redis, key='key:lock', ttl_ms=1000)
+    other = RedisLock(cache_client=redis, key='key:lock', ttl_ms=1000)
+
+    # ==== Run ====
+    acquired = [await owner.acquire(), await other.acquire()]
+    await other.release()
+    locked_after_other = await owner.is_locked()
+    await owner.release()
+
+    # ==== Asserts ====
+    assert acquired == [True, False]
+    assert redis.ttls['key:lock'] == 1000
+    assert locked_after_other
+    assert not await owner.is_locked()
+
+
+@pytest.mark.asyncio
+async def test_workers_fill_key_once_with_lock() -> None:
+    """
+    Тест на заполнение ключа несколькими воркерами.
+
+    ОП: источник запрашивает воркер, взявший блокировку, остальные ждут значение в Redis.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    source = SlowSource(delay=0.03)
+    workers = [make_cache(redis, use_lock=True, lock_poll_interval=0.005) for _ in range(3)]
+
+    # ==== Run ====
+    items = await asyncio.gather(*(
+        worker.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1') for worker in workers
+    ))
+
+    # ==== Asserts ====
+    assert [item.id for item in items] == ['1', '1', '1']
+    assert source.calls == ['1']
+    assert 'Item:get_by_id:entity_id=1:lock' not in redis.values
+
+
+@pytest.mark.asyncio
+async def test_waiter_loads_itself_when_lock_is_dropped() -> None:
+    """
+    Тест на блокировку, снятую без записи значения.
+
+    ОП: ожидающий воркер не ждёт до истечения блокировки, а загружает данные сам.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    source = SlowSource()
+    cache = make_cache(redis, use_lock=True, lock_poll_interval=0.005)
+    lock = RedisLock(cache_client=redis, key='Item:get_by_id:entity_id=1:lock', ttl_ms=60_000)
+    await lock.acquire()
+
+    # ==== Run ====
+    waiter = asyncio.ensure_future(cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1'))
+    await asyncio.sleep(0.02)
+    calls_while_locked = list(source.calls)
+    await lock.release()
+    item = await asyncio.wait_for(waiter, 1)
+
+    # ==== Asserts ====
+    assert calls_while_locked == []
+    assert item.id == '1'
+    assert source.calls == ['1']
+
+
+@pytest.mark.asyncio
+async def test_lock_is_skipped_when_redis_fails() -> None:
+    """
+    Тест на блокировку при недоступном Redis.
+
+    ОП: данные загружаются из источника без блокировки.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    redis.error = ConnectionError()
+    source = SlowSource()
+    cache = make_cache(redis, use_lock=True)
+
+    # ==== Run ====
+    item = await cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert item.id == '1'
+    assert source.calls == ['1']
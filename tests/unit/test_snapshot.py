@@ -0,0 +1,146 @@
+"""Тесты файлов снимков индексов, которые воркеры отображают в память."""
+import os
+import pathlib
+import struct
+import time
+from typing import AsyncIterator
+
+import orjson
+import pytest
+
+from db.data_providers.films import FilmsDataProvider
+from db.data_providers.snapshot import HEADER, INDEX_ENTRY, MAGIC, SnapshotFile, hash_id, write_snapshot
+from tests.unit.fakes import FakeElastic
+
+DOCS = [{'id': str(index), 'title': f'Film {index}', 'imdb_rating': index / 10} for index in range(100)]
+
+
+async def iterate(docs: list[dict]) -> AsyncIterator[dict]:
+    for doc in docs:
+        yield doc
+
+
+async def make_snapshot(path: pathlib.Path, docs: list[dict] = DOCS, **kwargs) -> SnapshotFile:
+    await write_snapshot(str(path), iterate(docs))
+    return SnapshotFile(path=str(path), check_interval=0, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_binary_format(tmp_path: pathlib.Path) -> None:
+    """
+    Тест на формат файла снимка.
+
+    ОП: заголовок с версией и числом документов, индекс отсортирован по хешу id, записи -- id и JSON документа.
+    """
+    # ==== Init ====
+    path = tmp_path / 'movies.snap'
+    started = int(time.time() * 1000)
+
+    # ==== Run ====
+    count = await write_snapshot(str(path), iterate(DOCS))
+
+    # ==== Asserts ====
+    data = path.read_bytes()
+    magic, version, index_offset, entries = HEADER.unpack_from(data)
+    assert (magic, count, entries) == (MAGIC, len(DOCS), len(DOCS))
+    assert started <= version <= time.time() * 1000
+    assert len(data) == index_offset + entries * INDEX_ENTRY.size
+    index = [INDEX_ENTRY.unpack_from(data, index_offset + i * INDEX_ENTRY.size) for i in range(entries)]
+    assert [entry[0] for entry in index] == sorted(hash_id(doc['id']) for doc in DOCS)
+    entity_hash, offset, length = next(entry for entry in index if entry[0] == hash_id('7'))
+    id_length, = struct.unpack_from('!H', data, offset)
+    assert data[offset + 2:offset + 2 + id_length] == b'7'
+    assert orjson.loads(data[offset + 2 + id_length:offset + length]) == DOCS[7]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_documents(tmp_path: pathlib.Path) -> None:
+    """
+    Тест на чтение документов из снимка.
+
+    ОП: документы по id, для отсутствующих -- None.
+    """
+    # ==== Init ====
+    snapshot = await make_snapshot(tmp_path / 'movies.snap')
+
+    # ==== Run & Asserts ====
+    for doc in DOCS:
+        assert orjson.loads(snapshot.get(doc['id'])) == doc
+    assert snapshot.get('missing') is None
+    assert SnapshotFile(path=str(tmp_path / 'none.snap')).get('1') is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_maps_replaced_file(tmp_path: pathlib.Path) -> None:
+    """
+    Тест на замену файла снимка новой версией.
+
+    ОП: после проверки читается новая версия.
+    """
+    # ==== Init ====
+    path = tmp_path / 'movies.snap'
+    snapshot = await make_snapshot(path)
+    snapshot.get('1')
+    old_version = snapshot.version
+    time.sleep(0.002)
+
+    # ==== Run ====
+    await write_snapshot(str(path), iterate([{'id': '1', 'title': 'Renamed'}]))
+
+    # ==== Asserts ====
+    assert orjson.loads(snapshot.get('1')) == {'id': '1', 'title': 'Renamed'}
+    assert snapshot.get('2') is None
+    assert snapshot.version > old_version
+
+
+@pytest.mark.asyncio
+async def test_snapshot_skips_old_and_changed_documents(tmp_path: pathlib.Path) -> None:
+    """
+    Тест на устаревший снимок и документы, изменённые после его сборки.
+
+    ОП: снимок старше max_age не читается, изменённые документы не читаются до следующей сборки.
+    """
+    # ==== Init ====
+    path = tmp_path / 'movies.snap'
+    snapshot = await make_snapshot(path, max_age=60)
+
+    # ==== Run ====
+    snapshot.mark_changed(['1'])
+
+    # ==== Asserts ====
+    assert snapshot.get('1') is None
+    assert snapshot.get('2') is not None
+    snapshot._version -= 61 * 1000
+    assert snapshot.is_expired
+    assert snapshot.get('2') is None
+    time.sleep(0.002)
+    await write_snapshot(str(path), iterate(DOCS))
+    assert orjson.loads(snapshot.get('1')) == DOCS[1]
+
+
+@pytest.mark.asyncio
+async def test_provider_falls_back_to_elastic(tmp_path: pathlib.Path) -> None:
+    """
+    Тест на загрузку документов провайдером со снимком.
+
+    ОП: документы из снимка ограничиваются полями source, изменённые и отсутствующие берутся из Elastic.
+    """
+    # ==== Init ====
+    es = FakeElastic([{'id': '1', 'title': 'Changed'}, {'id': 'new', 'title': 'New'}])
+    provider = FilmsDataProvider(
+        db_client=es,
+        db_index='movies',
+        batch_gets=False,
+        snapshot=await make_snapshot(tmp_path / 'movies.snap'),
+    )
+
+    # ==== Run ====
+    from_snapshot = await provider.get_by_id('2', source=['id', 'title'])
+    provider.mark_changed(['1'])
+    docs = await provider.get_by_ids(['1', '2', 'new'], source=['id', 'title'])
+
+    # ==== Asserts ====
+    assert from_snapshot == {'id': '2', 'title': 'Film 2'}
+    assert docs == [{'id': '1', 'title': 'Changed'}, {'id': '2', 'title': 'Film 2'}, {'id': 'new', 'title': 'New'}]
+    assert es.calls == ['mget']
@@ -0,0 +1,91 @@
+"""Тесты загрузки из Elastic только полей, нужных для ответа API."""
+import asyncio
+
+import pytest
+
+from api.v1.responses import get_source_fields
+from core.config import settings
+from models.genre import GenreAPIResponse
+from tests.unit.fakes import FakeRedis, RecordingElastic, make_cache, make_provider
+
+
+def test_source_fields_of_response_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Тест на поля документа для модели ответа.
+
+    ОП: с ES_SOURCE_FILTERING загружаются поля модели ответа, без него -- документ целиком.
+    """
+    # ==== Run & Asserts ====
+    monkeypatch.setattr(settings, 'ES_SOURCE_FILTERING', True)
+    assert get_source_fields(GenreAPIResponse) == ('id', 'name', 'description')
+    monkeypatch.setattr(settings, 'ES_SOURCE_FILTERING', False)
+    assert get_source_fields(GenreAPIResponse) is None
+
+
+@pytest.mark.asyncio
+async def test_provider_sends_source_to_elastic() -> None:
+    """
+    Тест на запросы к Elastic с ограничением полей.
+
+    ОП: get и mget передают _source_includes, поиск -- _source; без полей запрос не меняется.
+    """
+    # ==== Init ====
+    es = RecordingElastic([{'id': '1', 'name': 'Drama'}])
+    provider = make_provider(es)
+
+    # ==== Run ====
+    await provider.get_by_id('1', source=('id', 'name'))
+    await provider.get_by_ids(['1'], source=('id',))
+    await provider.get_list(page_size=10, source=('id', 'name'))
+    await provider.get_by_id('1')
+
+    # ==== Asserts ====
+    assert es.params == [{'_source_includes': ['id', 'name']}, {'_source_includes': ['id']}, {}]
+    search, = es.bodies
+    assert search['_source'] == ['id', 'name']
+
+
+@pytest.mark.asyncio
+async def test_batched_loads_are_grouped_by_source() -> None:
+    """
+    Тест на объединение загрузок по id с разными полями.
+
+    ОП: загрузки с одинаковыми полями идут одним mget, с разными -- разными.
+    """
+    # ==== Init ====
+    es = RecordingElastic([{'id': '1'}, {'id': '2'}])
+    provider = make_provider(es, batch_gets=True, batch_window=0.0)
+
+    # ==== Run ====
+    await asyncio.gather(
+        provider.get_by_id('1', source=('id',)),
+        provider.get_by_id('2', source=('id',)),
+        provider.get_by_id('1', source=('id', 'name')),
+    )
+
+    # ==== Asserts ====
+    assert sorted(params['_source_includes'] for params in es.params) == [['id'], ['id', 'name']]
+
+
+@pytest.mark.asyncio
+async def test_source_is_a_part_of_caching_key() -> None:
+    """
+    Тест на ключ кеша с ограничением полей.
+
+    ОП: документы с разными наборами полей кешируются под разными ключами.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    es = RecordingElastic([{'id': '1', 'title': 'Drama'}])
+    provider = make_provider(es)
+    cache = make_cache(redis)
+
+    # ==== Run ====
+    await cache.get_from_cache_or_db(get_from_db=provider.get_by_id, entity_id='1', source=('id', 'title'))
+    await cache.get_from_cache_or_db(get_from_db=provider.get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert set(redis.values) == {
+        'Item:get_by_id:entity_id=1:source=id,title',
+        'Item:get_by_id:entity_id=1',
+    }
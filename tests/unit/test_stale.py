@@ -0,0 +1,144 @@
+"""Тесты выдачи устаревших записей кеша и их раннего обновления (XFetch)."""
+import asyncio
+import random
+
+import pytest
+
+from db.cache.entry import CacheEntry, jitter_ttl
+from tests.unit.fakes import FakeRedis, make_cache
+
+KEY = 'Item:get_by_id:entity_id=1'
+
+
+class VersionedSource:
+    """Источник данных, возвращающий новый заголовок при каждой загрузке."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def get_by_id(self, entity_id: str) -> dict:
+        self.calls += 1
+        await asyncio.sleep(0)
+        return {'id': entity_id, 'title': f'v{self.calls}'}
+
+
+def test_entry_is_stale_after_expiry() -> None:
+    """
+    Тест на логическое истечение записи.
+
+    ОП: запись без срока не устаревает, со сроком -- устаревает начиная с него.
+    """
+    # ==== Init ====
+    entry = CacheEntry(data=b'{}', expiry=100.0)
+
+    # ==== Run & Asserts ====
+    assert not CacheEntry(data=b'{}').is_stale(now=1e12)
+    assert not entry.is_stale(now=99.9)
+    assert entry.is_stale(now=100.0)
+
+
+def test_early_refresh_depends_on_delta_and_beta(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Тест на вероятностное раннее обновление.
+
+    ОП: без beta или срока записи обновления нет; чем дольше вычисление, тем раньше обновление.
+    """
+    # ==== Init ====
+    # -log(1 - 0.5) = ln 2 ~ 0.69
+    monkeypatch.setattr(random, 'random', lambda: 0.5)
+    fast = CacheEntry(data=b'{}', delta=0.1, expiry=100.0)
+    slow = CacheEntry(data=b'{}', delta=10.0, expiry=100.0)
+
+    # ==== Run & Asserts ====
+    assert not fast.should_refresh_early(now=95.0, beta=0.0)
+    assert not CacheEntry(data=b'{}', delta=10.0).should_refresh_early(now=95.0, beta=1.0)
+    assert not fast.should_refresh_early(now=95.0, beta=1.0)
+    assert slow.should_refresh_early(now=95.0, beta=1.0)
+    assert fast.should_refresh_early(now=99.95, beta=1.0)
+
+
+def test_jitter_ttl_stays_in_range() -> None:
+    """
+    Тест на разброс TTL.
+
+    ОП: TTL отличается от заданного не больше чем на долю jitter и не меньше секунды.
+    """
+    # ==== Run ====
+    ttls = {jitter_ttl(100, 0.1) for _ in range(1000)}
+
+    # ==== Asserts ====
+    assert jitter_ttl(100, 0.0) == 100
+    assert min(ttls) >= 90 and max(ttls) <= 110
+    assert len(ttls) > 1
+    assert jitter_ttl(1, 0.9) >= 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_kept_past_ttl() -> None:
+    """
+    Тест на хранение записи после логического истечения.
+
+    ОП: запись хранится в Redis ttl + stale_ttl секунд, в конверте со сроком и временем вычисления.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, ttl=60, stale_ttl=30)
+    source = VersionedSource()
+
+    # ==== Run ====
+    await cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    entry = CacheEntry.unpack(redis.values[KEY])
+    assert redis.ttls[KEY] == 90
+    assert entry.expiry is not None
+    assert entry.delta >= 0
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshed() -> None:
+    """
+    Тест на выдачу устаревшей записи.
+
+    ОП: устаревшее значение отдаётся сразу, а обновляется один раз в фоне.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, ttl=60, stale_ttl=30)
+    source = VersionedSource()
+    stale = CacheEntry(data=b'{"id":"1","title":"old"}', delta=0.0, expiry=1.0)
+    redis.values[KEY] = stale.pack()
+
+    # ==== Run ====
+    items = await asyncio.gather(*(
+        cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1') for _ in range(5)
+    ))
+    await asyncio.sleep(0.01)
+    refreshed = await cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1')
+
+    # ==== Asserts ====
+    assert {item.title for item in items} == {'old'}
+    assert source.calls == 1
+    assert refreshed.title == 'v1'
+
+
+@pytest.mark.asyncio
+async def test_plain_values_are_read_without_envelope() -> None:
+    """
+    Тест на чтение значений, записанных до появления конверта.
+
+    ОП: значение без конверта читается как свежее и не обновляется.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    cache = make_cache(redis, ttl=60, stale_ttl=30, xfetch_beta=1.0)
+    source = VersionedSource()
+    redis.values[KEY] = b'{"id":"1","title":"plain"}'
+
+    # ==== Run ====
+    item = await cache.get_from_cache_or_db(get_from_db=source.get_by_id, entity_id='1')
+    await asyncio.sleep(0.01)
+
+    # ==== Asserts ====
+    assert item.title == 'plain'
+    assert source.calls == 0
@@ -0,0 +1,154 @@
+"""Тесты подсказок из префиксного индекса в памяти."""
+import pytest
+
+from db.data_providers.films import FilmsDataProvider
+from db.data_providers.suggest import PrefixIndex, SuggestIndex
+from tests.unit.fakes import FakeElastic, FakeRedis, Item, make_service
+
+# От лучшего к худшему.
+TITLES = ['star wars', 'star trek', 'the last starfighter', 'wars of the worlds']
+
+FILMS = [
+    {'id': '1', 'title': 'Star Trek', 'imdb_rating': 7.0},
+    {'id': '2', 'title': 'Star Wars', 'imdb_rating': 9.0},
+    {'id': '3', 'title': 'The Last Starfighter', 'imdb_rating': 6.5},
+    {'id': '4', 'imdb_rating': 8.0},
+]
+
+
+def make_index(titles: list[str] = TITLES, limit: int = 10) -> PrefixIndex:
+    """Индекс названий, ранг сущности -- её номер."""
+    items = [Item(id=str(row), title=title) for row, title in enumerate(titles)]
+    return PrefixIndex.build(texts=titles, items=items, limit=limit)
+
+
+def get_ids(items: list[Item]) -> list[str]:
+    """Id найденных сущностей по порядку."""
+    return [item.id for item in items]
+
+
+def test_short_prefix_is_answered_from_precomputed_top() -> None:
+    """
+    Тест на короткий префикс.
+
+    ОП: префикс до `precomputed_length` символов берётся из заранее посчитанных строк, по рангу.
+    """
+    # ==== Init ====
+    index = make_index()
+
+    # ==== Run ====
+    index.keys, index.rows = [], []
+    found = index.search('sta', size=10)
+
+    # ==== Asserts ====
+    assert get_ids(found) == ['0', '1', '2']
+    assert get_ids(index.search('s', size=10)) == ['0', '1', '2']
+
+
+def test_long_prefix_is_found_by_bisect() -> None:
+    """
+    Тест на длинный префикс.
+
+    ОП: префикс длиннее `precomputed_length` ищется по отсортированным ключам, результат -- по рангу.
+    """
+    # ==== Init ====
+    index = make_index()
+
+    # ==== Run ====
+    index.top = {}
+    found = index.search('star', size=10)
+
+    # ==== Asserts ====
+    assert get_ids(found) == ['0', '1', '2']
+    assert get_ids(index.search('star w', size=10)) == ['0']
+
+
+def test_prefix_matches_start_of_any_word() -> None:
+    """
+    Тест на поиск с начала слова внутри названия из нескольких слов.
+
+    ОП: находится название, где с префикса начинается любое слово, но не середина слова.
+    """
+    # ==== Init ====
+    index = make_index()
+
+    # ==== Run & Asserts ====
+    assert get_ids(index.search('wars', size=10)) == ['0', '3']
+    assert get_ids(index.search('last star', size=10)) == ['2']
+    assert get_ids(index.search('the', size=10)) == ['2', '3']
+    assert index.search('ars', size=10) == []
+    assert index.search('tars', size=10) == []
+
+
+def test_results_follow_rank_not_text_order() -> None:
+    """
+    Тест на порядок подсказок.
+
+    ОП: подсказки идут по рангу сущностей, а не по алфавиту названий, на обоих путях поиска.
+    """
+    # ==== Init ====
+    index = make_index(['star b', 'star a', 'star c'])
+
+    # ==== Run & Asserts ====
+    assert get_ids(index.search('sta', size=10)) == ['0', '1', '2']
+    assert get_ids(index.search('star', size=10)) == ['0', '1', '2']
+
+
+def test_size_is_capped_by_limit() -> None:
+    """
+    Тест на число подсказок.
+
+    ОП: возвращается не больше `size` лучших подсказок и не больше `limit` индекса.
+    """
+    # ==== Init ====
+    index = make_index()
+    limited = make_index(limit=2)
+
+    # ==== Run & Asserts ====
+    assert get_ids(index.search('sta', size=2)) == ['0', '1']
+    assert get_ids(index.search('star', size=1)) == ['0']
+    assert get_ids(limited.search('sta', size=10)) == ['0', '1']
+    assert get_ids(limited.search('star', size=10)) == ['0', '1']
+
+
+@pytest.mark.parametrize('prefix', ['', 'x', 'zorro'])
+def test_empty_or_unknown_prefix_finds_nothing(prefix: str) -> None:
+    """
+    Тест на пустой и неизвестный префикс.
+
+    ОП: подсказок нет.
+    """
+    # ==== Init ====
+    index = make_index()
+
+    # ==== Run & Asserts ====
+    assert index.search(prefix, size=10) == []
+
+
+@pytest.mark.asyncio
+async def test_refresh_builds_index_ranked_by_suggest_sort() -> None:
+    """
+    Тест на загрузку индекса подсказок.
+
+    ОП: до загрузки индекса подсказки берутся из Elastic, после -- из памяти по убыванию рейтинга,
+    документы без названия пропускаются.
+    """
+    # ==== Init ====
+    es = FakeElastic(FILMS)
+    db = FilmsDataProvider(db_client=es, db_index='movies', batch_searches=False)
+    suggestions = SuggestIndex(db=db, model_class=Item, normalize=str.lower)
+    service = make_service(FakeRedis(), db, suggestions=suggestions)
+
+    # ==== Run ====
+    before = suggestions.suggest('star', size=10)
+    fallback = await service.suggest('star', size=10)
+    await suggestions.refresh()
+    es.calls = []
+    loaded = await service.suggest('Star', size=10)
+
+    # ==== Asserts ====
+    assert before is None
+    assert get_ids(fallback) == ['1', '2', '3', '4']
+    assert get_ids(loaded) == ['2', '1', '3']
+    assert get_ids(suggestions.suggest('fighter', size=10)) == []
+    assert es.calls == []
@@ -0,0 +1,93 @@
+"""Тесты поиска сначала по точным совпадениям, затем нечёткого."""
+import pytest
+
+from tests.unit.fakes import RecordingElastic, make_provider
+
+DOCS = [{'id': str(index), 'title': f'Star Wars {index}'} for index in range(3)]
+
+
+def get_queries(es: RecordingElastic) -> list[dict]:
+    return [body['query']['multi_match'] for body in es.bodies]
+
+
+@pytest.mark.asyncio
+async def test_exact_matches_fill_the_page() -> None:
+    """
+    Тест на поиск, где точных совпадений хватает на страницу.
+
+    ОП: выполняется только точный поиск без fuzziness, с подсчётом совпадений до `tiered_min_hits`.
+    """
+    # ==== Init ====
+    es = RecordingElastic(DOCS)
+
+    # ==== Run ====
+    items = await make_provider(es, tiered_search=True, tiered_min_hits=3).get_search_result(
+        query='star wars', page_size=2,
+    )
+
+    # ==== Asserts ====
+    assert len(items) == 2
+    query, = get_queries(es)
+    assert query == {'query': 'star wars', 'fields': ['*'], 'operator': 'and'}
+    assert es.bodies[0]['track_total_hits'] == 3
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_search_when_exact_matches_are_short() -> None:
+    """
+    Тест на поиск, где точных совпадений меньше `tiered_min_hits`.
+
+    ОП: после точного выполняется нечёткий поиск, и возвращается его результат.
+    """
+    # ==== Init ====
+    es = RecordingElastic(DOCS)
+
+    # ==== Run ====
+    items = await make_provider(es, tiered_search=True, tiered_min_hits=10).get_search_result(
+        query='star wars', page_size=10,
+    )
+
+    # ==== Asserts ====
+    assert len(items) == 3
+    assert ['fuzziness' in query for query in get_queries(es)] == [False, True]
+    assert get_queries(es)[1]['fuzziness'] == 'AUTO'
+
+
+@pytest.mark.asyncio
+async def test_tier_is_chosen_once_per_query() -> None:
+    """
+    Тест на выбор уровня для разных страниц одного запроса.
+
+    ОП: неполная последняя страница ищется тем же точным поиском, что и первая.
+    """
+    # ==== Init ====
+    es = RecordingElastic(DOCS)
+    provider = make_provider(es, tiered_search=True, tiered_min_hits=2)
+
+    # ==== Run ====
+    first = await provider.get_search_result(query='star wars', page_size=2, page_number=1)
+    last = await provider.get_search_result(query='star wars', page_size=2, page_number=2)
+
+    # ==== Asserts ====
+    assert [len(first), len(last)] == [2, 1]
+    assert ['fuzziness' in query for query in get_queries(es)] == [False, False]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('tiered_search, cursor', [(False, None), (True, '')])
+async def test_only_fuzzy_search(tiered_search: bool, cursor: str) -> None:
+    """
+    Тест на поиск без точного этапа.
+
+    ОП: без tiered_search и при пагинации по курсору выполняется только нечёткий поиск.
+    """
+    # ==== Init ====
+    es = RecordingElastic(DOCS)
+
+    # ==== Run ====
+    await make_provider(es, tiered_search=tiered_search).get_search_result(
+        query='star wars', page_size=2, cursor=cursor,
+    )
+
+    # ==== Asserts ====
+    assert ['fuzziness' in query for query in get_queries(es)] == [True]
@@ -0,0 +1,185 @@
+"""Тесты хранилища кеша с копией ключей в памяти процесса (CLIENT TRACKING)."""
+import asyncio
+
+import pytest
+
+from db.cache import tracking
+from db.cache.tracking import TrackingCacheStorage
+from services.film import get_film_service
+from services.genre import get_genres_service
+from services.person import get_persons_service
+from tests.unit.fakes import FakeElastic, FakeRedis
+
+
+class TrackingChannel:
+    """Канал сообщений об инвалидации, в который ничего не приходит, пока он не закрыт."""
+
+    def __init__(self) -> None:
+        self.closed = asyncio.Event()
+
+    async def wait_message(self) -> bool:
+        await self.closed.wait()
+        return False
+
+
+class TrackingConnection:
+    """Отдельное соединение с Redis для подписки или слежения, запоминающее команды."""
+
+    def __init__(self, client_id: int) -> None:
+        self.client_id = client_id
+        self.commands: list[tuple] = []
+        self.channel = TrackingChannel()
+        self.closed = False
+
+    async def execute(self, *args: bytes) -> int:
+        self.commands.append(args)
+        return self.client_id
+
+    async def subscribe(self, channel: str) -> list[TrackingChannel]:
+        return [self.channel]
+
+    async def ping(self) -> bytes:
+        if self.closed:
+            raise ConnectionError()
+        return b'PONG'
+
+    def close(self) -> None:
+        self.closed = True
+        self.channel.closed.set()
+
+
+def make_storage(redis: FakeRedis) -> TrackingCacheStorage:
+    storage = TrackingCacheStorage(redis=redis, address=('redis', 6379), prefixes=['film'])
+    # Соединения слежения открывает `start`; для тестов достаточно признака, что слежение включено.
+    storage._tracking = True
+    return storage
+
+
+@pytest.mark.parametrize('get_service', [get_film_service, get_genres_service, get_persons_service])
+def test_tracking_storage_builds_services(get_service) -> None:
+    """
+    Тест на создание сервисов с хранилищем CLIENT TRACKING.
+
+    ОП: фабрика сервисов кеширует сервис по хранилищу, хранилище хешируется по идентичности.
+    """
+    # ==== Init ====
+    storage = make_storage(FakeRedis())
+    db = FakeElastic([])
+    get_service.cache_clear()
+
+    # ==== Run ====
+    service = get_service(cache=storage, db=db)
+
+    # ==== Asserts ====
+    assert service.cache.cache_client is storage
+    assert get_service(cache=storage, db=db) is service
+    get_service.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_tracking_storage_keeps_tracked_keys() -> None:
+    """
+    Тест на чтение ключей с отслеживаемым префиксом.
+
+    ОП: повторное чтение отдаётся из памяти, ключи без префикса всегда читаются из Redis.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    storage = make_storage(redis)
+    await redis.set('film:1', b'film')
+    await redis.set('genre:1', b'genre')
+
+    # ==== Run ====
+    for _ in range(3):
+        assert await storage.get('film:1') == b'film'
+        assert await storage.get('genre:1') == b'genre'
+
+    # ==== Asserts ====
+    assert redis.commands.count('get') == 4
+
+
+@pytest.mark.asyncio
+async def test_tracking_storage_drops_invalidated_keys() -> None:
+    """
+    Тест на изменение ключа и сообщение об инвалидации.
+
+    ОП: после записи и после сообщения Redis ключ снова читается из Redis.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    storage = make_storage(redis)
+    await redis.set('film:1', b'old')
+    await storage.get('film:1')
+
+    # ==== Run ====
+    await storage.set('film:1', b'new')
+    after_set = await storage.get('film:1')
+    await redis.set('film:1', b'newest')
+    storage._drop('film:1')
+    after_message = await storage.mget('film:1')
+
+    # ==== Asserts ====
+    assert after_set == b'new'
+    assert after_message == [b'newest']
+
+
+@pytest.mark.asyncio
+async def test_tracking_storage_skips_value_invalidated_while_read() -> None:
+    """
+    Тест на сообщение об инвалидации, пришедшее во время чтения ключа.
+
+    ОП: прочитанное значение не сохраняется в памяти.
+    """
+    # ==== Init ====
+    redis = FakeRedis()
+    storage = make_storage(redis)
+    await redis.set('film:1', b'old')
+    get = redis.get
+
+    async def get_invalidated(key: str, **kwargs):
+        value = await get(key, **kwargs)
+        storage._drop(key)
+        return value
+
+    redis.get = get_invalidated
+
+    # ==== Run ====
+    await storage.get('film:1')
+
+    # ==== Asserts ====
+    assert 'film:1' not in storage._values
+
+
+@pytest.mark.asyncio
+async def test_lost_tracking_connection_is_reopened(monkeypatch) -> None:
+    """
+    Тест на потерю соединения слежения.
+
+    ОП: копия в памяти сбрасывается, старые соединения закрываются, слежение включается заново
+    с перенаправлением на новое соединение подписчика.
+    """
+    # ==== Init ====
+    connections = []
+
+    async def create_redis(address: tuple) -> TrackingConnection:
+        connections.append(TrackingConnection(client_id=len(connections) + 1))
+        return connections[-1]
+
+    monkeypatch.setattr(tracking.aioredis, 'create_redis', create_redis)
+    redis = FakeRedis()
+    await redis.set('film:1', b'film')
+    storage = TrackingCacheStorage(redis=redis, address=('redis', 6379), prefixes=['film'], ping_interval=0.01)
+    await storage.start()
+    await storage.get('film:1')
+
+    # ==== Run ====
+    connections[1].closed = True
+    await asyncio.sleep(0.05)
+    storage.close()
+
+    # ==== Asserts ====
+    subscriber, tracker = connections[2:4]
+    assert 'film:1' not in storage._values
+    assert tracker.commands == [(b'CLIENT', b'TRACKING', b'on', b'REDIRECT', 3, b'BCAST', b'PREFIX', 'film')]
+    assert subscriber.commands == [(b'CLIENT', b'ID')]
+    assert all(connection.closed for connection in connections)